@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+"""
+Process many Portfolio Performance files listed in a JSON manifest
+  - each entry gives a file and tax year(s), and optionally accounts
+  - one JSON result is written per portfolio, together with summary.json
+"""
+# Standard library imports
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+# Local imports
+from uk_tax_report.batch import read_manifest, run_batch
+
+if __name__ == "__main__":
+    # Parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument("manifest", type=str, help="JSON manifest of files to process")
+    parser.add_argument(
+        "-o", "--output", type=str, default="results", help="directory for results"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="Include all transactions (not just taxable ones) unless a file says otherwise",
+    )
+    parser.add_argument(
+        "-i",
+        "--iso-currency",
+        type=str,
+        help="ISO currency code unless a file says otherwise",
+        default="GBP",
+    )
+    parser.add_argument(
+        "-r",
+        "--fx-rates",
+        type=str,
+        help="CSV file of daily exchange rates unless a file says otherwise",
+    )
+    parser.add_argument(
+        "-e",
+        "--export",
+        type=str,
+        choices=["parquet", "arrow"],
+        help="also export every resolved event and pool timeline in this format unless a file says otherwise",
+    )
+    parser.add_argument(
+        "-s",
+        "--streaming",
+        action="store_true",
+        help="summarise events as they are resolved instead of keeping them, unless a file says otherwise",
+    )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        type=str,
+        help="directory to keep resolved securities in, so that unchanged histories are not resolved again",
+    )
+    parser.add_argument(
+        "-t",
+        "--tax-year",
+        metavar="N",
+        type=str,
+        help="tax year to use unless a file says otherwise [either YYYY-YY or YYYY-YYYY]",
+    )
+    parser.add_argument(
+        "-v", "--verbosity", action="count", default=0, help="increase output verbosity"
+    )
+    args = parser.parse_args()
+
+    # Set up logging
+    logging.basicConfig(
+        format=r"%(asctime)s %(levelname)8s: %(message)s",
+        datefmt=r"%Y-%m-%d %H:%M:%S",
+        level=logging.INFO,
+    )
+
+    # Process every file in the manifest
+    defaults = {"currency": args.iso_currency, "all": args.all}
+    if args.tax_year:
+        defaults["tax_year"] = args.tax_year
+    if args.export:
+        defaults["export"] = args.export
+    if args.streaming:
+        defaults["streaming"] = True
+    if args.fx_rates:
+        defaults["fx_rates"] = str(Path(args.fx_rates).resolve())
+    jobs = read_manifest(args.manifest, **defaults)
+    summary = run_batch(jobs, args.output, args.workers, args.verbosity, args.cache)
+    logging.info(
+        f"Processed {summary['portfolios']} portfolios in {summary['seconds']:.1f}s: {summary['succeeded']} succeeded and {summary['failed']} failed"
+    )
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1 @@
+"""Benchmarks and regression harnesses for the capital gains calculator"""
@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+"""
+Resolution cache benchmark
+
+A portfolio of many securities is summarised for several tax years without a
+cache, then with an empty cache, then again from the filled cache, and then
+after the history of one security has changed so that only it is resolved
+again. Every run must give the same summaries as resolving without a cache.
+
+Run with: python -m benchmarks.cache
+"""
+# Standard library imports
+import gc
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report import Account, Security
+from uk_tax_report.cache import ResolutionCache
+from uk_tax_report.converters import as_tax_year
+
+from .synthetic import security_history, to_transactions
+
+
+def build_account(histories: List[List[Dict]]) -> Account:
+    """Account holding a security for each history"""
+    account = Account("Account", "GBP")
+    for idx, rows in enumerate(histories):
+        security = Security(f"S{idx:05d}", f"Security {idx:05d}", GBP)
+        security.add_transactions(to_transactions(rows, GBP))
+        account.securities.append(security)
+    return account
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time summarising with and without the cache, and fail if any summary differs"""
+    parser = ArgumentParser(description="Resolution cache benchmark")
+    parser.add_argument(
+        "-n", "--securities", type=int, default=200, help="number of securities"
+    )
+    parser.add_argument(
+        "-t",
+        "--transactions",
+        type=int,
+        default=500,
+        help="number of transactions for each security",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    histories = [
+        security_history(random.Random(args.seed + idx), args.transactions)
+        for idx in range(args.securities)
+    ]
+    last_year = max(row["Date"] for rows in histories for row in rows).year
+    periods = [
+        as_tax_year(f"{year - 1}-{year}")
+        for year in range(last_year - 2, last_year + 1)
+    ]
+    # The changed history loses its last transaction
+    changed = [histories[0][:-1]] + histories[1:]
+
+    def run(
+        rows: List[List[Dict]], cache: Optional[ResolutionCache]
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        # Start every run without garbage left over from the previous one
+        gc.collect()
+        start_time = time.perf_counter()
+        summaries = build_account(rows).summaries(periods, cache=cache)
+        return summaries, time.perf_counter() - start_time
+
+    n_failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        expected, uncached_time = run(histories, None)
+        expected_changed, _ = run(changed, None)
+        print(f"{'no cache':16} {uncached_time:6.2f}s")
+        for name, rows, expected_ in [
+            ("empty cache", histories, expected),
+            ("filled cache", histories, expected),
+            ("one changed", changed, expected_changed),
+        ]:
+            actual, elapsed = run(rows, ResolutionCache(directory))
+            print(f"{name:16} {elapsed:6.2f}s  ({uncached_time / elapsed:.1f}x)")
+            if actual != expected_:
+                print(f"The summaries differ with {name}")
+                n_failures += 1
+    return 1 if n_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
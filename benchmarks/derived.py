@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+"""
+Derived value cache benchmark
+
+Random histories are resolved and every derived value (totals, charges and
+unit prices) of every event and pool is read twice: the first read computes
+and stores each value, and the second reads the stored value. Every stored
+value must be identical to recomputing it after the cache is invalidated,
+which catches a pool that changed without forgetting its stored values.
+
+Run with: python -m benchmarks.derived
+"""
+# Standard library imports
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from contextlib import suppress
+from typing import List, Sequence
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report import Security
+from uk_tax_report.transactions import Transaction
+from uk_tax_report.transactions.transaction import cached_properties
+
+from .synthetic import security_history, to_transactions
+
+
+def derived_values(transaction: Transaction) -> List[object]:
+    """Every derived value of a transaction, or None where it is not defined"""
+    values = []
+    for name in cached_properties(type(transaction)):
+        try:
+            values.append(getattr(transaction, name))
+        except (AttributeError, NotImplementedError):
+            values.append(None)
+    return values
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time computing and reading derived values, and fail if any stored value is stale"""
+    parser = ArgumentParser(description="Derived value cache benchmark")
+    parser.add_argument(
+        "-n", "--histories", type=int, default=100, help="number of histories"
+    )
+    parser.add_argument(
+        "-t",
+        "--transactions",
+        type=int,
+        default=500,
+        help="number of transactions in each history",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    items = []
+    for idx in range(args.histories):
+        rows = security_history(random.Random(args.seed + idx), args.transactions)
+        security = Security("SYM", "Security", GBP)
+        security.add_transactions(to_transactions(rows, GBP))
+        with suppress(ValueError):
+            items += [item for event in security.events for item in event]
+
+    timings, stored = [], []
+    for _ in range(2):
+        start_time = time.perf_counter()
+        stored = [derived_values(item) for item in items]
+        timings.append(time.perf_counter() - start_time)
+    print(f"{'computed':10} {timings[0]:6.2f}s  ({len(items)} events and pools)")
+    print(f"{'stored':10} {timings[1]:6.2f}s  ({timings[0] / timings[1]:.1f}x)")
+
+    n_stale = 0
+    for item, values in zip(items, stored):
+        item.invalidate()
+        if derived_values(item) != values:
+            n_stale += 1
+    if n_stale:
+        print(f"{n_stale} events or pools have stale derived values")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
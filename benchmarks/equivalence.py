@@ -0,0 +1,283 @@
+#! /usr/bin/env python
+"""
+Differential equivalence harness
+
+Random but valid trade histories are resolved by the frozen reference engine
+and by a candidate engine. Every disposal, gain and pool state must agree to
+the penny, so that optimised engines can be checked against the original
+algorithm.
+
+Run with: python -m benchmarks.equivalence
+"""
+# Standard library imports
+import random
+import sys
+from argparse import ArgumentParser
+from contextlib import suppress
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Sequence, Tuple
+from unittest import mock
+
+# Third-party imports
+from moneyed import GBP, Currency, Money
+
+# Local imports
+from uk_tax_report import Security
+from uk_tax_report.reconcile import reconcile
+from uk_tax_report.streaming import stream_events
+from uk_tax_report.transactions import Disposal, Purchase, Sale, Transaction
+
+from . import reference
+from .synthetic import ACTIONS, PENNY, security_history, to_transactions
+
+Engine = Callable[[List[Transaction], Currency], List[reference.Event]]
+PROFILES = {
+    # Every kind of transaction, including same-day trades and bed-and-breakfast
+    "mixed": (ACTIONS, None, False),
+    # Histories which usually start with an HS285 exchange
+    "exchange": ({**ACTIONS, "exchange": 40}, None, False),
+    # Histories where no sale is matched against a later purchase
+    "unmatched": (
+        {"buy": 10, "sell": 5, "sell_all": 1, "dividend": 3, "eri": 1},
+        [31, 45, 90],
+        False,
+    ),
+    # Histories where sales have several purchases in their 30-day window
+    "windows": (
+        {**ACTIONS, "same_day": 4, "bed_and_breakfast": 6},
+        [0, 1, 2, 5, 9, 20],
+        True,
+    ),
+    # Histories with HS285 exchanges after disposals and ERIs
+    "late exchange": ({**ACTIONS, "eri": 3, "exchange": 6}, None, True),
+}
+
+
+class InvalidatingPool(reference.ReferencePool):
+    """
+    Reference pool that forgets the derived values stored by transactions
+    whenever it changes. The frozen reference changes its pool in place,
+    which production pools only do through methods that forget them.
+    """
+
+    def __setattr__(self, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+        self.invalidate()
+
+
+def reference_engine(transactions: List[Transaction], currency: Currency):
+    """Resolve transactions with the frozen reference engine"""
+    with mock.patch.object(reference, "ReferencePool", InvalidatingPool):
+        return reference.resolve(transactions, currency)
+
+
+def security_engine(transactions: List[Transaction], currency: Currency):
+    """Resolve transactions with the Security class"""
+    security = Security("SYM", "Security", currency)
+    security.add_transactions(transactions)
+    return security.events
+
+
+def checkpoint_engine(transactions: List[Transaction], currency: Currency):
+    """Resolve the earlier transactions, then resume from a checkpoint with the rest"""
+    ordered = sorted(transactions, key=lambda t: t.datetime)
+    n_first = (2 * len(ordered)) // 3
+    security = Security("SYM", "Security", currency)
+    security.add_transactions(ordered[:n_first])
+    with suppress(ValueError, ZeroDivisionError):
+        security.resolve_transactions()
+    security.add_transactions(ordered[n_first:])
+    return security.events
+
+
+def streaming_engine(transactions: List[Transaction], currency: Currency):
+    """Resolve transactions as a stream of events, without keeping them"""
+    security = Security("SYM", "Security", currency)
+    security.add_transactions(transactions)
+    return list(stream_events(security))
+
+
+ENGINES: Dict[str, Engine] = {
+    "security": security_engine,
+    "checkpoint": checkpoint_engine,
+    "streaming": streaming_engine,
+}
+# Engines which resolve in date order and so report the earliest error in a
+# rejected history, rather than the error the reference engine finds first
+DATE_ORDERED = {"streaming"}
+
+
+def pennies(*amounts: Money) -> Tuple[Decimal, ...]:
+    """Amounts rounded to the nearest penny"""
+    return tuple(amount.amount.quantize(PENNY) for amount in amounts)
+
+
+def snapshot(events: List[reference.Event]) -> List[tuple]:
+    """Comparable summary of every event and the pool state that follows it"""
+    rows = []
+    for transaction, pool in events:
+        if isinstance(transaction, Disposal):
+            amounts = pennies(
+                transaction.purchase_total,
+                transaction.purchase_fees,
+                transaction.purchase_taxes,
+                transaction.sale_total,
+                transaction.sale_fees,
+                transaction.sale_taxes,
+                transaction.gain,
+            )
+        else:
+            amounts = pennies(transaction.subtotal, transaction.fees, transaction.taxes)
+        rows.append(
+            (type(transaction).__name__, transaction.datetime, transaction.units)
+            + amounts
+            + (pool.units,)
+            + pennies(pool.subtotal, pool.fees, pool.taxes)
+        )
+    return rows
+
+
+def outcome(engine: Engine, transactions: List[Transaction]) -> List[tuple]:
+    """Snapshot of the events from an engine, or the error that it raised"""
+    try:
+        return snapshot(engine(list(transactions), GBP))
+    except (ValueError, ZeroDivisionError) as exc:
+        # Histories with overlapping matches can make either engine fail
+        return [(type(exc).__name__, str(exc))]
+
+
+def is_rejected(rows: List[tuple]) -> bool:
+    """Whether an outcome is an error rather than a snapshot of events"""
+    return len(rows) == 1 and rows[0][0] in ("ValueError", "ZeroDivisionError")
+
+
+def first_difference(expected: List[tuple], actual: List[tuple]) -> str:
+    """Describe the first difference between two snapshots"""
+    for idx, (row_expected, row_actual) in enumerate(zip(expected, actual)):
+        if row_expected != row_actual:
+            return f"event {idx}:\n  expected {row_expected}\n  actual   {row_actual}"
+    return f"expected {len(expected)} events but found {len(actual)}"
+
+
+def check_engine(
+    engine: Engine,
+    n_histories: int,
+    n_transactions: int,
+    seed: int,
+    date_ordered: bool = False,
+) -> List[str]:
+    """
+    Compare an engine with the reference engine on random histories. For
+    engines that resolve in date order, only whether a history is rejected is
+    compared, not which error is raised.
+    """
+    failures = []
+    for idx in range(n_histories):
+        profile = list(PROFILES)[idx % len(PROFILES)]
+        actions, gaps, overlaps = PROFILES[profile]
+        rng = random.Random(seed + idx)
+        rows = security_history(
+            rng,
+            rng.randint(1, n_transactions),
+            actions=actions,
+            gaps=gaps,
+            overlaps=overlaps,
+        )
+        transactions = to_transactions(rows, GBP)
+        expected = outcome(reference_engine, transactions)
+        actual = outcome(engine, transactions)
+        if date_ordered and all(is_rejected(o) for o in (expected, actual)):
+            continue
+        if expected != actual:
+            failures.append(
+                f"History {idx} ({profile}) differs at {first_difference(expected, actual)}"
+            )
+    return failures
+
+
+def random_pair(rng: random.Random) -> Tuple[Purchase, Sale]:
+    """Purchase and sale with equal, fewer or more units than each other"""
+    date_time = datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 1000))
+    units = Decimal(rng.randint(1, 500))
+    sale_units = rng.choice([units, units / 3, units * 2, units - 1, Decimal(0)])
+    purchase = Purchase(
+        date_time,
+        GBP,
+        units,
+        Decimal(str(rng.uniform(1, 5000))).quantize(PENNY),
+        Decimal(str(rng.uniform(0, 20))).quantize(PENNY),
+        Decimal(str(rng.uniform(0, 5))).quantize(PENNY),
+    )
+    sale = Sale(
+        date_time + timedelta(days=rng.randint(0, 30)),
+        GBP,
+        sale_units,
+        Decimal(str(rng.uniform(1, 5000))).quantize(PENNY),
+        Decimal(str(rng.uniform(0, 20))).quantize(PENNY),
+        Decimal(str(rng.uniform(0, 5))).quantize(PENNY),
+    )
+    return purchase, sale
+
+
+def check_reconcile(candidate: Callable, n_cases: int, seed: int) -> List[str]:
+    """Compare a reconcile function with the reference on random purchase/sale pairs"""
+    failures = []
+    rng = random.Random(seed)
+    for idx in range(n_cases):
+        purchase, sale = random_pair(rng)
+        expected = snapshot(
+            [(t, purchase) for t in reference.reconcile(purchase, sale)]
+        )
+        actual = snapshot([(t, purchase) for t in candidate(purchase, sale)])
+        if expected != actual:
+            failures.append(
+                f"Pair {idx} differs at {first_difference(expected, actual)}"
+            )
+    return failures
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Check engines against the reference engine"""
+    parser = ArgumentParser(description="Differential equivalence harness")
+    parser.add_argument(
+        "-e",
+        "--engines",
+        type=str,
+        nargs="+",
+        choices=list(ENGINES),
+        default=list(ENGINES),
+        help="engines to check",
+    )
+    parser.add_argument(
+        "-n", "--histories", type=int, default=300, help="number of histories"
+    )
+    parser.add_argument(
+        "-t",
+        "--transactions",
+        type=int,
+        default=80,
+        help="maximum number of transactions in each history",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    failures = check_reconcile(reconcile, args.histories, args.seed)
+    print(f"reconcile: {len(failures)} of {args.histories} pairs differ")
+    for name in args.engines:
+        engine_failures = check_engine(
+            ENGINES[name],
+            args.histories,
+            args.transactions,
+            args.seed,
+            name in DATE_ORDERED,
+        )
+        print(f"{name}: {len(engine_failures)} of {args.histories} histories differ")
+        failures += engine_failures
+    for failure in failures[:10]:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
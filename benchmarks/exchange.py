@@ -0,0 +1,149 @@
+#! /usr/bin/env python
+"""
+HS285 exchange benchmark
+
+Long histories of purchases are interrupted by regular share reorganisations,
+each modelled as an exchange-sale of every share bought so far followed by a
+purchase of the new shares. Every exchange is matched against all earlier
+purchases both by adding them up again, as reconcile.exchange does, and by
+looking up running totals from reconcile.pool_prefixes. The time taken by each
+is compared, and every residual sale and disposal must be identical, down to
+the exponent of each Decimal.
+
+Run with: python -m benchmarks.exchange
+"""
+# Standard library imports
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List, Sequence
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report import Security
+from uk_tax_report.reconcile import exchange, exchange_pool, pool_prefixes
+from uk_tax_report.transactions import Purchase, Sale, Transaction
+
+from .section104 import exact
+
+
+def reorganised_history(
+    rng: random.Random, n_transactions: int, n_exchanges: int
+) -> List[Transaction]:
+    """Date-ordered purchases with an exchange of every share bought so far at regular intervals"""
+    transactions: List[Transaction] = []
+    units = Decimal(0)
+    date_time = datetime(2000, 1, 3, 12)
+    interval = max(n_transactions // (n_exchanges + 1), 1)
+    for idx in range(n_transactions):
+        date_time += timedelta(days=rng.randint(1, 3))
+        if idx % interval == interval - 1:
+            transactions.append(
+                Sale(
+                    date_time,
+                    GBP,
+                    units,
+                    Decimal(rng.randint(100, 10000)),
+                    note="Exchange",
+                )
+            )
+            new_units = units * rng.choice([2, 3, 5])
+            transactions.append(
+                Purchase(date_time, GBP, new_units, Decimal(0), note="Exchange")
+            )
+        else:
+            new_units = Decimal(rng.randint(1, 100))
+            transactions.append(
+                Purchase(
+                    date_time,
+                    GBP,
+                    new_units,
+                    Decimal(rng.randint(100, 10000)) / 100,
+                    Decimal(rng.randint(0, 1000)) / 100,
+                    Decimal(rng.randint(0, 100)) / 100,
+                )
+            )
+        units += new_units
+    return transactions
+
+
+def refiltered(purchases: List[Purchase], sales: List[Sale]) -> List[tuple]:
+    """Residual sale and disposal of each exchange, adding up earlier purchases every time"""
+    return [
+        exchange([p for p in purchases if p.date < sale.date], sale)[1:]
+        for sale in sales
+    ]
+
+
+def looked_up(purchases: List[Purchase], sales: List[Sale]) -> List[tuple]:
+    """Residual sale and disposal of each exchange, looking up running totals"""
+    prefixes = pool_prefixes(purchases)
+    purchase_dates = [p.date for p in purchases]
+    return [
+        exchange_pool(*prefixes[bisect_left(purchase_dates, sale.date)], sale)[1:]
+        for sale in sales
+    ]
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time both ways of matching exchanges, and fail if any result differs"""
+    parser = ArgumentParser(description="HS285 exchange benchmark")
+    parser.add_argument(
+        "-n",
+        "--transactions",
+        type=int,
+        nargs="+",
+        default=[1000, 2000, 4000],
+        help="number of transactions in each history",
+    )
+    parser.add_argument(
+        "-e",
+        "--exchanges",
+        type=float,
+        default=0.1,
+        help="exchanges as a fraction of the transactions",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    n_failures = 0
+    print(f"{'transactions':>12} {'refiltered':>11} {'looked up':>11} {'resolved':>10}")
+    for n_transactions in args.transactions:
+        transactions = reorganised_history(
+            random.Random(args.seed),
+            n_transactions,
+            int(n_transactions * args.exchanges),
+        )
+        purchases = [t for t in transactions if isinstance(t, Purchase)]
+        sales = [t for t in transactions if isinstance(t, Sale)]
+
+        start_time = time.perf_counter()
+        expected = refiltered(purchases, sales)
+        refiltered_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        actual = looked_up(purchases, sales)
+        looked_up_time = time.perf_counter() - start_time
+
+        security = Security("SYM", "Security", GBP)
+        security.add_transactions(transactions)
+        start_time = time.perf_counter()
+        security.resolve_transactions()
+        resolved_time = time.perf_counter() - start_time
+        print(
+            f"{n_transactions:12} {refiltered_time:10.2f}s {looked_up_time:10.2f}s"
+            f" {resolved_time:9.2f}s  ({refiltered_time / looked_up_time:.1f}x)"
+        )
+        if exact(expected) != exact(actual):
+            print(f"The exchanges differ for {n_transactions} transactions")
+            n_failures += 1
+    return 1 if n_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
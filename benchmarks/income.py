@@ -0,0 +1,127 @@
+#! /usr/bin/env python
+"""
+Portfolio income benchmark
+
+A synthetic portfolio is written as CSV and read into one combined account, as
+process.py does. The dividends and ERIs of every security in every tax year
+are then listed both from Security.dividends, one security and one tax year at
+a time, and from the transaction table, with one selection for each tax year.
+The account is built before either is timed, and the table is timed both when
+it is first read and once it is kept, as a DataFile keeps it for every account
+and report. The payments must be identical, as must the
+summaries of the account with and without the table, and the totals of the
+table by account, security, tax year and type must match the transactions.
+
+Run with: python -m benchmarks.income
+"""
+# Standard library imports
+import random
+import sys
+import tempfile
+import timeit
+from argparse import ArgumentParser
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+# Local imports
+from uk_tax_report import Account
+from uk_tax_report.converters import as_tax_year
+from uk_tax_report.income import Income
+from uk_tax_report.readers import CsvDataFile
+
+from .synthetic import portfolio_rows, write_csv
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time both ways of listing income, and fail if any payment or total differs"""
+    parser = ArgumentParser(description="Portfolio income benchmark")
+    parser.add_argument(
+        "-n", "--transactions", type=int, default=20000, help="number of transactions"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="timing repeats of each way"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    rows = portfolio_rows(random.Random(args.seed), args.transactions)
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = Path(directory) / "portfolio.csv"
+        write_csv(rows, file_name)
+        data = CsvDataFile(file_name)
+    account = Account.combined("Taxable Accounts", "GBP", data)
+    first_year = min(row["Date"] for row in rows).year - 1
+    last_year = max(row["Date"] for row in rows).year
+    periods = [
+        as_tax_year(f"{year}-{year + 1}") for year in range(first_year, last_year + 1)
+    ]
+
+    # The transactions are those already built for the account, while the
+    # income table is timed both when it is first read and once it is kept
+    def dividends():
+        return [
+            {s.name: s.dividends(*period) for s in account.securities}
+            for period in periods
+        ]
+
+    def read():
+        data.income_ = Income(data.df_transactions)
+        return account.payments(periods)
+
+    loop_time = min(timeit.repeat(dividends, number=1, repeat=args.repeat))
+    print(f"{'transactions':16} {loop_time * 1000:8.1f} ms")
+    for name, function in [
+        ("table read", read),
+        ("table kept", lambda: account.payments(periods)),
+    ]:
+        elapsed = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print(f"{name:16} {elapsed * 1000:8.1f} ms  ({loop_time / elapsed:.1f}x)")
+    from_transactions, from_table = dividends(), account.payments(periods)
+
+    n_failures = 0
+    fields = ("date", "type", "units", "unit_price", "total")
+    differing = [
+        name
+        for payments, dividends in zip(from_table, from_transactions)
+        for name, transactions in dividends.items()
+        if [tuple(getattr(p, f) for f in fields) for p in payments.get(name, [])]
+        != [tuple(getattr(t, f) for f in fields) for t in transactions]
+    ]
+    if differing:
+        print(
+            f"The payments of {len(differing)} securities differ, including {differing[0]}"
+        )
+        n_failures += 1
+
+    totals: Dict[Tuple[str, str, str, str], Decimal] = {
+        (row["Cash Account"], row["Security"], row["Tax Year"], row["Type"]): row[
+            "Total"
+        ]
+        for _, row in data.income.totals().iterrows()
+    }
+    expected_totals: Dict[Tuple[str, str, str, str], Decimal] = {}
+    for name in sorted(data.account_names):
+        for security in Account(name, "GBP", data).securities:
+            for period in periods:
+                tax_year = f"{period[0].year}-{period[1].year}"
+                for dividend in security.dividends(*period):
+                    key = (name, security.name, tax_year, dividend.type)
+                    expected_totals[key] = (
+                        expected_totals.get(key, 0) + dividend.total.amount
+                    )
+    if totals != expected_totals:
+        print("The totals by account, security, tax year and type differ")
+        n_failures += 1
+
+    # Summaries must not depend on where the income was read from
+    expected_summaries = account.summaries(periods)
+    account.data_ = None
+    if account.summaries(periods) != expected_summaries:
+        print("The summaries differ")
+        n_failures += 1
+    return 1 if n_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#! /usr/bin/env python
+"""
+Overlapping export benchmark
+
+A synthetic portfolio is written as two overlapping CSV exports, as when
+monthly exports cover some of the same days. Every security is renamed in
+the second export, keeping its ISIN and symbol, as when Portfolio Performance
+updates its name between exports. The exports are merged with the
+fingerprints held in memory and in a SQLite file that already holds a table
+of the same name. The time taken by each is reported. Each merged table must
+hold every transaction exactly once, the same as a single export of the
+whole portfolio, and the existing table must be left alone.
+
+Run with: python -m benchmarks.merge
+"""
+# Standard library imports
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Sequence
+
+# Third-party imports
+import pandas as pd
+
+# Local imports
+from uk_tax_report.readers import CsvDataFile, MergedDataFile
+
+from .synthetic import portfolio_rows, write_csv
+
+COLUMNS = ["Date", "Type", "Security", "ISIN", "Shares", "Amount", "Cash Account"]
+
+
+def normalised(df_transactions: pd.DataFrame) -> pd.DataFrame:
+    """Identifying columns of a transaction table in a fixed order"""
+    return (
+        df_transactions[COLUMNS]
+        .astype(str)
+        .sort_values(COLUMNS, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time merging overlapping exports, and fail if any transaction is lost or repeated"""
+    parser = ArgumentParser(description="Overlapping export benchmark")
+    parser.add_argument(
+        "-n", "--transactions", type=int, default=20000, help="number of transactions"
+    )
+    parser.add_argument(
+        "-o",
+        "--overlap",
+        type=float,
+        default=0.2,
+        help="fraction of the transactions in both exports",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    rows = sorted(
+        portfolio_rows(random.Random(args.seed), args.transactions),
+        key=lambda row: row["Date"],
+    )
+    dates = [row["Date"] for row in rows]
+    first_end = dates[int(len(rows) * (1 + args.overlap) / 2)]
+    second_start = dates[int(len(rows) * (1 - args.overlap) / 2)]
+    first = [row for row in rows if row["Date"] <= first_end]
+    second = [
+        {**row, "Security": f"{row['Security']} plc"}
+        for row in rows
+        if row["Date"] >= second_start
+    ]
+
+    n_failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = [str(Path(directory) / f"{n}.csv") for n in ("all", "1", "2")]
+        for export, file_name in zip([rows, first, second], file_names):
+            write_csv(export, file_name)
+        expected = normalised(CsvDataFile(file_names[0]).df_transactions)
+        print(
+            f"{len(first)} and {len(second)} transactions in the exports, {len(rows)} in all"
+        )
+
+        database = str(Path(directory) / "fingerprints.sqlite")
+        with sqlite3.connect(database) as connection:
+            connection.execute("CREATE TABLE fingerprints (note TEXT)")
+            connection.execute("INSERT INTO fingerprints VALUES ('kept')")
+        for name, fingerprints_file in (("in memory", None), ("SQLite file", database)):
+            start_time = time.perf_counter()
+            data = MergedDataFile(file_names[1:], fingerprints_file=fingerprints_file)
+            elapsed = time.perf_counter() - start_time
+            print(f"{name:12} {elapsed:6.2f}s")
+            if not normalised(data.df_transactions).equals(expected):
+                print(f"The merged transactions differ with the fingerprints {name}")
+                n_failures += 1
+
+        with sqlite3.connect(database) as connection:
+            if connection.execute("SELECT note FROM fingerprints").fetchall() != [
+                ("kept",)
+            ]:
+                print("The existing table in the SQLite file was changed")
+                n_failures += 1
+    return 1 if n_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#! /usr/bin/env python
+"""
+Portfolio file format benchmark
+
+A synthetic portfolio is written as XML and as each of the formats that newer
+versions of Portfolio Performance save: binary, zipped binary and zipped XML.
+Each file is loaded and the time taken is compared with loading the XML. The
+normalised transaction tables must be identical, both for the synthetic
+portfolio and for the small fixture files in benchmarks/fixtures.
+
+Run with: python -m benchmarks.portfolio
+Regenerate the fixtures with: python -m benchmarks.portfolio --write-fixtures
+"""
+# Standard library imports
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+# Third-party imports
+import pandas as pd
+
+# Local imports
+from uk_tax_report.readers import PortfolioDataFile, XmlDataFile
+
+from .synthetic import portfolio_rows, write_portfolio, write_xml, write_zipped_xml
+
+FIXTURES = Path(__file__).parent / "fixtures"
+FORMATS = {
+    "binary": "client.portfolio",
+    "zipped binary": "client-binary.zip.portfolio",
+    "zipped XML": "client-xml.zip.portfolio",
+}
+
+
+def write_files(rows: List[Dict], directory: Path) -> None:
+    """Write rows to an XML file and to a file in each binary or zipped format"""
+    write_xml(rows, directory / "client.xml")
+    write_portfolio(rows, directory / FORMATS["binary"])
+    write_portfolio(rows, directory / FORMATS["zipped binary"], zipped=True)
+    write_zipped_xml(rows, directory / FORMATS["zipped XML"])
+
+
+def normalised(df_transactions: pd.DataFrame) -> pd.DataFrame:
+    """Transaction table in a fixed order, since files may list containers differently"""
+    return df_transactions.sort_values(
+        ["Cash Account", "Security", "Date", "Type", "Shares", "Amount"], kind="stable"
+    ).reset_index(drop=True)
+
+
+def compare_formats(directory: Path) -> List[str]:
+    """Time loading each format in a directory, returning those that differ from XML"""
+    start_time = time.perf_counter()
+    expected = normalised(XmlDataFile(directory / "client.xml").df_transactions)
+    xml_time = time.perf_counter() - start_time
+    print(f"{'XML':14} {xml_time:6.2f}s  ({len(expected)} transactions)")
+
+    failures = []
+    for file_format, file_name in FORMATS.items():
+        start_time = time.perf_counter()
+        data = PortfolioDataFile(directory / file_name)
+        elapsed = time.perf_counter() - start_time
+        print(f"{file_format:14} {elapsed:6.2f}s  ({xml_time / elapsed:.1f}x)")
+        if not normalised(data.df_transactions).equals(expected):
+            failures.append(f"{directory.name}/{file_name}")
+    return failures
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time loading every format, and fail if any transaction table differs"""
+    parser = ArgumentParser(description="Portfolio file format benchmark")
+    parser.add_argument(
+        "-n", "--transactions", type=int, default=20000, help="number of transactions"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--write-fixtures",
+        action="store_true",
+        help=f"regenerate the fixture files in {FIXTURES} and exit",
+    )
+    args = parser.parse_args(argv)
+
+    if args.write_fixtures:
+        rows = portfolio_rows(
+            random.Random(args.seed), 120, transactions_per_security=20
+        )
+        FIXTURES.mkdir(exist_ok=True)
+        write_files(rows, FIXTURES)
+        print(f"Wrote {len(rows)} transactions in each format to {FIXTURES}")
+        return 0
+
+    print("Fixtures")
+    failures = compare_formats(FIXTURES)
+    print("Synthetic portfolio")
+    rows = portfolio_rows(random.Random(args.seed), args.transactions)
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(rows, Path(directory))
+        failures += compare_formats(Path(directory))
+
+    if failures:
+        print(f"Mismatches: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
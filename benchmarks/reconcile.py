@@ -0,0 +1,111 @@
+#! /usr/bin/env python
+"""
+Reconciliation microbenchmarks
+
+Each branch of reconciliation (part of a purchase, more than a purchase and
+exactly a purchase) is timed with the frozen reference implementation, which
+builds a residual purchase, a residual sale and a disposal from Money, and with
+the lot kernel, which updates plain Decimals in place. The units and amounts
+of every disposal and residual must agree.
+
+Run with: python -m benchmarks.reconcile
+"""
+# Standard library imports
+import sys
+import timeit
+from argparse import ArgumentParser
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Sequence, Tuple
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report.reconcile import Lot, reconcile_lots
+from uk_tax_report.transactions import Purchase, Sale
+
+from . import reference
+
+BRANCHES: Dict[str, Tuple[str, str]] = {
+    "partial sale": ("300", "120"),
+    "over-sale": ("120", "300"),
+    "exact match": ("300", "300"),
+}
+
+
+def pair(purchase_units: str, sale_units: str) -> Tuple[Purchase, Sale]:
+    """Purchase and sale with the given numbers of units"""
+    purchase = Purchase(
+        datetime(2020, 1, 10), GBP, Decimal(purchase_units), "4521.37", "9.95", "22.6"
+    )
+    sale = Sale(datetime(2020, 1, 3), GBP, Decimal(sale_units), "4879.02", "9.95", "0")
+    return purchase, sale
+
+
+def as_lots(purchase: Purchase, sale: Sale) -> Tuple[Lot, Lot]:
+    """Lots for a purchase and a sale"""
+    return Lot.from_transaction(purchase), Lot.from_transaction(sale)
+
+
+def amounts(purchase: Lot, sale: Lot, disposal: Tuple[Decimal, ...]) -> tuple:
+    """Units and amounts of the residual lots and the disposal"""
+    return tuple(
+        (lot.units, lot.subtotal, lot.fees, lot.taxes) for lot in (purchase, sale)
+    ) + (disposal,)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time each branch both ways, and fail if the results differ"""
+    parser = ArgumentParser(description="Reconciliation microbenchmarks")
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=20000, help="calls to time per branch"
+    )
+    args = parser.parse_args(argv)
+
+    failures = []
+    for branch, units in BRANCHES.items():
+        purchase, sale = pair(*units)
+
+        # Check that both implementations give the same results
+        purchase_, sale_, disposal = reference.reconcile(purchase, sale)
+        expected = amounts(
+            *as_lots(purchase_, sale_),
+            (
+                disposal.units,
+                disposal.purchase_total.amount,
+                disposal.purchase_fees.amount,
+                disposal.purchase_taxes.amount,
+                disposal.sale_total.amount,
+                disposal.sale_fees.amount,
+                disposal.sale_taxes.amount,
+            ),
+        )
+        purchase_lot, sale_lot = as_lots(purchase, sale)
+        actual = amounts(purchase_lot, sale_lot, reconcile_lots(purchase_lot, sale_lot))
+        if actual != expected:
+            failures.append(branch)
+
+        # Time each implementation, starting each lot kernel call from fresh lots
+        reference_time = timeit.timeit(
+            lambda p=purchase, s=sale: reference.reconcile(p, s), number=args.repeat
+        )
+        purchase_lot, sale_lot = as_lots(purchase, sale)
+        kernel_time = timeit.timeit(
+            lambda p=purchase_lot, s=sale_lot: reconcile_lots(p.copy(), s.copy()),
+            number=args.repeat,
+        )
+        print(
+            f"{branch:14} reference {reference_time / args.repeat * 1e6:6.1f} us"
+            f"   lots {kernel_time / args.repeat * 1e6:6.1f} us"
+            f"   ({reference_time / kernel_time:.1f}x)"
+        )
+
+    if failures:
+        print(f"Mismatches: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Frozen reference engine for resolving transactions
+
+This is a snapshot of the resolution algorithm in Security, reconcile and
+PooledPurchase, without the logging and input validation, kept so that
+optimised engines can be checked against it. Do not change its behaviour:
+any change here would hide a regression.
+"""
+# Standard library imports
+import copy
+from datetime import timedelta
+from typing import List, Tuple
+
+# Third-party imports
+from moneyed import Currency
+
+# Local imports
+from uk_tax_report.transactions import (
+    BedAndBreakfast,
+    Disposal,
+    ExcessReportableIncome,
+    Purchase,
+    Sale,
+    Transaction,
+)
+
+Event = Tuple[Transaction, Purchase]
+
+
+class ReferencePool(Purchase):
+    """Combination of several transactions"""
+
+    def __init__(self, currency: Currency, **kwargs):
+        kwargs["date_time"] = kwargs.get("date_time", "0001-01-01")
+        super().__init__(currency=currency, **kwargs)
+        self.type: str = "Pool"
+
+    def add_bed_and_breakfast(self, bed_and_breakfast: BedAndBreakfast) -> None:
+        """Add a bed-and-breakfast to the pool"""
+        self.datetime = max([self.datetime, bed_and_breakfast.datetime])
+        self.subtotal_ = self.subtotal + bed_and_breakfast.gain
+
+    def add_disposal(self, disposal: Disposal) -> None:
+        """Add a disposal to the pool"""
+        self.datetime = max([self.datetime, disposal.datetime])
+        self.units = self.units - disposal.units
+        self.subtotal_ = self.subtotal - disposal.purchase_total
+        self.fees = self.fees + disposal.fees
+        self.taxes = self.taxes + disposal.taxes
+
+    def add_eri(self, purchase: ExcessReportableIncome) -> None:
+        """Add excess reportable income to the pool"""
+        self.datetime = max([self.datetime, purchase.datetime])
+        self.subtotal_ = self.subtotal + purchase.subtotal
+        self.fees = self.fees + purchase.fees
+        self.taxes = self.taxes + purchase.taxes
+
+    def add_purchase(self, purchase: Purchase) -> None:
+        """Add a purchase to the pool"""
+        self.datetime = max([self.datetime, purchase.datetime])
+        self.units = self.units + purchase.units
+        self.subtotal_ = self.subtotal + purchase.subtotal
+        self.fees = self.fees + purchase.fees
+        self.taxes = self.taxes + purchase.taxes
+
+
+def exchange(purchases: List[Purchase], sale: Sale) -> Tuple[Purchase, Sale, Disposal]:
+    """Mark a sale as a direct exchange for a set of transactions"""
+    pool = ReferencePool(purchases[0].currency)
+    for transaction in purchases:
+        pool.add_purchase(transaction)
+    if pool.units != sale.units:
+        raise ValueError(
+            f"Unable to match pool with {pool.units} shares against exchange-sale with {sale.units}"
+        )
+    return reconcile(pool, sale)
+
+
+def reconcile(purchase: Purchase, sale: Sale) -> Tuple[Purchase, Sale, Disposal]:
+    """Reconcile a single purchase with a single sale"""
+    residual_units = abs(purchase.units - sale.units)
+    if purchase.units > sale.units:
+        sale_ = Sale(sale.datetime, sale.currency)
+        disposal = Disposal(
+            sale.datetime,
+            sale.currency,
+            sale.units,
+            purchase.unit_price_inc * sale.units,
+            purchase.unit_fees * sale.units,
+            purchase.unit_taxes * sale.units,
+            sale.total,
+            sale.fees,
+            sale.taxes,
+        )
+        f_residual = float(purchase.units - sale.units) / float(purchase.units)
+        purchase_residual_fees = f_residual * purchase.fees
+        purchase_residual_taxes = f_residual * purchase.taxes
+        residual_cost = (
+            purchase.total
+            - disposal.purchase_total
+            - purchase_residual_fees
+            - purchase_residual_taxes
+        )
+        purchase_ = Purchase(
+            purchase.datetime,
+            purchase.currency,
+            residual_units,
+            residual_cost,
+            purchase_residual_fees,
+            purchase_residual_taxes,
+        )
+    elif purchase.units < sale.units:
+        purchase_ = Purchase(purchase.datetime, purchase.currency)
+        disposal = Disposal(
+            sale.datetime,
+            sale.currency,
+            purchase.units,
+            purchase.total,
+            purchase.fees,
+            purchase.taxes,
+            sale.unit_price_inc * purchase.units,
+            sale.unit_fees * purchase.units,
+            sale.unit_taxes * purchase.units,
+        )
+        f_residual = float(sale.units - purchase.units) / float(sale.units)
+        sale_residual_fees = f_residual * sale.fees
+        sale_residual_taxes = f_residual * sale.taxes
+        residual_cost = (
+            sale.total
+            + disposal.purchase_total
+            - sale_residual_fees
+            - sale_residual_taxes
+        )
+        sale_ = Sale(
+            sale.datetime,
+            sale.currency,
+            residual_units,
+            residual_cost,
+            sale_residual_fees,
+            sale_residual_taxes,
+        )
+    else:
+        sale_ = Sale(sale.datetime, sale.currency)
+        purchase_ = Purchase(purchase.datetime, purchase.currency)
+        disposal = Disposal(
+            sale.datetime,
+            sale.currency,
+            purchase.units,
+            purchase.total,
+            purchase.fees,
+            purchase.taxes,
+            abs(sale.total),
+            sale.fees,
+            sale.taxes,
+        )
+    return purchase_, sale_, disposal
+
+
+def resolve(transactions: List[Transaction], currency: Currency) -> List[Event]:
+    """Resolve transactions into a date-ordered list of (transaction, pool) events"""
+    sorted_transactions = sorted(transactions, key=lambda t: t.datetime)
+    purchases = [t for t in sorted_transactions if isinstance(t, Purchase)]
+    sales = [t for t in sorted_transactions if isinstance(t, Sale)]
+    disposals = []
+
+    # HS285 exchanges are matched against the sum of all previous purchases
+    for idx_sale, sale in enumerate(sales):
+        if "exchange" not in sale.note.lower():
+            continue
+        previous = [p for p in purchases if p.date < sale.date]
+        _, sales[idx_sale], disposal = exchange(previous, sale)
+        disposals.append(disposal)
+
+    # HS284 matches each sale against every purchase in the following 30 days
+    for idx_sale, sale in enumerate(sales):
+        for idx_purchase, purchase in enumerate(purchases):
+            if sale.date <= purchase.date <= sale.date + timedelta(days=30):
+                purchases[idx_purchase], sales[idx_sale], disposal = reconcile(
+                    purchase, sale
+                )
+                disposals.append(BedAndBreakfast(disposal))
+
+    # Each remaining sale is a disposal against the Section 104 pool
+    events = []
+    pool = ReferencePool(currency)
+    for transaction in sorted(purchases + sales + disposals, key=lambda t: t.datetime):
+        pool = copy.deepcopy(pool)
+        if isinstance(transaction, ExcessReportableIncome):
+            pool.add_eri(transaction)
+        elif isinstance(transaction, Purchase):
+            pool.add_purchase(transaction)
+        elif isinstance(transaction, BedAndBreakfast):
+            pool.add_bed_and_breakfast(transaction)
+        elif isinstance(transaction, Disposal):
+            pool.add_disposal(transaction)
+        else:
+            _, sale, transaction = reconcile(pool, transaction)
+            if sale.total:
+                raise ValueError(f"Found an unexpected Sale {sale}")
+            pool.add_disposal(transaction)
+        events.append((transaction, pool))
+    return events
@@ -0,0 +1,201 @@
+#! /usr/bin/env python
+"""
+Asymptotic scaling regression harness
+
+Each stage of the calculator is run several times at growing input sizes,
+and a power law is fitted to its best run times at the largest sizes, where
+the leading term dominates. A stage fails if it grows clearly faster than n log n, which
+catches accidental quadratic behaviour such as a per-row findall or a nested
+matching loop.
+
+Run with: python -m benchmarks.scaling
+"""
+# Standard library imports
+import logging
+import math
+import random
+import sys
+import tempfile
+import timeit
+from argparse import ArgumentParser
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report import Account, Security
+from uk_tax_report.readers import XmlDataFile
+from uk_tax_report.readers.xml_utils import read_xml
+
+from .synthetic import portfolio_rows, security_history, to_transactions, write_xml
+
+DEFAULT_SIZES = [250, 500, 1000, 2000, 4000]
+FITTED_SIZES = 4
+
+
+class Stages:
+    """Set up each stage of the calculator for a given input size"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.accounts_: Dict[int, List[Account]] = {}
+
+    def xml_file(self, n_transactions: int) -> str:
+        """Synthetic portfolio with n transactions spread over many accounts"""
+        file_name = self.directory / f"portfolio-{n_transactions}.xml"
+        if not file_name.exists():
+            rows = portfolio_rows(random.Random(n_transactions), n_transactions)
+            write_xml(rows, file_name)
+        return str(file_name)
+
+    def accounts(self, n_transactions: int) -> List[Account]:
+        """Resolved accounts for the synthetic portfolio"""
+        if n_transactions not in self.accounts_:
+            data = XmlDataFile(self.xml_file(n_transactions))
+            self.accounts_[n_transactions] = [
+                Account(name, "GBP", data) for name in sorted(data.account_names)
+            ]
+            for account in self.accounts_[n_transactions]:
+                for security in account.securities:
+                    security.resolve_transactions()
+        return self.accounts_[n_transactions]
+
+    def read_xml(self, n_transactions: int) -> Callable:
+        """Parse the XML file into a transaction table"""
+        file_name = self.xml_file(n_transactions)
+        return lambda: read_xml(file_name)
+
+    def load_accounts(self, n_transactions: int) -> Callable:
+        """Build and resolve every account in a data file"""
+        data = XmlDataFile(self.xml_file(n_transactions))
+
+        def run():
+            # Every run groups and indexes the table again, as for a new data file
+            data.indices_, data.securities_ = None, None
+            accounts = [Account(name, "GBP", data) for name in data.account_names]
+            return [s.events for account in accounts for s in account.securities]
+
+        return run
+
+    @staticmethod
+    def resolve(n_transactions: int) -> Callable:
+        """Resolve a single security with a long history"""
+        # Short gaps keep long histories within the range of pandas timestamps
+        rows = security_history(
+            random.Random(n_transactions), n_transactions, gaps=[0, 1, 2, 5, 9, 14]
+        )
+        transactions = to_transactions(rows, GBP)
+
+        def run():
+            security = Security("SYM", "Security", GBP)
+            security.add_transactions(list(transactions))
+            return security.events
+
+        return run
+
+    def report(self, n_transactions: int) -> Callable:
+        """Report a tax year for every account"""
+        accounts = self.accounts(n_transactions)
+        start_date, end_date = date(2006, 4, 6), date(2007, 4, 5)
+        return lambda: [
+            account.report(start_date, end_date, include_non_taxable=True)
+            for account in accounts
+        ]
+
+    def combine(self, n_transactions: int) -> Callable:
+        """Combine every account into a single account and resolve it"""
+        accounts = self.accounts(n_transactions)
+
+        def run():
+            combined = sum(accounts, start=Account("Combined", "GBP"))
+            return [security.events for security in combined.securities]
+
+        return run
+
+    def all(self) -> Dict[str, Callable]:
+        """All stages by name"""
+        return {
+            "read_xml": self.read_xml,
+            "load_accounts": self.load_accounts,
+            "resolve": self.resolve,
+            "report": self.report,
+            "combine": self.combine,
+        }
+
+
+def growth_exponent(sizes: Sequence[float], times: Sequence[float]) -> float:
+    """Least-squares exponent b in times ~ a * sizes^b"""
+    log_sizes = [math.log(s) for s in sizes]
+    log_times = [math.log(t) for t in times]
+    x_mean = sum(log_sizes) / len(log_sizes)
+    y_mean = sum(log_times) / len(log_times)
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(log_sizes, log_times)) / sum(
+        (x - x_mean) ** 2 for x in log_sizes
+    )
+
+
+def n_log_n_exponent(sizes: Sequence[float]) -> float:
+    """Apparent power-law exponent of n log n over these sizes"""
+    return growth_exponent(sizes, [s * math.log(s) for s in sizes])
+
+
+def time_stage(setup: Callable, sizes: Sequence[int], repeat: int) -> List[float]:
+    """Best run time of a stage at each size, so that a single slow run cannot skew the fit"""
+    times = []
+    for n_transactions in sizes:
+        timer = timeit.Timer(setup(n_transactions))
+        times.append(min(timer.repeat(repeat, 1)))
+    return times
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time each stage and fail if any grows faster than n log n"""
+    parser = ArgumentParser(description="Asymptotic scaling regression harness")
+    parser.add_argument(
+        "-n", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="input sizes"
+    )
+    parser.add_argument("-s", "--stages", type=str, nargs="+", help="stages to run")
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="timing repeats at each size"
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="allowed excess over the n log n growth exponent",
+    )
+    args = parser.parse_args(argv)
+
+    # The report stage logs at INFO level, which would swamp the output
+    logging.disable(logging.CRITICAL)
+    fitted = slice(-FITTED_SIZES, None)
+    limit = n_log_n_exponent(args.sizes[fitted]) + args.tolerance
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        stages = Stages(directory).all()
+        for name in args.stages or stages:
+            times = time_stage(stages[name], args.sizes, args.repeat)
+            exponent = growth_exponent(args.sizes[fitted], times[fitted])
+            status = "ok" if exponent <= limit else "FAIL"
+            if exponent > limit:
+                failures.append(name)
+            timings = " ".join(f"{t * 1000:9.1f}" for t in times)
+            print(
+                f"{name:14s} {timings} ms  exponent {exponent:5.2f}  {status}",
+                flush=True,
+            )
+    logging.disable(logging.NOTSET)
+
+    print(f"Limit on growth exponent: {limit:.2f} (n log n plus {args.tolerance})")
+    if failures:
+        print(f"Stages growing faster than n log n: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
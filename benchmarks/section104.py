@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+"""
+Section 104 pool engine benchmark
+
+Random histories in which no sale is matched against a later purchase are
+resolved by adding each transaction to the pool in turn, and by the engine
+which accumulates runs of purchases as running totals. The time taken by each
+is compared, and every event and pool state must be identical, down to the
+exponent of each Decimal.
+
+Run with: python -m benchmarks.section104
+"""
+# Standard library imports
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from typing import List, Sequence, Tuple
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report import Security, section104
+from uk_tax_report.transactions import PooledPurchase, Purchase, Sale, Transaction
+
+from .equivalence import PROFILES, first_difference
+from .synthetic import security_history, to_transactions
+
+
+def exact(events: List[Tuple[Transaction, PooledPurchase]]) -> List[tuple]:
+    """Every attribute of every event and pool state, with Decimals as tuples"""
+    return [
+        tuple(
+            (key, value.as_tuple() if hasattr(value, "as_tuple") else repr(value))
+            for item in event
+            for key, value in sorted(vars(item).items())
+        )
+        for event in events
+    ]
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time both pool engines, and fail if any event differs"""
+    parser = ArgumentParser(description="Section 104 pool engine benchmark")
+    parser.add_argument(
+        "-n", "--histories", type=int, default=200, help="number of histories"
+    )
+    parser.add_argument(
+        "-t",
+        "--transactions",
+        type=int,
+        default=500,
+        help="number of transactions in each history",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    actions, gaps, _ = PROFILES["unmatched"]
+    histories = []
+    for idx in range(args.histories):
+        rows = security_history(
+            random.Random(args.seed + idx),
+            args.transactions,
+            actions=actions,
+            gaps=gaps,
+        )
+        transactions = sorted(
+            [t for t in to_transactions(rows, GBP) if isinstance(t, (Purchase, Sale))],
+            key=lambda t: t.datetime,
+        )
+        histories.append(transactions)
+
+    security = Security("SYM", "Security", GBP)
+    start_time = time.perf_counter()
+    expected = [
+        security.pool_events(list(history), PooledPurchase(GBP))
+        for history in histories
+    ]
+    event_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    actual = [
+        section104.pool_events(list(history), PooledPurchase(GBP), GBP)
+        for history in histories
+    ]
+    total_time = time.perf_counter() - start_time
+    print(f"{'event by event':15} {event_time:6.2f}s")
+    print(f"{'running totals':15} {total_time:6.2f}s  ({event_time / total_time:.1f}x)")
+
+    failures = [
+        f"History {idx} differs at {first_difference(exact(e), exact(a))}"
+        for idx, (e, a) in enumerate(zip(expected, actual))
+        if exact(e) != exact(a)
+    ]
+    for failure in failures[:10]:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
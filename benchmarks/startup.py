@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+"""
+Start-up time benchmark
+
+Each command is run in a fresh interpreter and timed. The core engine must be
+importable without pandas, which is only loaded when a file is read.
+
+Run with: python -m benchmarks.startup
+"""
+# Standard library imports
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+COMMANDS = {
+    "interpreter": ["-c", "pass"],
+    "import engine": ["-c", "import uk_tax_report"],
+    "import pandas": ["-c", "import pandas"],
+    "process --help": ["process.py", "--help"],
+    "batch --help": ["batch.py", "--help"],
+    "simulate --help": ["simulate.py", "--help"],
+}
+# Modules that must be importable without pulling in pandas
+LIGHT_MODULES = [
+    "uk_tax_report",
+    "uk_tax_report.batch",
+    "uk_tax_report.readers",
+    "uk_tax_report.reconcile",
+    "uk_tax_report.security",
+    "uk_tax_report.transactions",
+]
+
+
+def time_command(arguments: List[str], repeat: int) -> float:
+    """Best wall-clock time to run a Python command in a fresh interpreter"""
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *arguments],
+            cwd=ROOT,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def imports_pandas(module: str) -> bool:
+    """Whether importing a module in a fresh interpreter also imports pandas"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; sys.exit('pandas' in sys.modules)",
+        ],
+        cwd=ROOT,
+        check=False,
+    )
+    return result.returncode != 0
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time start-up and fail if the core engine imports pandas"""
+    parser = ArgumentParser(description="Start-up time benchmark")
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="timing repeats for each command"
+    )
+    args = parser.parse_args(argv)
+
+    for name, arguments in COMMANDS.items():
+        print(f"{name:16s} {time_command(arguments, args.repeat) * 1000:8.1f} ms")
+    failures = [module for module in LIGHT_MODULES if imports_pandas(module)]
+    if failures:
+        print(f"Modules importing pandas at start-up: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+"""
+Streaming resolution benchmark
+
+A long history for a single security is summarised for its last tax year,
+once from the events kept by Security and once from streamed events that are
+summarised as they are resolved. The peak memory used by resolution and the
+time taken are compared, and both summaries must be identical.
+
+Run with: python -m benchmarks.streaming
+"""
+# Standard library imports
+import random
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from typing import Callable, Sequence, Tuple
+
+# Third-party imports
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report import Security
+from uk_tax_report.converters import as_tax_year
+from uk_tax_report.streaming import stream_periods
+
+from .synthetic import security_history, to_transactions
+
+
+def measure(run: Callable) -> Tuple[object, float, float]:
+    """Result, peak memory in MiB and time in seconds of a function"""
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20, elapsed
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Compare peak memory when keeping and streaming events, and fail if they differ"""
+    parser = ArgumentParser(description="Streaming resolution benchmark")
+    parser.add_argument(
+        "-n", "--transactions", type=int, default=20000, help="number of transactions"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    rows = security_history(random.Random(args.seed), args.transactions)
+    transactions = to_transactions(rows, GBP)
+    last_year = max(t.date for t in transactions).year
+    start_date, end_date = as_tax_year(f"{last_year - 1}-{last_year}")
+
+    def kept() -> dict:
+        security = Security("SYM", "Security", GBP)
+        security.add_transactions(transactions)
+        return security.summary(start_date, end_date)
+
+    def streamed() -> dict:
+        security = Security("SYM", "Security", GBP)
+        security.add_transactions(transactions)
+        (events,) = stream_periods(security, [(start_date, end_date)])
+        return security.summary(start_date, end_date, events)
+
+    expected, kept_peak, kept_time = measure(kept)
+    actual, streamed_peak, streamed_time = measure(streamed)
+    print(f"{'kept events':16} {kept_peak:8.1f} MiB {kept_time:6.2f}s")
+    print(
+        f"{'streamed events':16} {streamed_peak:8.1f} MiB {streamed_time:6.2f}s"
+        f"  ({kept_peak / streamed_peak:.1f}x less memory)"
+    )
+    if actual != expected:
+        print("The summaries differ")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
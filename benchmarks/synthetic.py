@@ -0,0 +1,467 @@
+"""Generate synthetic but valid Portfolio Performance trade histories"""
+# Standard library imports
+import csv
+import math
+import random
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+# Third-party imports
+from moneyed import Currency
+
+# Local imports
+from uk_tax_report.transactions import (
+    Dividend,
+    ExcessReportableIncome,
+    Purchase,
+    Sale,
+    ScripDividend,
+    Transaction,
+)
+
+COLUMNS = [
+    "Date",
+    "Type",
+    "Security",
+    "Shares",
+    "Amount",
+    "Fees",
+    "Taxes",
+    "Cash Account",
+    "ISIN",
+    "Symbol",
+    "Note",
+]
+GAPS = [0, 1, 2, 5, 9, 20, 31, 45, 90]
+PENNY = Decimal("0.01")
+ACTIONS = {
+    "buy": 10,
+    "sell": 5,
+    "sell_all": 1,
+    "same_day": 2,
+    "bed_and_breakfast": 2,
+    "dividend": 3,
+    "eri": 1,
+    "scrip_dividend": 1,
+    "exchange": 1,
+}
+
+
+def _money(rng: random.Random, low: float, high: float) -> Decimal:
+    """Random amount of money rounded to the nearest penny"""
+    return Decimal(str(rng.uniform(low, high))).quantize(PENNY)
+
+
+def _units(rng: random.Random, high: Decimal, fractional: bool) -> Decimal:
+    """Random number of units between zero and high (inclusive)"""
+    if fractional and rng.random() < 0.2:
+        return max(
+            Decimal("0.001"),
+            (high * Decimal(str(rng.random()))).quantize(Decimal("0.001")),
+        )
+    if high < 1:
+        return high
+    return Decimal(rng.randint(1, int(high)))
+
+
+def security_history(
+    rng: random.Random,
+    n_transactions: int,
+    start_date: date = date(2005, 1, 3),
+    actions: Dict[str, int] = None,
+    fractional: bool = True,
+    gaps: List[int] = None,
+    overlaps: bool = False,
+) -> List[Dict]:
+    """
+    Generate rows for a single security.
+
+    Holdings never go negative. Unless overlaps is set, the resolution engine
+    can handle every history: HS285 exchanges are only generated before any
+    sale or ERI, because the exchange logic matches the sale against every
+    earlier purchase, and each sale has at most one purchase (including scrip
+    dividends and ERIs) in the 30 days that follow it, because HS284 matching
+    reconciles every purchase in that window against the whole sale. With
+    overlaps, sales may have several purchases in that window and exchanges
+    may follow disposals and ERIs, selling every unit purchased so far as the
+    exchange logic expects. The engine rejects some of these histories, for
+    example when matching leaves too few units for a later sale. Rows are
+    returned in date order and contain the keys Date, Type, Shares, Amount,
+    Fees, Taxes and Note. Successive rows are separated by a number of days
+    drawn from gaps.
+    """
+    weights = dict(ACTIONS if actions is None else actions)
+    rows: List[Dict] = []
+    day = start_date
+    price = _money(rng, 1, 50)
+    held = Decimal(0)
+    purchased = Decimal(0)
+    can_exchange = True
+    open_sales: List[List] = []
+    purchase_days: Dict[date, int] = {}
+
+    def can_purchase(on_date: date) -> bool:
+        """Whether a purchase on this date would be the only match for recent sales"""
+        if overlaps:
+            return True
+        open_sales[:] = [s for s in open_sales if (on_date - s[0]).days <= 30]
+        return not any(matched for _, matched in open_sales)
+
+    def add(type_, units, amount, note="", fees=None, taxes=None):
+        nonlocal purchased
+        rows.append(
+            {
+                "Date": day,
+                "Type": type_,
+                "Shares": units,
+                "Amount": amount.quantize(PENNY),
+                "Fees": _money(rng, 0, 12) if fees is None else fees,
+                "Taxes": _money(rng, 0, 3) if taxes is None else taxes,
+                "Note": note,
+            }
+        )
+        if type_ == "Sell":
+            open_sales.append([day, day in purchase_days])
+        elif type_ == "Buy" or note:
+            # ERIs count as purchases when an exchange is matched
+            purchased += units
+            purchase_days[day] = purchase_days.get(day, 0) + 1
+            for sale in open_sales:
+                sale[1] = True
+
+    while len(rows) < n_transactions:
+        day += timedelta(days=rng.choice(gaps or GAPS))
+        drift = Decimal(str(rng.uniform(0.9, 1.1 if price < 500 else 1.0)))
+        price = max(PENNY, (price * drift).quantize(Decimal("0.0001")))
+        action = rng.choices(list(weights), list(weights.values()))[0]
+        if not held and action != "buy":
+            action = "buy"
+        if action in ("buy", "eri", "scrip_dividend") and not can_purchase(day):
+            continue
+        if (
+            action in ("sell", "sell_all")
+            and purchase_days.get(day, 0) > 1
+            and not overlaps
+        ):
+            continue
+        if (
+            action in ("same_day", "bed_and_breakfast")
+            and (not can_purchase(day) or open_sales or day in purchase_days)
+            and not overlaps
+        ):
+            continue
+        if action == "buy":
+            units = _units(rng, Decimal(200), fractional)
+            add("Buy", units, units * price)
+            held += units
+        elif action in ("sell", "sell_all"):
+            units = held if action == "sell_all" else _units(rng, held, fractional)
+            add("Sell", units, units * price)
+            held -= units
+            can_exchange = False
+        elif action in ("same_day", "bed_and_breakfast"):
+            units = _units(rng, held, fractional)
+            add("Sell", units, units * price)
+            if action == "bed_and_breakfast":
+                day += timedelta(days=rng.randint(1, 30))
+            add("Buy", units, units * price * Decimal("1.01"))
+            can_exchange = False
+        elif action in ("dividend", "eri"):
+            note = "Excess reportable income" if action == "eri" else ""
+            add("Dividend", held, held * price / 50, note, PENNY * 0, PENNY * 0)
+            can_exchange = can_exchange and not note
+        elif action == "scrip_dividend":
+            units = _units(rng, held / 20 + 1, fractional)
+            add("Buy", units, PENNY * 0, "Scrip dividend", PENNY * 0, PENNY * 0)
+            held += units
+        elif action == "exchange" and (can_exchange or overlaps):
+            # The exchange-sale must be strictly after every pooled purchase
+            day += timedelta(days=1)
+            units = purchased if overlaps else held
+            add("Sell", units, units * price, "Exchange", PENNY * 0, PENNY * 0)
+            new_units = (units * Decimal(rng.choice(["0.5", "2", "10"]))).quantize(
+                Decimal("0.001")
+            )
+            add("Buy", new_units, units * price, "", PENNY * 0, PENNY * 0)
+            # The pool loses every unit exchanged, including any already sold
+            held = max(Decimal(0), held + new_units - units)
+            can_exchange = False
+    return rows[:n_transactions]
+
+
+def portfolio_rows(
+    rng: random.Random,
+    n_transactions: int,
+    transactions_per_security: int = 40,
+    securities_per_account: int = 4,
+) -> List[Dict]:
+    """Generate rows in the CSV export format for a portfolio of several accounts"""
+    rows = []
+    n_securities = max(1, n_transactions // transactions_per_security)
+    for idx in range(n_securities):
+        account = f"Account {idx // securities_per_account:04d}"
+        for row in security_history(rng, transactions_per_security):
+            row.update(
+                {
+                    "Security": f"Security {idx:05d}",
+                    "Cash Account": account,
+                    "ISIN": f"GB{idx:010d}",
+                    "Symbol": f"S{idx:05d}",
+                }
+            )
+            rows.append(row)
+    return rows
+
+
+def price_history(
+    rng: random.Random, start_date: date, end_date: date
+) -> List[Tuple[date, Decimal]]:
+    """Random walk of weekday closing prices between two dates (inclusive)"""
+    prices = []
+    price = rng.uniform(1, 100)
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        if day.weekday() < 5:
+            price *= math.exp(rng.gauss(0, 0.01))
+            prices.append((day, Decimal(str(round(price, 4)))))
+    return prices
+
+
+def to_transactions(rows: List[Dict], currency: Currency) -> List[Transaction]:
+    """Convert rows into the transactions that DataFile.get_transaction_list would produce"""
+    transactions = []
+    for row in rows:
+        date_time = datetime.combine(row["Date"], datetime.min.time())
+        note = row["Note"].lower()
+        args = (date_time, currency, row["Shares"])
+        charges = (row["Fees"], row["Taxes"], row["Note"])
+        if row["Type"] == "Buy" and note == "scrip dividend":
+            transactions.append(ScripDividend(*args, 0, *charges))
+        elif row["Type"] == "Buy":
+            transactions.append(Purchase(*args, row["Amount"], *charges))
+        elif row["Type"] == "Sell":
+            transactions.append(Sale(*args, row["Amount"], *charges))
+        elif note == "excess reportable income":
+            transactions.append(ExcessReportableIncome(*args, row["Amount"]))
+        elif row["Type"] == "Dividend":
+            transactions.append(Dividend(*args, row["Amount"], *charges))
+    return transactions
+
+
+def write_csv(rows: List[Dict], file_name: str) -> None:
+    """Write rows in the format produced by All transactions > Export"""
+    with open(file_name, "w", newline="", encoding="utf-8") as f_csv:
+        writer = csv.DictWriter(f_csv, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(
+                {
+                    **row,
+                    "Shares": f"{row['Shares']:,}",
+                    "Amount": f"{row['Amount']:,}",
+                }
+            )
+
+
+def write_xml(
+    rows: List[Dict],
+    file_name: str,
+    currency: str = "GBP",
+    prices: Dict[str, List[Tuple[date, Decimal]]] = None,
+) -> None:
+    """Write rows as a Portfolio Performance XML file, with optional prices by security"""
+    client = ET.Element("client")
+    ET.SubElement(client, "version").text = "56"
+    ET.SubElement(client, "baseCurrency").text = currency
+    securities = ET.SubElement(client, "securities")
+    accounts = ET.SubElement(client, "accounts")
+    portfolios = ET.SubElement(client, "portfolios")
+    security_index: Dict[str, int] = {}
+    containers: Dict[str, tuple] = {}
+
+    for row in rows:
+        if row["Security"] not in security_index:
+            security_index[row["Security"]] = len(security_index) + 1
+            security = ET.SubElement(securities, "security")
+            ET.SubElement(security, "uuid").text = f"s-{len(security_index)}"
+            ET.SubElement(security, "name").text = row["Security"]
+            ET.SubElement(security, "currencyCode").text = currency
+            ET.SubElement(security, "isin").text = row["ISIN"]
+            ET.SubElement(security, "tickerSymbol").text = row["Symbol"]
+            if prices and row["Security"] in prices:
+                history = ET.SubElement(security, "prices")
+                for day, price in prices[row["Security"]]:
+                    ET.SubElement(
+                        history, "price", t=day.isoformat(), v=str(int(price * 10**8))
+                    )
+        if row["Cash Account"] not in containers:
+            index = len(containers) + 1
+            account = ET.SubElement(accounts, "account")
+            ET.SubElement(account, "uuid").text = f"a-{index}"
+            ET.SubElement(account, "name").text = row["Cash Account"]
+            ET.SubElement(account, "currencyCode").text = currency
+            portfolio = ET.SubElement(portfolios, "portfolio")
+            ET.SubElement(portfolio, "uuid").text = f"p-{index}"
+            ET.SubElement(portfolio, "name").text = row["Cash Account"]
+            ET.SubElement(
+                portfolio,
+                "referenceAccount",
+                reference=f"../../../accounts/account[{index}]",
+            )
+            containers[row["Cash Account"]] = (
+                ET.SubElement(account, "transactions"),
+                ET.SubElement(portfolio, "transactions"),
+            )
+
+        account_transactions, portfolio_transactions = containers[row["Cash Account"]]
+        charges = row["Fees"] + row["Taxes"]
+        if row["Type"] == "Buy":
+            type_, amount = "BUY", row["Amount"] + charges
+            transaction = ET.SubElement(portfolio_transactions, "portfolio-transaction")
+        elif row["Type"] == "Sell":
+            type_, amount = "SELL", row["Amount"] - charges
+            transaction = ET.SubElement(portfolio_transactions, "portfolio-transaction")
+        else:
+            type_, amount = "DIVIDENDS", row["Amount"] - charges
+            transaction = ET.SubElement(account_transactions, "account-transaction")
+        index = security_index[row["Security"]]
+        ET.SubElement(transaction, "date").text = f"{row['Date']:%Y-%m-%d}T00:00"
+        ET.SubElement(transaction, "currencyCode").text = currency
+        ET.SubElement(transaction, "amount").text = str(int(amount * 100))
+        ET.SubElement(
+            transaction,
+            "security",
+            reference="../../../../../securities/security"
+            + (f"[{index}]" if index > 1 else ""),
+        )
+        ET.SubElement(transaction, "shares").text = str(int(row["Shares"] * 10**8))
+        if row["Note"]:
+            ET.SubElement(transaction, "note").text = row["Note"]
+        units = ET.SubElement(transaction, "units")
+        for unit_type, value in (("FEE", row["Fees"]), ("TAX", row["Taxes"])):
+            if value:
+                unit = ET.SubElement(units, "unit", type=unit_type)
+                ET.SubElement(
+                    unit, "amount", currency=currency, amount=str(int(value * 100))
+                )
+        ET.SubElement(transaction, "type").text = type_
+
+    ET.ElementTree(client).write(file_name, encoding="UTF-8", xml_declaration=True)
+
+
+def _varint(value: int) -> bytes:
+    """Protobuf varint, with negative values as 64-bit two's complement"""
+    value &= (1 << 64) - 1
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _field(number: int, value) -> bytes:
+    """Protobuf field holding an integer, a string or a nested message"""
+    if isinstance(value, int):
+        # Like protobuf itself, leave out integers with their default value
+        return _varint(number << 3) + _varint(value) if value else b""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def write_portfolio(
+    rows: List[Dict],
+    file_name: str,
+    currency: str = "GBP",
+    prices: Dict[str, List[Tuple[date, Decimal]]] = None,
+    zipped: bool = False,
+) -> None:
+    """
+    Write rows as a Portfolio Performance binary file (optionally zipped), with
+    the same securities, accounts and portfolios as write_xml
+    """
+    epoch = date(1970, 1, 1)
+    securities, containers, transactions = {}, {}, []
+    for row in rows:
+        if row["Security"] not in securities:
+            uuid = f"s-{len(securities) + 1}"
+            history = b"".join(
+                _field(
+                    13, _field(1, (day - epoch).days) + _field(2, int(price * 10**8))
+                )
+                for day, price in (prices or {}).get(row["Security"], [])
+            )
+            securities[row["Security"]] = (
+                uuid,
+                _field(1, uuid)
+                + _field(3, row["Security"])
+                + _field(4, currency)
+                + _field(7, row["ISIN"])
+                + _field(8, row["Symbol"])
+                + history,
+            )
+        if row["Cash Account"] not in containers:
+            index = len(containers) + 1
+            containers[row["Cash Account"]] = (
+                index,
+                _field(1, f"a-{index}")
+                + _field(2, row["Cash Account"])
+                + _field(3, currency),
+                _field(1, f"p-{index}")
+                + _field(2, row["Cash Account"])
+                + _field(5, f"a-{index}"),
+            )
+
+        index = containers[row["Cash Account"]][0]
+        charges = row["Fees"] + row["Taxes"]
+        if row["Type"] == "Buy":
+            type_, amount = 0, row["Amount"] + charges
+        elif row["Type"] == "Sell":
+            type_, amount = 1, row["Amount"] - charges
+        else:
+            type_, amount = 8, row["Amount"] - charges
+        units = b"".join(
+            _field(15, _field(1, unit_type) + _field(2, int(value * 100)))
+            for unit_type, value in ((2, row["Fees"]), (1, row["Taxes"]))
+            if value
+        )
+        seconds = (row["Date"] - epoch).days * 86400
+        transactions.append(
+            _field(1, f"t-{len(transactions) + 1}")
+            + _field(2, type_)
+            + _field(3, f"a-{index}")
+            + (_field(4, f"p-{index}") if type_ != 8 else b"")
+            + _field(9, _field(1, seconds))
+            + _field(10, currency)
+            + _field(11, int(amount * 100))
+            + _field(12, int(row["Shares"] * 10**8))
+            + _field(13, row["Note"] or "")
+            + _field(14, securities[row["Security"]][0])
+            + units
+        )
+
+    client = b"".join(
+        [_field(1, 1)]
+        + [_field(2, security) for _, security in securities.values()]
+        + [_field(3, account) for _, account, _ in containers.values()]
+        + [_field(4, portfolio) for _, _, portfolio in containers.values()]
+        + [_field(5, transaction) for transaction in transactions]
+    )
+    data = b"PPPBV1" + client
+    if zipped:
+        with zipfile.ZipFile(file_name, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("data.portfolio", data)
+    else:
+        with open(file_name, "wb") as f_portfolio:
+            f_portfolio.write(data)
+
+
+def write_zipped_xml(rows: List[Dict], file_name: str, currency: str = "GBP") -> None:
+    """Write rows as a zipped Portfolio Performance XML file"""
+    with zipfile.ZipFile(file_name, "w", zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("data.xml", "w") as f_xml:
+            write_xml(rows, f_xml, currency)
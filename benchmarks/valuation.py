@@ -0,0 +1,141 @@
+#! /usr/bin/env python
+"""
+Price history and valuation benchmark
+
+A synthetic portfolio with daily prices is written as XML. The prices are
+streamed into arrays, saved and re-opened as memory-mapped files, and every
+holding is valued at each month end, first building arrays of the holdings
+of each security and then reusing them. The cost and value of the vectorised
+valuation are checked against valuing each security on each date with
+Security.pool_at.
+
+Run with: python -m benchmarks.valuation
+"""
+# Standard library imports
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from bisect import bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Sequence
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from uk_tax_report import Account
+from uk_tax_report.prices import PriceHistory
+from uk_tax_report.readers import XmlDataFile
+
+from .synthetic import portfolio_rows, price_history, write_xml
+
+START_DATE = date(2005, 1, 1)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time price ingestion and valuation, and fail if the valuations differ"""
+    parser = ArgumentParser(description="Price history and valuation benchmark")
+    parser.add_argument(
+        "-n", "--securities", type=int, default=50, help="number of securities"
+    )
+    parser.add_argument(
+        "-y", "--years", type=int, default=10, help="years of daily prices"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    end_date = date(START_DATE.year + args.years, 1, 1)
+    rows = portfolio_rows(rng, 40 * args.securities)
+    prices = {
+        name: price_history(rng, START_DATE, end_date)
+        for name in sorted({row["Security"] for row in rows})
+    }
+    month_ends = (
+        np.arange(
+            np.datetime64(f"{START_DATE:%Y-%m}") + 1,
+            np.datetime64(f"{end_date:%Y-%m}") + 1,
+            dtype="datetime64[M]",
+        ).astype("datetime64[D]")
+        - 1
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = Path(directory) / "portfolio.xml"
+        write_xml(rows, file_name, prices=prices)
+        size = file_name.stat().st_size / 2**20
+        print(f"Wrote {len(rows)} transactions and {len(prices)} price histories")
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        history = PriceHistory.from_xml(file_name)
+        elapsed = time.perf_counter() - start_time
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        print(
+            f"Read prices from {size:.1f} MB in {elapsed:.2f}s with a peak of {peak:.1f} MB"
+        )
+
+        history.save(Path(directory) / "prices")
+        mapped = PriceHistory.load(Path(directory) / "prices")
+        failures = [
+            name
+            for name in history.securities
+            if not np.array_equal(history.prices_[name], mapped.prices_[name])
+            or not np.array_equal(history.dates_[name], mapped.dates_[name])
+        ]
+
+        data = XmlDataFile(file_name)
+        securities = [
+            security
+            for name in sorted(data.account_names)
+            for security in Account(name, "GBP", data).securities
+        ]
+        for security in securities:
+            security.resolve_transactions()
+
+        start_time = time.perf_counter()
+        valuation = mapped.valuation(securities, month_ends)
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"Valued {len(securities)} securities at {len(month_ends)} month ends in {elapsed * 1000:.1f} ms"
+        )
+        start_time = time.perf_counter()
+        mapped.valuation(securities, month_ends)
+        elapsed = time.perf_counter() - start_time
+        print(f"Valued them again in {elapsed * 1000:.1f} ms, reusing their holdings")
+
+        # Value each security on each date in turn
+        start_time = time.perf_counter()
+        expected = np.zeros((2,) + month_ends.shape)
+        for security in securities:
+            days = [day for day, _ in prices[security.name]]
+            for idx, month_end in enumerate(month_ends.astype(date)):
+                pool = security.pool_at(month_end)
+                position = bisect_right(days, month_end)
+                # Holdings without a price yet are left out of the totals
+                if pool.units > 0 and not position:
+                    continue
+                expected[0, idx] += float(pool.total.amount)
+                if pool.units > 0:
+                    expected[1, idx] += float(pool.units) * float(
+                        prices[security.name][position - 1][1]
+                    )
+        elapsed = time.perf_counter() - start_time
+        print(f"Valued the same holdings one at a time in {elapsed * 1000:.1f} ms")
+
+    for idx, column in enumerate(["cost", "value"]):
+        if not np.allclose(valuation[column], expected[idx], rtol=1e-9, atol=1e-6):
+            failures.append(column)
+    if failures:
+        print(f"Mismatches: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#! /usr/bin/env python
+"""
+Watch mode benchmark
+
+A portfolio of many securities is summarised for its last tax year, and then
+a transaction of one security is edited, as when a file is changed while it
+is being watched. The edited portfolio is summarised again from scratch and
+after reusing the resolved events of every unchanged security. The time taken
+by each is compared, and both summaries must be identical.
+
+Run with: python -m benchmarks.watch
+"""
+# Standard library imports
+import random
+import sys
+import time
+from argparse import ArgumentParser
+from decimal import Decimal
+from typing import Sequence
+
+# Local imports
+from uk_tax_report.converters import as_tax_year
+from uk_tax_report.watch import carry_over
+
+from .cache import build_account
+from .synthetic import security_history
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time summarising an edited portfolio with and without reuse, and fail if they differ"""
+    parser = ArgumentParser(description="Watch mode benchmark")
+    parser.add_argument(
+        "-n", "--securities", type=int, default=100, help="number of securities"
+    )
+    parser.add_argument(
+        "-t",
+        "--transactions",
+        type=int,
+        default=500,
+        help="number of transactions for each security",
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    histories = [
+        security_history(random.Random(args.seed + idx), args.transactions)
+        for idx in range(args.securities)
+    ]
+    last_year = max(row["Date"] for rows in histories for row in rows).year
+    periods = [as_tax_year(f"{last_year - 1}-{last_year}")]
+    previous = build_account(histories)
+    previous.summaries(periods)
+
+    # Edit the fees of the last transaction of one security
+    edited = [dict(row) for row in histories[0]]
+    edited[-1]["Fees"] += Decimal("1.00")
+    histories = [edited] + histories[1:]
+
+    start_time = time.perf_counter()
+    expected = build_account(histories).summaries(periods)
+    fresh_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    account = build_account(histories)
+    changed = carry_over(previous, account)
+    actual = account.summaries(periods)
+    reused_time = time.perf_counter() - start_time
+    print(f"{'from scratch':14} {fresh_time:6.2f}s")
+    print(
+        f"{'reused':14} {reused_time:6.2f}s  ({fresh_time / reused_time:.1f}x,"
+        f" {len(changed)} of {len(account.securities)} securities changed)"
+    )
+    if actual != expected:
+        print("The summaries differ")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+"""
+XML backend benchmark
+
+A synthetic portfolio is written as XML and read with each XML backend: the
+standard library, and lxml with pre-compiled XPath when it is installed. The
+time taken by each is compared, and the transaction tables must be identical,
+both for the synthetic portfolio and for the XML fixture in benchmarks/fixtures.
+
+Run with: python -m benchmarks.xml_backends
+"""
+# Standard library imports
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Sequence
+
+# Local imports
+from uk_tax_report.readers.xml_backends import BACKENDS, get_backend
+from uk_tax_report.readers.xml_utils import read_xml
+
+from .portfolio import FIXTURES
+from .synthetic import portfolio_rows, write_xml
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Time reading XML with each backend, and fail if the tables differ"""
+    parser = ArgumentParser(description="XML backend benchmark")
+    parser.add_argument(
+        "-n", "--transactions", type=int, default=20000, help="number of transactions"
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    backends = []
+    for name in BACKENDS:
+        try:
+            get_backend(name)
+            backends.append(name)
+        except ImportError:
+            print(f"Skipping the {name} backend, which is not installed")
+
+    rows = portfolio_rows(random.Random(args.seed), args.transactions)
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = Path(directory) / "portfolio.xml"
+        write_xml(rows, file_name)
+        for path in (FIXTURES / "client.xml", file_name):
+            expected, expected_time = None, None
+            for name in backends:
+                start_time = time.perf_counter()
+                df_transactions = read_xml(path, backend=name)
+                elapsed = time.perf_counter() - start_time
+                if expected is None:
+                    expected, expected_time = df_transactions, elapsed
+                elif not df_transactions.equals(expected):
+                    failures.append(f"{path.name} ({name})")
+                print(
+                    f"{path.name:14} {name:6} {elapsed:6.2f}s"
+                    f"  ({expected_time / elapsed:.1f}x)"
+                )
+
+    if failures:
+        print(f"Mismatches: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,62 @@
 #! /usr/bin/env python
 """
 Process Portfolio Performance files
-  - XML files
   - CSV files generated by using: All transactions > Export
+  - XML files
+  - binary or zipped .portfolio files
+
+Several files of any of these formats can be merged into one portfolio.
 """
 # Standard library imports
 import logging
 from argparse import ArgumentParser
-from datetime import date
+from contextlib import suppress
 
 # Local imports
-from uk_tax_report import Account
-from uk_tax_report.readers import CsvDataFile, XmlDataFile
+from uk_tax_report import Account, readers
+from uk_tax_report.cache import ResolutionCache
+from uk_tax_report.converters import as_tax_year
+from uk_tax_report.ledger import Ledger
 
 if __name__ == "__main__":
     # Parse command line arguments
     parser = ArgumentParser()
-    group = parser.add_mutually_exclusive_group(required=True)
-    group.add_argument("-c", "--csv", type=str, help="CSV file to process")
-    group.add_argument("-x", "--xml", type=str, help="XML file to process")
+    parser.add_argument(
+        "-c", "--csv", type=str, nargs="+", default=[], help="CSV files to process"
+    )
+    parser.add_argument(
+        "-x", "--xml", type=str, nargs="+", default=[], help="XML files to process"
+    )
+    parser.add_argument(
+        "-p",
+        "--portfolio",
+        type=str,
+        nargs="+",
+        default=[],
+        help="binary or zipped files to process",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="number of files to read at once when merging several files",
+    )
+    parser.add_argument(
+        "--fingerprints-file",
+        type=str,
+        help="SQLite file to hold transaction fingerprints in when merging very large files",
+    )
+    parser.add_argument(
+        "-l",
+        "--ledger",
+        type=str,
+        help="SQLite ledger to add any CSV or XML transactions to and read from",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help="directory to keep resolved securities in, so that unchanged histories are not resolved again",
+    )
     parser.add_argument(
         "-a",
         "--all",
@@ -28,6 +66,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "-i", "--iso-currency", type=str, help="ISO currency code", default="GBP"
     )
+    parser.add_argument(
+        "-r",
+        "--fx-rates",
+        type=str,
+        help="CSV file of daily exchange rates for securities in other currencies",
+    )
     parser.add_argument(
         "-t",
         "--tax-year",
@@ -38,10 +82,51 @@ if __name__ == "__main__":
     parser.add_argument(
         "-n", "--account-names", type=str, nargs="+", help="accounts to consider"
     )
+    parser.add_argument(
+        "-s", "--security-names", type=str, nargs="+", help="securities to consider"
+    )
+    parser.add_argument(
+        "-e",
+        "--export",
+        type=str,
+        help="directory to write every resolved event and pool timeline to",
+    )
+    parser.add_argument(
+        "--export-format",
+        type=str,
+        choices=["parquet", "arrow"],
+        default="parquet",
+        help="file format for --export",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="report again whenever the input files change, until interrupted",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="seconds between checks for changes with --watch",
+    )
     parser.add_argument(
         "-v", "--verbosity", action="count", default=0, help="increase output verbosity"
     )
     args = parser.parse_args()
+    if not (args.csv or args.xml or args.portfolio or args.ledger):
+        parser.error(
+            "one of the arguments -c/--csv -x/--xml -p/--portfolio -l/--ledger is required"
+        )
+    if args.watch and (args.ledger or not (args.csv or args.xml or args.portfolio)):
+        parser.error("--watch requires input files and cannot be used with --ledger")
+
+    if args.export:
+        try:
+            # Exporting depends on the optional pyarrow package, so it is only imported when used
+            # pylint: disable=import-outside-toplevel
+            from uk_tax_report.export import EventExporter
+        except ImportError as exc:
+            parser.error(f"--export is unavailable. {exc}")
 
     # Set up logging
     log_levels = [logging.INFO, logging.DEBUG]
@@ -52,32 +137,121 @@ if __name__ == "__main__":
     )
 
     # Set start and end dates
-    try:
-        start_date = date(int(args.tax_year.split("-")[0]), 4, 6)
-        end_date = date(int(args.tax_year.split("-")[0]) + 1, 4, 5)
-    except AttributeError:
-        raise ValueError(
-            "Could not interpret '%s' as a UK tax year!"
-            % (args.tax_year if args.tax_year else "")
-        ) from None
+    start_date, end_date = as_tax_year(args.tax_year)
     logging.debug(f"Set start date ({start_date}) and end date ({end_date})")
 
-    if args.csv:
-        data = CsvDataFile(args.csv)
+    file_names = args.csv + args.xml + args.portfolio
+    ledger = Ledger(args.ledger) if args.ledger else None
+    cache = ResolutionCache(args.cache) if args.cache else None
 
-    elif args.xml:
-        data = XmlDataFile(args.xml)
+    def load_account() -> Account:
+        """Read the input files into a single account for the selected accounts and securities"""
+        # Only read the rows needed for this report, unless they are all added to a ledger
+        filters = (
+            {}
+            if args.ledger
+            else {
+                "account_names": args.account_names,
+                "security_names": args.security_names,
+                "end_date": end_date,
+            }
+        )
+        data = None
+        if len(file_names) > 1:
+            # Several files are read concurrently and merged, choosing each reader from its extension
+            data = readers.MergedDataFile(
+                file_names,
+                max_workers=args.workers,
+                fingerprints_file=args.fingerprints_file,
+                **filters,
+            )
 
-    # Load accounts
-    accounts = [Account(name, args.iso_currency, data) for name in data.account_names]
+        elif args.csv:
+            data = readers.CsvDataFile(args.csv[0], **filters)
 
-    # Generate reports
-    combined = sum(
-        [
-            account
-            for account in accounts
-            if (not args.account_names) or (account.name in args.account_names)
-        ],
-        start=Account("Taxable Accounts", args.iso_currency)
-    )
-    combined.report(start_date, end_date, include_non_taxable=args.all)
+        elif args.xml:
+            data = readers.XmlDataFile(args.xml[0], **filters)
+
+        elif args.portfolio:
+            data = readers.PortfolioDataFile(args.portfolio[0], **filters)
+
+        # Convert any amounts in other currencies
+        if data and args.fx_rates:
+            # Exchange rates depend on numpy, so they are only imported when used
+            # pylint: disable=import-outside-toplevel
+            from uk_tax_report.fx_rates import FxRates
+
+            converted = data.convert_currencies(
+                FxRates(args.fx_rates), args.iso_currency
+            )
+            logging.info(f"Converted {converted} transactions to {args.iso_currency}")
+        elif data and data.currencies - {args.iso_currency}:
+            logging.warning(
+                f"Treating amounts in {', '.join(sorted(data.currencies - {args.iso_currency}))} as {args.iso_currency}: use --fx-rates to convert them"
+            )
+
+        # Only securities with some activity in the tax year need to be considered, unless all are exported
+        if data and not (args.ledger or args.export):
+            n_read = data.df_transactions.shape[0]
+            logging.info(
+                f"Read {n_read} transactions for the selected accounts and securities, up to 30 days after the tax year"
+            )
+            data.filter_rows(
+                security_names=data.active_securities(start_date, end_date)
+            )
+            logging.info(
+                f"Kept {data.df_transactions.shape[0]} of them, for securities active in the tax year"
+            )
+
+        # Append any new transactions to the ledger and then read from it
+        if ledger:
+            if data:
+                logging.info(
+                    f"Added {ledger.append(data)} new transactions to the ledger"
+                )
+            data = readers.LedgerDataFile(ledger)
+
+        # Load every selected account into a single history for each security
+        account_names = sorted(
+            name
+            for name in data.account_names
+            if (not args.account_names) or (name in args.account_names)
+        )
+        combined = Account.combined(
+            "Taxable Accounts", args.iso_currency, data, account_names
+        )
+
+        if args.security_names:
+            combined.securities = [
+                security
+                for security in combined.securities
+                if {security.name, security.symbol} & set(args.security_names)
+            ]
+        if ledger:
+            ledger.resolve(account_names, combined.securities)
+        elif cache:
+            cache.attach(combined.securities)
+        return combined
+
+    def report(combined: Account) -> None:
+        """Report the tax year, exporting events if requested"""
+        combined.report(start_date, end_date, include_non_taxable=args.all)
+
+        # Export events for analysis in other tools
+        if args.export:
+            with EventExporter.in_directory(
+                args.export, file_format=args.export_format
+            ) as exporter:
+                exporter.add_account(combined)
+            logging.info(f"Exported {exporter.n_events} events to {args.export}")
+
+    # Report once, or again whenever the input files change
+    if args.watch:
+        # Watching depends on the service module, so it is only imported when used
+        # pylint: disable=import-outside-toplevel
+        from uk_tax_report.watch import watch
+
+        with suppress(KeyboardInterrupt):
+            watch(file_names, load_account, report, args.watch_interval)
+    else:
+        report(load_account())
@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+"""
+Serve queries against Portfolio Performance files kept resolved in memory
+  - XML files
+  - CSV files generated by using: All transactions > Export
+"""
+# Standard library imports
+import logging
+from argparse import ArgumentParser
+
+# Local imports
+from uk_tax_report.fx_rates import FxRates
+from uk_tax_report.service import PortfolioStore, QueryServer
+
+if __name__ == "__main__":
+    # Parse command line arguments
+    parser = ArgumentParser()
+    parser.add_argument("files", type=str, nargs="+", help="CSV or XML files to serve")
+    parser.add_argument(
+        "-i", "--iso-currency", type=str, help="ISO currency code", default="GBP"
+    )
+    parser.add_argument(
+        "-r",
+        "--fx-rates",
+        type=str,
+        help="CSV file of daily exchange rates for securities in other currencies",
+    )
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="address to listen on"
+    )
+    parser.add_argument("-p", "--port", type=int, default=8000, help="port to use")
+    parser.add_argument(
+        "-v", "--verbosity", action="count", default=0, help="increase output verbosity"
+    )
+    args = parser.parse_args()
+
+    # Set up logging
+    log_levels = [logging.INFO, logging.DEBUG]
+    logging.basicConfig(
+        format=r"%(asctime)s %(levelname)8s: %(message)s",
+        datefmt=r"%Y-%m-%d %H:%M:%S",
+        level=log_levels[min(len(log_levels) - 1, args.verbosity)],
+    )
+
+    # Load and resolve every portfolio before accepting queries
+    store = PortfolioStore(
+        args.files, args.iso_currency, FxRates(args.fx_rates) if args.fx_rates else None
+    )
+    store.load_all()
+    with QueryServer((args.host, args.port), store) as server:
+        logging.info(f"Serving {len(args.files)} portfolios on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("Shutting down")
@@ -0,0 +1,147 @@
+#! /usr/bin/env python
+"""
+Estimate the capital gains from hypothetical disposals
+  - a single trade given on the command line
+  - a CSV file of trades with columns: Security, Date, Shares, Price, [Fees], [Taxes], [Currency]
+"""
+# Standard library imports
+import csv
+import logging
+import sys
+from argparse import ArgumentParser
+from decimal import Decimal, InvalidOperation
+
+# Local imports
+from uk_tax_report import Account, readers
+from uk_tax_report.batch import PENNY
+from uk_tax_report.converters import as_datetime
+from uk_tax_report.fx_rates import FxRates
+from uk_tax_report.ledger import Ledger
+
+if __name__ == "__main__":
+    # Parse command line arguments
+    parser = ArgumentParser()
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-c", "--csv", type=str, help="CSV file to process")
+    group.add_argument("-x", "--xml", type=str, help="XML file to process")
+    parser.add_argument("-l", "--ledger", type=str, help="SQLite ledger to read from")
+    parser.add_argument(
+        "-i", "--iso-currency", type=str, help="ISO currency code", default="GBP"
+    )
+    parser.add_argument(
+        "-r",
+        "--fx-rates",
+        type=str,
+        help="CSV file of daily exchange rates for securities and trades in other currencies",
+    )
+    parser.add_argument(
+        "-n", "--account-names", type=str, nargs="+", help="accounts to consider"
+    )
+    parser.add_argument("-s", "--security", type=str, help="symbol or name to sell")
+    parser.add_argument("-d", "--date", type=str, help="date of the sale")
+    parser.add_argument("-u", "--units", type=str, help="number of units to sell")
+    parser.add_argument("-p", "--price", type=str, help="sale price per unit")
+    parser.add_argument("-f", "--fees", type=str, default="0", help="fees on the sale")
+    parser.add_argument(
+        "-T", "--trades", type=str, help="CSV file of hypothetical trades"
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, help="CSV file to write the results to"
+    )
+    parser.add_argument(
+        "-v", "--verbosity", action="count", default=0, help="increase output verbosity"
+    )
+    args = parser.parse_args()
+    if not (args.csv or args.xml or args.ledger):
+        parser.error("one of the arguments -c/--csv -x/--xml -l/--ledger is required")
+    if args.fx_rates and not (args.csv or args.xml):
+        parser.error(
+            "--fx-rates cannot be used with a ledger alone: convert amounts before adding them to it"
+        )
+    if not args.trades and not all((args.security, args.date, args.units, args.price)):
+        parser.error("either -T/--trades or all of -s, -d, -u and -p are required")
+
+    # Set up logging
+    log_levels = [logging.INFO, logging.DEBUG]
+    logging.basicConfig(
+        format=r"%(asctime)s %(levelname)8s: %(message)s",
+        datefmt=r"%Y-%m-%d %H:%M:%S",
+        level=log_levels[min(len(log_levels) - 1, args.verbosity)],
+    )
+
+    # Load accounts
+    if args.csv:
+        data = readers.CsvDataFile(args.csv)
+    elif args.xml:
+        data = readers.XmlDataFile(args.xml)
+    else:
+        data = readers.LedgerDataFile(Ledger(args.ledger))
+    fx_rates = FxRates(args.fx_rates) if args.fx_rates else None
+    if fx_rates:
+        data.convert_currencies(fx_rates, args.iso_currency)
+    combined = Account.combined(
+        "Taxable Accounts", args.iso_currency, data, args.account_names
+    )
+
+    # Load trades
+    if args.trades:
+        with open(args.trades, newline="", encoding="utf-8") as f_trades:
+            trades = list(csv.DictReader(f_trades))
+    else:
+        trades = [
+            {
+                "Security": args.security,
+                "Date": args.date,
+                "Shares": args.units,
+                "Price": args.price,
+                "Fees": args.fees,
+            }
+        ]
+
+    # Simulate each trade independently against the resolved accounts
+    results = []
+    for trade in trades:
+        result = {key: trade[key] for key in ("Security", "Date", "Shares")}
+        try:
+            on_date = as_datetime(trade["Date"]).date()
+            amounts = [
+                Decimal(trade.get(key) or 0) for key in ("Price", "Fees", "Taxes")
+            ]
+            # Convert prices given in another currency at the rate on the day
+            code = (trade.get("Currency") or args.iso_currency).upper()
+            if code != args.iso_currency:
+                if not fx_rates:
+                    raise ValueError(f"Use --fx-rates to convert prices in {code}")
+                rate = fx_rates.rate(code, on_date)
+                amounts = [amount / rate for amount in amounts]
+            disposal = combined.simulate_disposal(
+                trade["Security"], on_date, trade["Shares"], *amounts
+            )
+        except (KeyError, ValueError, InvalidOperation) as exc:
+            error = str(exc.args[0]) if exc.args else str(exc)
+            logging.warning(f"Could not simulate selling {trade['Security']}: {error}")
+            results.append({**result, "Error": error})
+            continue
+        result.update(
+            {
+                "Proceeds": disposal.sale_total.amount.quantize(PENNY),
+                "Cost": disposal.purchase_total.amount.quantize(PENNY),
+                "Gain": disposal.gain.amount.quantize(PENNY),
+            }
+        )
+        description = f"Sell {disposal.units} {trade['Security']}"
+        logging.info(
+            f"  {disposal.date}: {description:52} {str(disposal.sale_total):>18} {str(disposal.gain):>18}"
+        )
+        results.append(result)
+
+    # Write results
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f_output:
+            writer = csv.DictWriter(
+                f_output,
+                ["Security", "Date", "Shares", "Proceeds", "Cost", "Gain", "Error"],
+            )
+            writer.writeheader()
+            writer.writerows(results)
+    sys.exit(1 if any("Error" in result for result in results) else 0)
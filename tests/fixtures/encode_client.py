@@ -0,0 +1,269 @@
+#! /usr/bin/env python
+"""
+Write client.portfolio, the binary counterpart of client.xml
+
+The file is encoded with Google's protobuf runtime from message definitions
+transcribed from client.proto (name.abuchen.portfolio.model.proto.v1), so it
+does not depend on the encoder in benchmarks.synthetic that the readers were
+written alongside. Fields holding their default value are left out, as the
+runtime does, and some fields that the readers skip are filled in as well.
+
+Run with: python tests/fixtures/encode_client.py (requires the protobuf package)
+"""
+# Standard library imports
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Third-party imports
+from google.protobuf import (
+    descriptor_pb2,
+    descriptor_pool,
+    message_factory,
+    timestamp_pb2,
+)
+
+FileDescriptor = descriptor_pb2.FileDescriptorProto
+FieldDescriptor = descriptor_pb2.FieldDescriptorProto
+PACKAGE = "name.abuchen.portfolio.model.proto.v1"
+PACKAGE_PREFIX = f".{PACKAGE}"
+SIGNATURE = b"PPPBV1"
+STRING, INT32, INT64, BOOL = (
+    FieldDescriptor.TYPE_STRING,
+    FieldDescriptor.TYPE_INT32,
+    FieldDescriptor.TYPE_INT64,
+    FieldDescriptor.TYPE_BOOL,
+)
+TIMESTAMP = ".google.protobuf.Timestamp"
+
+# Fields of each message as (name, number, type), where a type that is a string
+# names a message or enum, and a list marks a repeated field
+MESSAGES = {
+    "PSecurity": [
+        ("uuid", 1, STRING),
+        ("onlineId", 2, STRING),
+        ("name", 3, STRING),
+        ("currencyCode", 4, STRING),
+        ("note", 6, STRING),
+        ("isin", 7, STRING),
+        ("tickerSymbol", 8, STRING),
+    ],
+    "PAccount": [
+        ("uuid", 1, STRING),
+        ("name", 2, STRING),
+        ("currencyCode", 3, STRING),
+        ("note", 4, STRING),
+        ("isRetired", 5, BOOL),
+    ],
+    "PPortfolio": [
+        ("uuid", 1, STRING),
+        ("name", 2, STRING),
+        ("note", 3, STRING),
+        ("isRetired", 4, BOOL),
+        ("referenceAccount", 5, STRING),
+    ],
+    "PTransactionUnit": [
+        ("type", 1, ".PTransactionUnit.Type"),
+        ("amount", 2, INT64),
+        ("currencyCode", 3, STRING),
+    ],
+    "PTransaction": [
+        ("uuid", 1, STRING),
+        ("type", 2, ".PTransaction.Type"),
+        ("account", 3, STRING),
+        ("portfolio", 4, STRING),
+        ("otherAccount", 5, STRING),
+        ("otherPortfolio", 6, STRING),
+        ("otherUuid", 7, STRING),
+        ("date", 9, TIMESTAMP),
+        ("currencyCode", 10, STRING),
+        ("amount", 11, INT64),
+        ("shares", 12, INT64),
+        ("note", 13, STRING),
+        ("security", 14, STRING),
+        ("units", 15, [".PTransactionUnit"]),
+        ("updatedAt", 16, TIMESTAMP),
+    ],
+    "PClient": [
+        ("version", 1, INT32),
+        ("securities", 2, [".PSecurity"]),
+        ("accounts", 3, [".PAccount"]),
+        ("portfolios", 4, [".PPortfolio"]),
+        ("transactions", 5, [".PTransaction"]),
+    ],
+}
+ENUMS = {
+    "PTransactionUnit": ("Type", ["GROSS_VALUE", "TAX", "FEE"]),
+    "PTransaction": (
+        "Type",
+        [
+            "PURCHASE",
+            "SALE",
+            "INBOUND_DELIVERY",
+            "OUTBOUND_DELIVERY",
+            "SECURITY_TRANSFER",
+            "CASH_TRANSFER",
+            "DEPOSIT",
+            "REMOVAL",
+            "DIVIDEND",
+        ],
+    ),
+}
+# Transactions in client.xml, with the date of each and its fees and taxes
+TRANSACTIONS: List[Dict[str, Any]] = [
+    {
+        "uuid": "t-2",
+        "type": "PURCHASE",
+        "account": "a-1",
+        "portfolio": "p-1",
+        "date": "2021-01-04",
+        "amount": 100500,
+        "shares": 1000000000,
+        "security": "s-1",
+        "units": [("FEE", 500)],
+    },
+    {
+        "uuid": "t-3",
+        "type": "PURCHASE",
+        "account": "a-1",
+        "portfolio": "p-1",
+        "date": "2021-03-01",
+        "amount": 40000,
+        "shares": 250000000,
+        "security": "s-2",
+        "units": [("FEE", 400), ("TAX", 200)],
+    },
+    {
+        "uuid": "t-5",
+        "type": "DIVIDEND",
+        "account": "a-1",
+        "date": "2021-05-10",
+        "amount": 1234,
+        "shares": 250000000,
+        "security": "s-2",
+        "units": [("TAX", 34)],
+    },
+    {
+        "uuid": "t-4",
+        "type": "SALE",
+        "account": "a-1",
+        "portfolio": "p-1",
+        "date": "2021-06-15",
+        "amount": 60750,
+        "shares": 500000000,
+        "note": "Part sale",
+        "security": "s-1",
+        "units": [("FEE", 750)],
+    },
+    {
+        "uuid": "t-6",
+        "type": "CASH_TRANSFER",
+        "account": "a-1",
+        "otherAccount": "a-2",
+        "date": "2021-07-01",
+        "amount": 50000,
+    },
+    {
+        "uuid": "t-8",
+        "type": "DIVIDEND",
+        "account": "a-2",
+        "date": "2021-09-30",
+        "amount": 321,
+        "shares": 100000000,
+        "note": "Excess reportable income",
+        "security": "s-2",
+    },
+]
+
+
+def add_message(file: FileDescriptor, name: str, fields: Sequence[Tuple]) -> None:
+    """Add a message, and any enum nested in it, to a file descriptor"""
+    message = file.message_type.add(name=name)
+    if name in ENUMS:
+        enum_name, values = ENUMS[name]
+        enum = message.enum_type.add(name=enum_name)
+        for number, value in enumerate(values):
+            enum.value.add(name=value, number=number)
+    for field_name, number, field_type in fields:
+        field = message.field.add(name=field_name, number=number)
+        field.label = FieldDescriptor.LABEL_OPTIONAL
+        if isinstance(field_type, list):
+            field.label = FieldDescriptor.LABEL_REPEATED
+            field_type = field_type[0]
+        if isinstance(field_type, int):
+            field.type = field_type
+        else:
+            type_name = (
+                field_type if field_type == TIMESTAMP else PACKAGE_PREFIX + field_type
+            )
+            field.type_name = type_name
+            field.type = (
+                FieldDescriptor.TYPE_ENUM
+                if field_type.endswith(".Type")
+                else FieldDescriptor.TYPE_MESSAGE
+            )
+
+
+def epoch_seconds(day: str) -> int:
+    """Seconds of a timestamp at midnight at the start of a day, as the readers decode it"""
+    return int((datetime.fromisoformat(day) - datetime(1970, 1, 1)).total_seconds())
+
+
+def main() -> None:
+    """Encode the client in client.xml and write it next to this script"""
+    pool = descriptor_pool.DescriptorPool()
+    pool.AddSerializedFile(timestamp_pb2.DESCRIPTOR.serialized_pb)
+    file = FileDescriptor(
+        name="client.proto",
+        package=PACKAGE,
+        syntax="proto3",
+        dependency=["google/protobuf/timestamp.proto"],
+    )
+    for name, fields in MESSAGES.items():
+        add_message(file, name, fields)
+    pool.Add(file)
+    client_class = message_factory.GetMessageClass(
+        pool.FindMessageTypeByName(f"{PACKAGE}.PClient")
+    )
+
+    client = client_class(version=1)
+    client.securities.add(
+        uuid="s-1",
+        onlineId="alpha",
+        name="Alpha Fund",
+        currencyCode="GBP",
+        isin="GB00ALPHA001",
+        tickerSymbol="ALP",
+    )
+    client.securities.add(
+        uuid="s-2",
+        name="Beta Trust",
+        currencyCode="GBP",
+        note="Held in both accounts",
+        isin="GB00BETA0002",
+        tickerSymbol="BET",
+    )
+    client.accounts.add(uuid="a-1", name="Broker", currencyCode="GBP")
+    client.accounts.add(uuid="a-2", name="Savings", currencyCode="GBP")
+    client.portfolios.add(uuid="p-1", name="Broker", referenceAccount="a-1")
+    for fields in TRANSACTIONS:
+        transaction = client.transactions.add(
+            **{
+                name: value
+                for name, value in fields.items()
+                if name not in ("date", "units")
+            },
+            currencyCode="GBP",
+        )
+        transaction.date.seconds = epoch_seconds(fields["date"])
+        transaction.updatedAt.seconds = epoch_seconds("2022-01-01")
+        for unit_type, amount in fields.get("units", []):
+            transaction.units.add(type=unit_type, amount=amount, currencyCode="GBP")
+
+    file_name = Path(__file__).parent / "client.portfolio"
+    file_name.write_bytes(SIGNATURE + client.SerializeToString())
+    print(f"Wrote {len(TRANSACTIONS)} transactions to {file_name}")
+
+
+if __name__ == "__main__":
+    main()
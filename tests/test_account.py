@@ -0,0 +1,34 @@
+"""Tests of combining accounts"""
+# Standard library imports
+from datetime import date, datetime
+
+# Third-party imports
+from moneyed import GBP, Money
+
+# Local imports
+from uk_tax_report import Account, Security
+from uk_tax_report.transactions import Purchase, Sale
+
+
+def account(name: str, *transactions) -> Account:
+    """Account holding one security with some transactions"""
+    result = Account(name, "GBP")
+    security = Security("XXX", "X", GBP)
+    security.add_transactions(list(transactions))
+    result.securities = [security]
+    return result
+
+
+def test_security_in_two_accounts_is_reported_once():
+    """A security held in two accounts becomes one security with every transaction"""
+    purchase = Purchase(datetime(2020, 1, 10), GBP, 100, 1000)
+    sale = Sale(datetime(2020, 6, 1), GBP, 100, 1500)
+    total = account("A", purchase) + account("B", sale)
+
+    (security,) = total.securities
+    assert security.name == "X"
+    assert security.transactions == [purchase, sale]
+    (summary,) = total.summaries([(date(2020, 4, 6), date(2021, 4, 5))])
+    assert [s["name"] for s in summary["securities"]] == ["X"]
+    assert summary["gain"] == Money(500, GBP)
+    assert summary["holdings"] == [{"symbol": "XXX", "name": "X"}]
@@ -0,0 +1,93 @@
+"""Tests of reading a transaction table with DataFile"""
+# Standard library imports
+import csv
+from decimal import Decimal
+
+# Third-party imports
+import pytest
+from moneyed import GBP, Money
+
+# Local imports
+from uk_tax_report import Account
+from uk_tax_report.converters import as_tax_year
+from uk_tax_report.readers import CsvDataFile
+
+COLUMNS = [
+    "Date",
+    "Type",
+    "Security",
+    "Shares",
+    "Amount",
+    "Fees",
+    "Taxes",
+    "Cash Account",
+    "ISIN",
+    "Symbol",
+    "Note",
+]
+# X is sold from one account at the end of a tax year and bought back in another
+# in the next, while Y is bought in one account and sold from the other
+ROWS = [
+    ("2019-06-03", "Buy", "Y", "100", "500", "Account A", "YYY"),
+    ("2020-01-10", "Buy", "X", "100", "1000", "Account A", "XXX"),
+    ("2020-05-01", "Sell", "Y", "100", "600", "Account B", "YYY"),
+    ("2021-03-30", "Sell", "X", "100", "1200", "Account A", "XXX"),
+    ("2021-04-20", "Buy", "X", "100", "1100", "Account B", "XXX"),
+]
+
+
+@pytest.fixture(name="file_name")
+def fixture_file_name(tmp_path) -> str:
+    """CSV export of the rows"""
+    file_name = tmp_path / "transactions.csv"
+    with open(file_name, "w", newline="", encoding="utf-8") as f_csv:
+        writer = csv.DictWriter(f_csv, fieldnames=COLUMNS)
+        writer.writeheader()
+        for day, type_, security, shares, amount, account, symbol in ROWS:
+            writer.writerow(
+                {
+                    "Date": day,
+                    "Type": type_,
+                    "Security": security,
+                    "Shares": shares,
+                    "Amount": amount,
+                    "Fees": "0",
+                    "Taxes": "0",
+                    "Cash Account": account,
+                    "ISIN": f"GB{symbol}",
+                    "Symbol": symbol,
+                }
+            )
+    return str(file_name)
+
+
+@pytest.mark.parametrize(
+    "tax_year, expected", [("2020-2021", {"X", "Y"}), ("2021-2022", {"X"})]
+)
+def test_active_securities_across_accounts(file_name, tax_year, expected):
+    """Units are counted and sales matched across accounts, as in the report"""
+    start_date, end_date = as_tax_year(tax_year)
+    data = CsvDataFile(file_name)
+    assert data.active_securities(start_date, end_date) == expected
+
+    # Reporting on the active securities alone changes nothing
+    expected_summaries = Account.combined("All", "GBP", data).summaries(
+        [(start_date, end_date)]
+    )
+    data.filter_rows(security_names=data.active_securities(start_date, end_date))
+    summaries = Account.combined("All", "GBP", data).summaries([(start_date, end_date)])
+    assert summaries == expected_summaries
+
+
+def test_sale_matched_across_accounts(file_name):
+    """The sale of X is matched against the purchase in the other account"""
+    data = CsvDataFile(file_name)
+    data.filter_rows(security_names=data.active_securities(*as_tax_year("2020-2021")))
+    (summary,) = Account.combined("All", "GBP", data).summaries(
+        [as_tax_year("2020-2021")]
+    )
+    (security,) = [s for s in summary["securities"] if s["name"] == "X"]
+    (disposal,) = security["disposals"]
+    assert disposal["units"] == Decimal(100)
+    assert disposal["cost"] == Money(1100, GBP)
+    assert disposal["gain"] == Money(100, GBP)
@@ -0,0 +1,15 @@
+"""Tests of exporting events without the optional pyarrow package"""
+# Standard library imports
+import importlib
+import sys
+
+# Third-party imports
+import pytest
+
+
+def test_missing_pyarrow_names_the_extra(monkeypatch):
+    """Importing the exporter without pyarrow says which extra to install"""
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.delitem(sys.modules, "uk_tax_report.export", raising=False)
+    with pytest.raises(ImportError, match="install the 'export' extra"):
+        importlib.import_module("uk_tax_report.export")
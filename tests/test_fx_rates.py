@@ -0,0 +1,70 @@
+"""Tests of converting amounts with FxRates"""
+# Standard library imports
+from datetime import date
+from decimal import Decimal
+
+# Third-party imports
+import pandas as pd
+import pytest
+
+# Local imports
+from uk_tax_report.fx_rates import FxRates
+from uk_tax_report.readers.data_file import DataFile
+
+
+@pytest.fixture(name="fx_rates")
+def fixture_fx_rates(tmp_path) -> FxRates:
+    """Rates for USD on two dates"""
+    file_name = tmp_path / "rates.csv"
+    file_name.write_text(
+        "Date,Currency,Rate\n2021-01-04,USD,1.3673\n2021-01-08,USD,2\n",
+        encoding="utf-8",
+    )
+    return FxRates(str(file_name))
+
+
+def data_file(rows: list) -> DataFile:
+    """Data file holding a transaction table"""
+    data = DataFile()
+    data.df_transactions = pd.DataFrame(
+        rows, columns=["Date", "Amount", "Fees", "Taxes", "currencyCode"]
+    )
+    return data
+
+
+def test_rate_is_exact(fx_rates):
+    """Rates are the Decimals in the file, using the latest one on or before a date"""
+    assert fx_rates.rate("USD", date(2021, 1, 6)) == Decimal("1.3673")
+    assert fx_rates.rate("USD", date(2021, 1, 9)) == Decimal("2")
+    with pytest.raises(ValueError):
+        fx_rates.rate("USD", date(2021, 1, 1))
+
+
+def test_converted_amount_round_trips(fx_rates):
+    """A converted amount multiplied by its rate gives back the original amount"""
+    amount = Decimal("2469135780.24691356")
+    data = data_file(
+        [
+            (pd.Timestamp("2021-01-08"), amount, Decimal("0.30"), float("nan"), "USD"),
+            (pd.Timestamp("2021-01-08"), Decimal("12.34"), 0, 0, "GBP"),
+        ]
+    )
+    assert data.convert_currencies(fx_rates, "GBP") == 1
+    converted = data.df_transactions.iloc[0]
+    assert converted["Amount"] == Decimal("1234567890.12345678")
+    assert converted["Amount"] * fx_rates.rate("USD", date(2021, 1, 8)) == amount
+    assert converted["Fees"] == Decimal("0.15")
+    assert pd.isna(converted["Taxes"])
+    assert converted["currencyCode"] == "GBP"
+    # Amounts already in the base currency are left alone
+    assert data.df_transactions.iloc[1]["Amount"] == Decimal("12.34")
+
+
+def test_converted_amount_is_rounded(fx_rates):
+    """Amounts are rounded to eight decimal places after dividing by the rate"""
+    data = data_file([(pd.Timestamp("2021-01-05"), "100", "1", "0", "USD")])
+    data.convert_currencies(fx_rates, "GBP")
+    converted = data.df_transactions.iloc[0]
+    assert converted["Amount"] == Decimal("73.13683903")
+    assert converted["Fees"] == Decimal("0.73136839")
+    assert converted["Taxes"] == Decimal("0E-8")
@@ -0,0 +1,64 @@
+"""Tests of the values that a PooledPurchase stores"""
+# Standard library imports
+from datetime import datetime
+
+# Third-party imports
+import pytest
+from moneyed import GBP
+
+# Local imports
+from uk_tax_report.transactions import (
+    BedAndBreakfast,
+    Disposal,
+    ExcessReportableIncome,
+    PooledPurchase,
+    Purchase,
+)
+from uk_tax_report.transactions.transaction import cached_properties
+
+DATE_TIME = datetime(2021, 6, 1)
+DISPOSAL = (DATE_TIME, GBP, 40, 440, 4, 2, 500, 5, 1)
+
+
+def pool() -> PooledPurchase:
+    """Pool of 100 units"""
+    return PooledPurchase(
+        GBP, date_time=datetime(2021, 1, 4), units=100, subtotal=1000, fees=10, taxes=5
+    )
+
+
+def stored_values(transaction: PooledPurchase) -> dict:
+    """Every cached value of a pool, which reading stores on it"""
+    return {
+        name: getattr(transaction, name)
+        for name in cached_properties(type(transaction))
+    }
+
+
+@pytest.mark.parametrize(
+    "method, argument",
+    [
+        ("add_purchase", Purchase(DATE_TIME, GBP, 50, 600, 6, 3)),
+        ("add_eri", ExcessReportableIncome(DATE_TIME, GBP, 100, 25)),
+        ("add_disposal", Disposal(*DISPOSAL)),
+        ("add_bed_and_breakfast", BedAndBreakfast(Disposal(*DISPOSAL))),
+    ],
+)
+def test_changes_refresh_stored_values(method, argument):
+    """Changing a pool forgets the values it stored, so they are computed again"""
+    changed = pool()
+    before = stored_values(changed)
+    assert {"total", "unit_price_inc", "unit_fees", "unit_taxes"} <= set(before)
+
+    getattr(changed, method)(argument)
+    fresh = PooledPurchase(
+        GBP,
+        date_time=changed.datetime,
+        units=changed.units,
+        subtotal=changed.subtotal,
+        fees=changed.fees,
+        taxes=changed.taxes,
+    )
+    after = stored_values(changed)
+    assert after == stored_values(fresh)
+    assert after["total"] != before["total"]
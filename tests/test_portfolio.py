@@ -0,0 +1,33 @@
+"""Tests of reading PortfolioPerformance binary files"""
+# Standard library imports
+from pathlib import Path
+
+# Third-party imports
+import pandas as pd
+import pytest
+
+# Local imports
+from uk_tax_report.readers import PortfolioDataFile, XmlDataFile
+
+# Each binary fixture is checked against the XML file with the same name
+FIXTURES = sorted(
+    path
+    for path in (Path(__file__).parent / "fixtures").glob("*.portfolio")
+    if path.with_suffix(".xml").exists()
+)
+
+
+def normalised(df_transactions: pd.DataFrame) -> pd.DataFrame:
+    """Transaction table in a fixed order, since files may list containers differently"""
+    return df_transactions.sort_values(
+        ["Cash Account", "Security", "Date", "Type", "Shares", "Amount"], kind="stable"
+    ).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.name)
+def test_binary_matches_xml(path):
+    """A binary file decodes to the same transactions as its XML export"""
+    expected = normalised(XmlDataFile(path.with_suffix(".xml")).df_transactions)
+    df_transactions = normalised(PortfolioDataFile(path).df_transactions)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(df_transactions, expected)
@@ -0,0 +1,30 @@
+"""Tests of the simulate.py command line"""
+# Standard library imports
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parents[1] / "simulate.py"
+
+
+def simulate(*args: str) -> subprocess.CompletedProcess:
+    """Run simulate.py with some arguments"""
+    return subprocess.run(
+        [sys.executable, str(SCRIPT), *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def test_ledger_rejects_fx_rates(tmp_path):
+    """Rows read from a ledger cannot be converted, so the combination is an error"""
+    result = simulate(
+        *("--ledger", str(tmp_path / "ledger.db")),
+        *("--fx-rates", str(tmp_path / "rates.csv")),
+        *("-s", "ABC", "-d", "2021-01-01", "-u", "1", "-p", "1"),
+    )
+    assert result.returncode == 2
+    assert "--fx-rates cannot be used with a ledger alone" in result.stderr
+    assert "Traceback" not in result.stderr
+    assert not (tmp_path / "ledger.db").exists()
@@ -0,0 +1,33 @@
+"""Tests of reading XML with each backend"""
+# Standard library imports
+from pathlib import Path
+
+# Third-party imports
+import pytest
+
+# Local imports
+from uk_tax_report.readers.xml_utils import read_xml
+
+FIXTURES = sorted((Path(__file__).parent / "fixtures").glob("*.xml"))
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.name)
+def test_lxml_matches_etree(path):
+    """XPath rewritten from ElementPath selects the same transactions as findall"""
+    pytest.importorskip("lxml")
+    expected = read_xml(path, backend="etree")
+    df_transactions = read_xml(path, backend="lxml")
+    assert not expected.empty
+    assert df_transactions.equals(expected)
+
+
+def test_nested_accounts_and_portfolios():
+    """Accounts and portfolios nested in cross entries are found, references are not"""
+    df_transactions = read_xml(Path(__file__).parent / "fixtures" / "nested.xml")
+    rows = df_transactions.groupby(["Cash Account", "Type"]).size().to_dict()
+    assert rows == {
+        ("Broker", "BUY"): 3,
+        ("Broker", "DIVIDENDS"): 1,
+        ("Broker", "SELL"): 1,
+        ("Savings", "DIVIDENDS"): 1,
+    }
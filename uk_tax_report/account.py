@@ -1,22 +1,42 @@
 """Definition of the Account class"""
 # Standard library imports
 import logging
+from collections import defaultdict
 from datetime import date
-from typing import List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 # Local imports
+from .cache import ResolutionCache
 from .converters import as_currency
-from .readers import DataFile
 from .security import Security
-from .transactions import Transaction
+from .streaming import stream_periods
+from .transactions import Disposal, Transaction
+
+# Readers and income depend on pandas, so they are only imported by code that reads files
+if TYPE_CHECKING:
+    from .income import Payment
+    from .readers import DataFile
 
 
 class Account:
     """Account containing several transactions"""
 
-    def __init__(self, name: str, currency: str, data: Optional[DataFile] = None):
+    def __init__(self, name: str, currency: str, data: Optional["DataFile"] = None):
         self.name = name
         self.currency = as_currency(currency)
+        # Dividends and ERIs are read from the transaction table of the data file, if there is one
+        self.data_: Optional["DataFile"] = data
+        self.income_accounts_: Set[str] = {name}
         if data:
             self.securities = [
                 Security(
@@ -33,20 +53,65 @@ class Account:
         else:
             self.securities = []
 
+    @classmethod
+    def combined(
+        cls,
+        name: str,
+        currency: str,
+        data: "DataFile",
+        account_names: Optional[Iterable[str]] = None,
+    ) -> "Account":
+        """
+        Account with a single history for each security across several accounts
+        in a data file (default: all accounts). This gives the same securities
+        as adding the accounts together, without building each of them first.
+        """
+        account = cls(name, currency)
+        selected = data.account_names if account_names is None else set(account_names)
+        account.data_, account.income_accounts_ = data, selected
+        securities: Dict[str, Security] = {}
+        for account_name in sorted(data.account_names & selected):
+            for security_tuple in data.securities[account_name]:
+                if security_tuple.Security not in securities:
+                    securities[security_tuple.Security] = Security(
+                        symbol=security_tuple.Symbol,
+                        name=security_tuple.Security,
+                        currency=account.currency,
+                    )
+                securities[security_tuple.Security].add_transactions(
+                    data.get_transaction_list(
+                        account_name, security_tuple.Security, account.currency
+                    )
+                )
+        account.securities = list(securities.values())
+        return account
+
     def __add__(self, other: "Account") -> "Account":
         if self.currency != other.currency:
             raise ValueError(
                 f"Cannot add account '{self.name}' with currency {self.currency} to account '{other.name}' with currency {other.currency}"
             )
         output = Account(f"{self.name}-{other.name}", self.currency)
+        # Securities held in both accounts are combined into one, matched by name
+        symbols: Dict[str, str] = {}
+        transactions: Dict[str, List[Transaction]] = defaultdict(list)
+        for existing_security in self.securities + other.securities:
+            symbols.setdefault(existing_security.name, existing_security.symbol)
+            transactions[existing_security.name] += existing_security.transactions
         output.securities = [
-            Security(old.symbol, old.name, self.currency)
-            for old in set(self.securities + other.securities)
+            Security(symbol, name, self.currency) for name, symbol in symbols.items()
         ]
         for security in output.securities:
-            for existing_security in self.securities + other.securities:
-                if existing_security.name == security.name:
-                    security.add_transactions(existing_security.transactions)
+            security.add_transactions(transactions[security.name])
+        # Income can still be read from the table if both accounts came from the same file
+        inputs = [a for a in (self, other) if a.securities]
+        accounts = set().union(*(a.income_accounts_ for a in inputs))
+        if (
+            inputs
+            and all(a.data_ is inputs[0].data_ for a in inputs)
+            and len(accounts) == sum(len(a.income_accounts_) for a in inputs)
+        ):
+            output.data_, output.income_accounts_ = inputs[0].data_, accounts
         return output
 
     def __radd__(self, other):
@@ -64,7 +129,11 @@ class Account:
     @property
     def transactions(self) -> List[Transaction]:
         """List of transactions in this account"""
-        return sum([security.transactions for security in self.securities], [])
+        return [
+            transaction
+            for security in self.securities
+            for transaction in security.transactions
+        ]
 
     def holdings(self, start_date: date, end_date: date) -> List[Security]:
         """List of securities held between these dates"""
@@ -74,6 +143,26 @@ class Account:
             if security.is_held(start_date, end_date)
         ]
 
+    def payments(
+        self, periods: List[Tuple[date, date]]
+    ) -> Optional[List[Dict[str, List["Payment"]]]]:
+        """
+        Dividends and ERIs of each security in each period, read from the
+        transaction table in one pass if the account came from a data file
+        """
+        income = self.data_.income if self.data_ else None
+        if income is None:
+            return None
+        return income.payments(periods, self.currency, self.income_accounts_)
+
+    def reportable_securities(
+        self, include_non_taxable: bool = False
+    ) -> List[Security]:
+        """List of securities to report on, sorted by name"""
+        if include_non_taxable:
+            return sorted(self.securities, key=lambda s: s.name)
+        return self.taxable_securities
+
     def report(
         self, start_date: date, end_date: date, include_non_taxable: bool = False
     ):
@@ -89,11 +178,7 @@ class Account:
         )
         for security in sorted(self.holdings(start_date, end_date)):
             logging.info(f"  {f'[{security.symbol}]':15} {security.name}")
-        relevant_securities = (
-            sorted(self.securities, key=lambda s: s.name)
-            if include_non_taxable
-            else self.taxable_securities
-        )
+        relevant_securities = self.reportable_securities(include_non_taxable)
 
         # Capital gains
         logging.info(
@@ -106,8 +191,125 @@ class Account:
         logging.info(
             f"Looking for dividends and ERIs during UK tax year {start_date.year}-{end_date.year}..."
         )
+        payments = self.payments([(start_date, end_date)])
         for security in relevant_securities:
-            security.report_dividends(start_date, end_date)
+            security.report_dividends(
+                start_date,
+                end_date,
+                payments[0].get(security.name, []) if payments else None,
+            )
+
+    def security(self, key: str) -> Security:
+        """Security with this symbol or name"""
+        for security in self.securities:
+            if key in (security.symbol, security.name):
+                return security
+        raise KeyError(f"Account '{self.name}' has no security '{key}'")
+
+    def simulate_disposal(self, key: str, *args: Any) -> Disposal:
+        """
+        Estimated disposal from selling a security, identified by symbol or name,
+        with the remaining arguments as for Security.simulate_disposal
+        """
+        return self.security(key).simulate_disposal(*args)
+
+    def simulate_disposals(self, trades: Iterable[Sequence[Any]]) -> List[Disposal]:
+        """
+        Estimated disposals from a batch of hypothetical trades, each given as the
+        arguments to simulate_disposal. The trades are independent of one another.
+        """
+        securities: Dict[str, Security] = {}
+        for security in self.securities:
+            securities.setdefault(security.name, security)
+            securities.setdefault(security.symbol, security)
+        disposals = []
+        for key, *arguments in trades:
+            if key not in securities:
+                raise KeyError(f"Account '{self.name}' has no security '{key}'")
+            disposals.append(securities[key].simulate_disposal(*arguments))
+        return disposals
+
+    def summary(
+        self, start_date: date, end_date: date, include_non_taxable: bool = False
+    ) -> Dict[str, Any]:
+        """Summary of capital gains and income for this account"""
+        return self.summaries([(start_date, end_date)], include_non_taxable)[0]
+
+    def summaries(
+        self,
+        periods: List[Tuple[date, date]],
+        include_non_taxable: bool = False,
+        streaming: bool = False,
+        cache: Optional[ResolutionCache] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Summary of capital gains and income for this account in each period.
+        When streaming, the events of each security are summarised for every
+        period in a single pass as they are resolved, instead of being kept.
+        With a cache, the events and summaries of each security are reused from
+        it whenever its history is unchanged, and are not streamed. Securities
+        are only resolved, and their events stored, if the summaries need them.
+        Otherwise, dividends and ERIs are read from the transaction table where
+        the account came from a data file.
+        """
+        if cache:
+            cache.attach(self.securities)
+            streaming = False
+        cached = (
+            {
+                security: cache.summaries(security, periods)
+                for security in self.reportable_securities(include_non_taxable)
+            }
+            if cache
+            else {}
+        )
+        streamed = (
+            {
+                security: stream_periods(security, periods)
+                for security in self.securities
+            }
+            if streaming
+            else {}
+        )
+        payments = None if cache else self.payments(periods)
+        results = []
+        for idx, (start_date, end_date) in enumerate(periods):
+            summaries = [
+                cached[security][idx]
+                if cache
+                else security.summary(
+                    start_date,
+                    end_date,
+                    streamed[security][idx] if streaming else None,
+                    payments[idx].get(security.name, []) if payments else None,
+                )
+                for security in self.reportable_securities(include_non_taxable)
+            ]
+            holdings = (
+                [s for s in self.securities if streamed[s][idx].held]
+                if streaming
+                else self.holdings(start_date, end_date)
+            )
+            results.append(
+                {
+                    "name": self.name,
+                    "currency": self.currency.code,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "holdings": [
+                        {"symbol": security.symbol, "name": security.name}
+                        for security in sorted(holdings)
+                    ],
+                    "securities": [
+                        s for s in summaries if s["disposals"] or s["income"]
+                    ],
+                    "gain": sum((s["gain"] for s in summaries), self.currency.zero),
+                    "income": sum(
+                        (s["income_total"] for s in summaries), self.currency.zero
+                    ),
+                }
+            )
+        return results
 
     def __str__(self) -> str:
         return f"Account '{self.name}' has {len(self.securities)} securities"
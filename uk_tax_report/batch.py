@@ -0,0 +1,267 @@
+"""Process many Portfolio Performance files with a pool of worker processes"""
+# Standard library imports
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Third-party imports
+from moneyed import Money
+
+# Local imports
+from . import readers
+from .account import Account
+from .cache import ResolutionCache
+from .converters import as_tax_year
+from .fx_rates import load_fx_rates
+
+PENNY = Decimal("0.01")
+
+
+class BatchJob:
+    """A single portfolio file to be reported for one or more tax years"""
+
+    def __init__(
+        self,
+        file_name: str,
+        tax_years: List[str],
+        account_names: Optional[List[str]] = None,
+        currency: str = "GBP",
+        include_non_taxable: bool = False,
+        name: Optional[str] = None,
+        fx_rates: Optional[str] = None,
+        export: Optional[str] = None,
+        streaming: bool = False,
+    ):
+        self.file_name = str(file_name)
+        self.tax_years = list(tax_years)
+        self.account_names = account_names
+        self.currency = currency
+        self.include_non_taxable = include_non_taxable
+        self.name = name or Path(self.file_name).stem
+        self.fx_rates = fx_rates
+        self.export = export
+        self.streaming = streaming
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], directory: Path, **defaults):
+        """Create a job from a manifest entry, resolving paths against the manifest directory"""
+        entry = {**defaults, **data}
+        tax_years = entry.get("tax_years") or entry.get("tax_year")
+        if not tax_years:
+            raise ValueError(f"No tax year given for '{entry.get('file')}'")
+        return cls(
+            file_name=directory / entry["file"],
+            tax_years=[tax_years] if isinstance(tax_years, str) else tax_years,
+            account_names=entry.get("accounts"),
+            currency=entry.get("currency", "GBP"),
+            include_non_taxable=entry.get("all", False),
+            name=entry.get("name"),
+            fx_rates=str(directory / entry["fx_rates"])
+            if entry.get("fx_rates")
+            else None,
+            export=entry.get("export"),
+            streaming=entry.get("streaming", False),
+        )
+
+    @property
+    def size(self) -> int:
+        """Size of the input file in bytes, or zero if it does not exist"""
+        try:
+            return os.path.getsize(self.file_name)
+        except OSError:
+            return 0
+
+
+class ResultEncoder(json.JSONEncoder):
+    """Encode dates, decimals and money in batch results"""
+
+    def default(self, o):
+        if isinstance(o, date):
+            return o.isoformat()
+        if isinstance(o, Decimal):
+            return str(o)
+        if isinstance(o, Money):
+            return str(o.amount.quantize(PENNY))
+        return super().default(o)
+
+
+def read_manifest(file_name: str, **defaults) -> List[BatchJob]:
+    """
+    Read a JSON manifest of portfolio files.
+
+    The manifest is a list of entries such as
+    {"file": "client.xml", "tax_year": "2021-22", "accounts": ["ISA"]}.
+    Relative paths are resolved against the directory holding the manifest and
+    any keys missing from an entry are taken from the defaults.
+    """
+    with open(file_name, "r", encoding="utf-8") as f_manifest:
+        entries = json.load(f_manifest)
+    directory = Path(file_name).parent
+    jobs = [BatchJob.from_dict(entry, directory, **defaults) for entry in entries]
+    # Each job writes a result named after it, so names must be unique
+    names: Dict[str, int] = {}
+    for job in jobs:
+        names[job.name] = names.get(job.name, 0) + 1
+        if names[job.name] > 1:
+            job.name = f"{job.name}-{names[job.name]}"
+    return jobs
+
+
+def initialise_worker(verbosity: int = 0) -> None:
+    """Set up a worker process so that each file only pays for its own work"""
+    logging.basicConfig(
+        format=r"%(asctime)s %(levelname)8s: %(message)s",
+        datefmt=r"%Y-%m-%d %H:%M:%S",
+        level=logging.DEBUG if verbosity else logging.WARNING,
+    )
+    # Importing the readers (and so pandas) dominates start-up, so do it once per worker
+    for name in readers.READERS:
+        getattr(readers, name)
+
+
+def process_job(
+    job: BatchJob, output_directory: str = ".", cache_directory: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Report every requested tax year for one portfolio file, capturing any error,
+    and export its events to the output directory if requested. Securities
+    whose history is unchanged are reused from the cache directory, if given.
+    """
+    start_time = time.perf_counter()
+    result: Dict[str, Any] = {"name": job.name, "file": job.file_name}
+    try:
+        # Other accounts and later rows cannot affect any requested tax year, so skip them
+        data = readers.load_data_file(
+            job.file_name,
+            account_names=job.account_names,
+            end_date=max(as_tax_year(tax_year)[1] for tax_year in job.tax_years),
+        )
+        if job.fx_rates:
+            data.convert_currencies(load_fx_rates(job.fx_rates), job.currency)
+        if job.account_names:
+            missing = set(job.account_names) - data.account_names
+            if missing:
+                raise ValueError(f"Unknown accounts: {', '.join(sorted(missing))}")
+        # Securities with no activity in any requested tax year are never reported
+        if not job.export:
+            data.filter_rows(
+                security_names=set().union(
+                    *(
+                        data.active_securities(*as_tax_year(tax_year))
+                        for tax_year in job.tax_years
+                    )
+                )
+            )
+        combined = Account.combined(
+            "Taxable Accounts", job.currency, data, job.account_names or None
+        )
+        summaries = combined.summaries(
+            [as_tax_year(tax_year) for tax_year in job.tax_years],
+            job.include_non_taxable,
+            streaming=job.streaming,
+            cache=ResolutionCache(cache_directory) if cache_directory else None,
+        )
+        result["tax_years"] = [
+            {"tax_year": tax_year, **summary}
+            for tax_year, summary in zip(job.tax_years, summaries)
+        ]
+        if job.export:
+            # Exporting depends on the optional pyarrow package, so it is only imported when used
+            # pylint: disable=import-outside-toplevel
+            from .export import EventExporter
+
+            with EventExporter.in_directory(
+                output_directory, job.name, job.export
+            ) as exporter:
+                exporter.add_account(combined)
+            result["events"] = exporter.n_events
+        result["status"] = "ok"
+    except Exception as exc:  # pylint: disable=broad-except
+        result["status"] = "error"
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["seconds"] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def write_result(result: Dict[str, Any], file_name: Path) -> None:
+    """Write a result as JSON"""
+    with open(file_name, "w", encoding="utf-8") as f_result:
+        json.dump(result, f_result, cls=ResultEncoder, indent=2)
+
+
+def run_batch(
+    jobs: List[BatchJob],
+    output_directory: str,
+    max_workers: Optional[int] = None,
+    verbosity: int = 0,
+    cache_directory: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Process jobs in a bounded pool of workers, writing one result per job and a
+    summary, and sharing resolved securities through the cache directory if given
+    """
+    start_time = time.perf_counter()
+    output_path = Path(output_directory)
+    output_path.mkdir(parents=True, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=initialise_worker,
+        initargs=(verbosity,),
+    ) as executor:
+        # Start the largest files first so that they do not finish last
+        futures = {
+            executor.submit(process_job, job, str(output_path), cache_directory): job
+            for job in sorted(jobs, key=lambda j: j.size, reverse=True)
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:  # pylint: disable=broad-except
+                # Only reached if the worker itself died
+                result = {
+                    "name": job.name,
+                    "file": job.file_name,
+                    "status": "error",
+                    "error": f"{type(exc).__name__}: {exc}",
+                }
+            write_result(result, output_path / f"{job.name}.json")
+            logging.info(
+                f"{result['status']:5s} {job.name} ({result.get('seconds', 0):.2f}s)"
+                + (f": {result['error']}" if "error" in result else "")
+            )
+            results.append(result)
+
+    results.sort(key=lambda r: r["name"])
+    summary = {
+        "portfolios": len(results),
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "seconds": round(time.perf_counter() - start_time, 3),
+        "results": [
+            {
+                "name": r["name"],
+                "file": r["file"],
+                "status": r["status"],
+                "error": r.get("error"),
+                "tax_years": [
+                    {
+                        "tax_year": y["tax_year"],
+                        "gain": y["gain"],
+                        "income": y["income"],
+                    }
+                    for y in r.get("tax_years", [])
+                ],
+            }
+            for r in results
+        ],
+    }
+    write_result(summary, output_path / "summary.json")
+    return summary
@@ -0,0 +1,204 @@
+"""Definition of the ResolutionCache class"""
+# Standard library imports
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager, suppress
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Local imports
+from .checkpoint import transaction_key
+from .security import Security
+
+# Entries are only reused by the engine that stored them, so change this whenever resolution changes
+# 2: each purchase in the 30-day window is matched against the whole of the original sale
+ENGINE_VERSION = "2"
+
+# Suffix of the file holding each entry
+SUFFIX = ".pickle"
+
+
+@contextmanager
+def paused_collection() -> Iterator[None]:
+    """
+    Pause garbage collection while pickling, which visits or creates thousands
+    of objects at once and would otherwise trigger repeated collections of
+    every object already loaded
+    """
+    is_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if is_enabled:
+            gc.enable()
+
+
+class ResolutionCache:
+    """
+    Content-addressed store of resolved securities in a local directory.
+
+    Each entry is named after a digest of a security's date-ordered
+    transactions, its name, symbol and currency and the engine version, so an
+    entry can be reused by any later run in which the history of that security
+    is unchanged, whichever file or account it came from. An entry holds the
+    summary of each period that has been reported and, once they have been
+    needed, the resolved events with the pool after each one and the tax-year
+    checkpoints. Entries are pickled,
+    so the directory should only be shared with trusted users. Once there are
+    more than max_entries, the least recently used entries are removed. The
+    directory is only scanned once, when the cache is created, and the entries
+    are then tracked in memory, so entries stored by other processes since are
+    not counted until the next run.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 10000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.entries_: Dict[Security, Tuple[str, Dict[str, Any]]] = {}
+        # Names of the stored entries, from the least to the most recently used
+        self.used_: "OrderedDict[str, None]" = OrderedDict()
+        used = []
+        for file_name in self.directory.glob(f"*{SUFFIX}"):
+            # Another process may have removed the entry already
+            with suppress(FileNotFoundError):
+                used.append((file_name.stat().st_mtime, file_name.name))
+        for _, file_name in sorted(used):
+            self.used_[file_name] = None
+
+    def key(self, security: Security) -> str:
+        """Digest of everything that the resolution of a security depends on"""
+        digest = hashlib.sha256()
+        digest.update(
+            repr(
+                (ENGINE_VERSION, security.currency.code, security.symbol, security.name)
+            ).encode("utf-8")
+        )
+        for transaction in sorted(security.transactions, key=lambda t: t.datetime):
+            digest.update(transaction_key(transaction))
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored entry, marking it as recently used, or None if there is no usable entry"""
+        file_name = self.directory / f"{key}{SUFFIX}"
+        try:
+            with open(file_name, "rb") as f_entry, paused_collection():
+                entry = pickle.load(f_entry)
+            os.utime(file_name)
+        except FileNotFoundError:
+            self.used_.pop(file_name.name, None)
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as exc:
+            logging.warning(f"Ignoring unreadable cache entry {file_name}: {exc}")
+            return None
+        self.used_[file_name.name] = None
+        self.used_.move_to_end(file_name.name)
+        return entry
+
+    def save(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry, replacing it in one step so that other processes never read part of it"""
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self.directory, suffix=".tmp", delete=False
+        ) as f_entry, paused_collection():
+            try:
+                pickle.dump(entry, f_entry, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                os.unlink(f_entry.name)
+                raise
+        os.replace(f_entry.name, self.directory / f"{key}{SUFFIX}")
+        self.used_[f"{key}{SUFFIX}"] = None
+        self.used_.move_to_end(f"{key}{SUFFIX}")
+        if len(self.used_) > self.max_entries:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries beyond the maximum number"""
+        while len(self.used_) > self.max_entries:
+            file_name, _ = self.used_.popitem(last=False)
+            # Another process may have removed the entry already
+            with suppress(FileNotFoundError):
+                (self.directory / file_name).unlink()
+
+    def entry(self, security: Security) -> Tuple[str, Dict[str, Any]]:
+        """
+        Key and entry of a security, loading any stored events the first time.
+        A new entry has no events until they are needed.
+        """
+        key = self.key(security)
+        if security in self.entries_ and self.entries_[security][0] == key:
+            return self.entries_[security]
+        entry = self.load(key)
+        if entry is None:
+            entry = {"events": None, "checkpoints": None, "summaries": {}}
+        elif entry["events"] is not None:
+            security.load_checkpoints(entry["events"], entry["checkpoints"])
+            security.load_events(entry["events"])
+        self.entries_[security] = (key, entry)
+        return key, entry
+
+    def resolve(
+        self, securities: List[Security], periods: Sequence[Tuple[date, date]] = ()
+    ) -> None:
+        """
+        Reuse stored events where the history is unchanged, resolving and
+        storing the rest together with their summary for each of the periods
+        """
+        n_resolved = 0
+        for security in securities:
+            key, entry = self.entry(security)
+            if entry["events"] is not None:
+                continue
+            if not security.resolved_:
+                security.resolve_transactions()
+            entry["events"], entry["checkpoints"] = (
+                security.events_,
+                security.checkpoints_,
+            )
+            for period in periods:
+                entry["summaries"].setdefault(period, security.summary(*period))
+            self.save(key, entry)
+            n_resolved += 1
+        logging.debug(
+            f"Resolved {n_resolved} of {len(securities)} securities, reusing the rest from {self.directory}"
+        )
+
+    def attach(self, securities: List[Security]) -> None:
+        """Use this cache whenever the events of any of these securities are needed"""
+        for security in securities:
+            security.cache_ = self
+
+    def summaries(
+        self, security: Security, periods: List[Tuple[date, date]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Summary of a security in each period as it was last resolved, reusing
+        stored summaries and storing any new ones. The security is only
+        resolved if these summaries need its events.
+        """
+        key, entry = self.entry(security)
+        missing = [p for p in periods if p not in entry["summaries"]]
+        # Resolve without storing the entry yet, so that it is only stored once
+        cache, security.cache_ = security.cache_, None
+        try:
+            for start_date, end_date in missing:
+                entry["summaries"][(start_date, end_date)] = security.summary(
+                    start_date, end_date
+                )
+        finally:
+            security.cache_ = cache
+        # Keep the events if the summaries needed them
+        if entry["events"] is None and security.resolved_:
+            entry["events"], entry["checkpoints"] = (
+                security.events_,
+                security.checkpoints_,
+            )
+        if missing:
+            self.save(key, entry)
+        return [entry["summaries"][period] for period in periods]
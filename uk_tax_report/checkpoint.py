@@ -0,0 +1,95 @@
+"""Definition of the Checkpoint class"""
+# Standard library imports
+import hashlib
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+# Local imports
+from .transactions import PooledPurchase, Purchase, Transaction
+
+# Sales can be matched against purchases up to this long after them under HS284
+MATCHING_WINDOW = timedelta(days=30)
+
+
+class Checkpoint:
+    """
+    State of a security's resolution at the end of a UK tax year.
+
+    Resolution can resume from a checkpoint as long as no transaction up to 30
+    days after the boundary has changed, since later transactions cannot alter
+    any event on or before it. A checkpoint holds:
+      - the number of events on or before the boundary
+      - the Section 104 pool at the boundary
+      - the sum of all purchases on or before the boundary, for HS285 exchanges
+      - purchases after the boundary that were partly matched against sales on
+        or before it under HS284, by their position among later purchases
+    """
+
+    def __init__(
+        self,
+        boundary: date,
+        fingerprint: str,
+        n_events: int,
+        pool: PooledPurchase,
+        purchased: Optional[PooledPurchase],
+        residuals: Dict[int, Purchase],
+    ):
+        self.boundary = boundary
+        self.fingerprint = fingerprint
+        self.n_events = n_events
+        self.pool = pool
+        self.purchased = purchased
+        self.residuals = residuals
+
+    @property
+    def cutoff(self) -> date:
+        """Last date of the transactions that this checkpoint depends on"""
+        return self.boundary + MATCHING_WINDOW
+
+    def __repr__(self) -> str:
+        return f"Checkpoint({self.boundary}, {self.n_events} events, {self.pool.units} units)"
+
+
+def tax_year_ends(first_date: date, last_date: date) -> List[date]:
+    """Every 5 April on or after the first date and before the last date"""
+    year = (
+        first_date.year
+        if first_date <= date(first_date.year, 4, 5)
+        else first_date.year + 1
+    )
+    boundaries = []
+    while date(year, 4, 5) < last_date:
+        boundaries.append(date(year, 4, 5))
+        year += 1
+    return boundaries
+
+
+def transaction_key(transaction: Transaction) -> bytes:
+    """Bytes identifying the type, date and amounts of a transaction, for digests"""
+    return repr(
+        (
+            type(transaction).__name__,
+            transaction.datetime.isoformat(),
+            str(transaction.units),
+            str(transaction.subtotal.amount),
+            str(transaction.fees.amount),
+            str(transaction.taxes.amount),
+            transaction.note,
+        )
+    ).encode("utf-8")
+
+
+def fingerprints(
+    sorted_transactions: List[Transaction], boundaries: List[date]
+) -> Dict[date, str]:
+    """Digest of the transactions up to 30 days after each boundary"""
+    digest = hashlib.sha256()
+    results = {}
+    transactions = iter(sorted_transactions)
+    transaction = next(transactions, None)
+    for boundary in sorted(boundaries):
+        while transaction and transaction.date <= boundary + MATCHING_WINDOW:
+            digest.update(transaction_key(transaction))
+            transaction = next(transactions, None)
+        results[boundary] = digest.hexdigest()
+    return results
@@ -4,7 +4,7 @@ import datetime
 from contextlib import suppress
 from decimal import InvalidOperation
 from math import isnan
-from typing import Any
+from typing import Any, Tuple
 
 # Third party imports
 from dateutil.parser import parse
@@ -53,3 +53,16 @@ def as_money(data: Any, currency: Currency) -> Money:
     if isnan(float(data)):
         return Money(0, currency)
     return Money(data, currency)
+
+
+def as_tax_year(data: Any) -> Tuple[datetime.date, datetime.date]:
+    """Convert a UK tax year [either YYYY-YY or YYYY-YYYY] into start and end dates"""
+    try:
+        start, end = str(data).split("-")
+        if int(end) not in (int(start) + 1, (int(start) + 1) % 100):
+            raise ValueError
+        return datetime.date(int(start), 4, 6), datetime.date(int(start) + 1, 4, 5)
+    except ValueError:
+        raise ValueError(
+            f"Could not interpret '{data if data else ''}' as a UK tax year!"
+        ) from None
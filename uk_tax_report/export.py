@@ -0,0 +1,187 @@
+"""Definition of the EventExporter class"""
+# Standard library imports
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Third-party imports
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as exc:
+    raise ImportError(
+        "Exporting events requires pyarrow: install the 'export' extra, "
+        "for example with poetry install --extras export"
+    ) from exc
+
+# Local imports
+from .account import Account
+from .security import Security
+from .transactions import Disposal
+
+# Supported formats, which are also the file extensions
+FORMATS = ("parquet", "arrow")
+EVENT_SCHEMA = pa.schema(
+    [
+        ("account", pa.string()),
+        ("security", pa.string()),
+        ("symbol", pa.string()),
+        ("currency", pa.string()),
+        ("sequence", pa.int32()),
+        ("datetime", pa.timestamp("us")),
+        ("type", pa.string()),
+        ("units", pa.float64()),
+        # Amounts of purchases, scrip dividends and ERIs
+        ("amount", pa.float64()),
+        ("fees", pa.float64()),
+        ("taxes", pa.float64()),
+        # Amounts of disposals, including bed-and-breakfasts
+        ("proceeds", pa.float64()),
+        ("cost", pa.float64()),
+        ("gain", pa.float64()),
+        ("is_null", pa.bool_()),
+        # Section 104 pool after the event
+        ("pool_units", pa.float64()),
+        ("pool_cost", pa.float64()),
+        ("pool_fees", pa.float64()),
+        ("pool_taxes", pa.float64()),
+    ]
+)
+POOL_SCHEMA = pa.schema(
+    [
+        ("account", pa.string()),
+        ("security", pa.string()),
+        ("symbol", pa.string()),
+        ("currency", pa.string()),
+        ("date", pa.date32()),
+        ("units", pa.float64()),
+        ("cost", pa.float64()),
+        ("unit_cost", pa.float64()),
+    ]
+)
+
+
+def event_columns(security: Security, account_name: str) -> Dict[str, List[Any]]:
+    """Columns of every resolved event of a security and the pool after it"""
+    columns: Dict[str, List[Any]] = {name: [] for name in EVENT_SCHEMA.names}
+    for sequence, (transaction, pool) in enumerate(security.events):
+        is_disposal = isinstance(transaction, Disposal)
+        values = {
+            "sequence": sequence,
+            "datetime": transaction.datetime,
+            "type": transaction.type,
+            "units": float(transaction.units),
+            "amount": None if is_disposal else float(transaction.total.amount),
+            "fees": None if is_disposal else float(transaction.fees.amount),
+            "taxes": None if is_disposal else float(transaction.taxes.amount),
+            "proceeds": float(transaction.sale_total.amount) if is_disposal else None,
+            "cost": float(transaction.purchase_total.amount) if is_disposal else None,
+            "gain": float(transaction.gain.amount) if is_disposal else None,
+            "is_null": transaction.is_null,
+            "pool_units": float(pool.units),
+            "pool_cost": float(pool.total.amount),
+            "pool_fees": float(pool.fees.amount),
+            "pool_taxes": float(pool.taxes.amount),
+        }
+        for name, value in values.items():
+            columns[name].append(value)
+    n_events = len(columns["sequence"])
+    columns["account"] = [account_name] * n_events
+    columns["security"] = [security.name] * n_events
+    # Securities without a symbol have NaN in its place
+    columns["symbol"] = [
+        security.symbol if isinstance(security.symbol, str) else None
+    ] * n_events
+    columns["currency"] = [security.currency.code] * n_events
+    return columns
+
+
+def pool_columns(events: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    """Columns of the pool at the end of each day with events, given the event columns"""
+    columns: Dict[str, List[Any]] = {name: [] for name in POOL_SCHEMA.names}
+    for idx, date_time in enumerate(events["datetime"]):
+        # Only the last event on each day determines the pool at the end of it
+        if idx + 1 < len(events["datetime"]) and (
+            events["datetime"][idx + 1].date() == date_time.date()
+        ):
+            continue
+        units, cost = events["pool_units"][idx], events["pool_cost"][idx]
+        for name in ("account", "security", "symbol", "currency"):
+            columns[name].append(events[name][idx])
+        columns["date"].append(date_time.date())
+        columns["units"].append(units)
+        columns["cost"].append(cost)
+        columns["unit_cost"].append(cost / units if units else None)
+    return columns
+
+
+class EventExporter:
+    """
+    Write resolved events and pool timelines to columnar files.
+
+    Events and pools go to separate Parquet or Arrow IPC files, and each
+    security is written as its own record batch as soon as it is added, so
+    only one security is held in memory at a time. Amounts are written as
+    floats in the currency of each security.
+    """
+
+    def __init__(self, events_path: str, pools_path: str, file_format: str = "parquet"):
+        if file_format not in FORMATS:
+            raise ValueError(
+                f"Unknown export format '{file_format}': use one of {', '.join(FORMATS)}"
+            )
+        self.file_format = file_format
+        self.writers_ = [
+            self.open(path, schema)
+            for path, schema in ((events_path, EVENT_SCHEMA), (pools_path, POOL_SCHEMA))
+        ]
+        self.n_events = 0
+
+    @classmethod
+    def in_directory(
+        cls, directory: str, prefix: str = "", file_format: str = "parquet"
+    ) -> "EventExporter":
+        """Exporter writing events and pools files, optionally prefixed, to a directory"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        prefix = f"{prefix}." if prefix else ""
+        return cls(
+            path / f"{prefix}events.{file_format}",
+            path / f"{prefix}pools.{file_format}",
+            file_format,
+        )
+
+    def __enter__(self) -> "EventExporter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def open(self, path: str, schema: pa.Schema) -> Any:
+        """Open a writer for one file"""
+        if self.file_format == "parquet":
+            return pq.ParquetWriter(str(path), schema)
+        return pa.ipc.new_file(str(path), schema)
+
+    def add_security(self, security: Security, account_name: str = "") -> None:
+        """Write the events and pool timeline of one security"""
+        events = event_columns(security, account_name)
+        if not events["sequence"]:
+            return
+        for writer, columns, schema in zip(
+            self.writers_,
+            (events, pool_columns(events)),
+            (EVENT_SCHEMA, POOL_SCHEMA),
+        ):
+            writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+        self.n_events += len(events["sequence"])
+
+    def add_account(self, account: Account, name: Optional[str] = None) -> None:
+        """Write the events and pool timelines of every security in an account"""
+        for security in sorted(account.securities):
+            self.add_security(security, account.name if name is None else name)
+
+    def close(self) -> None:
+        """Finish writing both files"""
+        for writer in self.writers_:
+            writer.close()
+        self.writers_ = []
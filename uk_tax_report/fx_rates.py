@@ -0,0 +1,89 @@
+"""Definition of the FxRates class"""
+# Standard library imports
+import csv
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Third-party imports
+import numpy as np
+
+
+class FxRates:
+    """
+    Daily exchange rates against a base currency.
+
+    Rates are read from a CSV file with the columns Date (YYYY-MM-DD), Currency
+    and Rate, where the rate is the number of units of the currency worth one
+    unit of the base currency. Each currency is held as sorted arrays of dates
+    and of rates, which are kept as the exact Decimals written in the file. An
+    amount is converted at the latest rate on or before its date, so weekends
+    and holidays use the previous rate.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        rows: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        with open(file_name, newline="", encoding="utf-8") as f_rates:
+            for row in csv.DictReader(f_rates):
+                rows[row["Currency"].strip().upper()].append(
+                    (row["Date"].strip()[:10], row["Rate"])
+                )
+        self.dates_: Dict[str, np.ndarray] = {}
+        self.rates_: Dict[str, np.ndarray] = {}
+        for code, values in rows.items():
+            dates = np.array([d for d, _ in values], dtype="datetime64[D]")
+            try:
+                rates = [Decimal(r.strip()) for _, r in values]
+            except InvalidOperation:
+                raise ValueError(
+                    f"Found an invalid {code} rate in {file_name}"
+                ) from None
+            if not all(rate > 0 for rate in rates):
+                raise ValueError(f"Found a non-positive {code} rate in {file_name}")
+            order = np.argsort(dates, kind="stable")
+            self.dates_[code] = dates[order]
+            self.rates_[code] = np.fromiter(rates, dtype=object, count=len(rates))[
+                order
+            ]
+        self.cache_: Dict[Tuple[str, date], Decimal] = {}
+
+    @property
+    def currencies(self) -> List[str]:
+        """Currencies with at least one rate"""
+        return sorted(self.dates_)
+
+    def rate(self, code: str, on_date: date) -> Decimal:
+        """Units of a currency worth one unit of the base currency on a date"""
+        key = (code, on_date)
+        if key not in self.cache_:
+            self.cache_[key] = self.rates(
+                code, np.array([on_date], dtype="datetime64[D]")
+            )[0]
+        return self.cache_[key]
+
+    def rates(self, code: str, dates: np.ndarray) -> np.ndarray:
+        """
+        Units of a currency worth one unit of the base currency on each date, as
+        an array of Decimals. Each distinct date is looked up once per call with
+        a binary search, which is cheaper than looking it up in the cache that
+        single rates use.
+        """
+        if code not in self.dates_:
+            raise ValueError(f"No {code} rates in {self.file_name}")
+        # Look up each distinct date once, since many transactions share a date
+        days, inverse = np.unique(
+            np.asarray(dates).astype("datetime64[D]"), return_inverse=True
+        )
+        indices = np.searchsorted(self.dates_[code], days, side="right") - 1
+        if days.size and indices[0] < 0:
+            raise ValueError(f"No {code} rate on or before {days[0]}")
+        return self.rates_[code][indices][inverse]
+
+
+@lru_cache(maxsize=8)
+def load_fx_rates(file_name: str) -> FxRates:
+    """Rates from a file, read only once per process"""
+    return FxRates(file_name)
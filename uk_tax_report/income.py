@@ -0,0 +1,213 @@
+"""Definition of the Income class"""
+# Standard library imports
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+from moneyed import GBP, Currency, Money
+
+# Local imports
+from .converters import abs_divide, as_money
+from .readers.data_file import BUY_TYPES, DIVIDEND_TYPES, SELL_TYPES
+
+# ERIs are reported (and based on holdings from) six months before they are booked
+ERI_OFFSET = pd.DateOffset(months=6)
+
+
+class Payment(NamedTuple):
+    """Dividend or ERI with the attributes used from the transaction it would become"""
+
+    date: date
+    type: str
+    units: Decimal
+    subtotal: Money
+    total: Money
+
+    @property
+    def unit_price(self) -> Money:
+        """Base price per unit, as for a Transaction"""
+        return abs_divide(self.subtotal, self.units)
+
+
+def as_tax_years(dates: pd.Series) -> pd.Series:
+    """UK tax year (in the form YYYY-YYYY) containing each date"""
+    dates = pd.to_datetime(dates)
+    before_april = (dates.dt.month < 4) | ((dates.dt.month == 4) & (dates.dt.day < 6))
+    start = dates.dt.year - before_april.astype(int)
+    return start.astype(str) + "-" + (start + 1).astype(str)
+
+
+def as_amounts(values: pd.Series) -> List[Decimal]:
+    """Exact amounts, read in the same way as the amounts of a Transaction"""
+    # The currency only labels the intermediate Money, so any currency will do
+    return [as_money(value, GBP).amount for value in values]
+
+
+def as_objects(values: List[Decimal]) -> np.ndarray:
+    """Object array of exact values, which np.array would build far more slowly"""
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+class Income:
+    """
+    Dividends and ERIs across a whole portfolio, read straight from the
+    normalised transaction table of a DataFile without building transactions.
+
+    Rows are classified as for DataFile.get_transaction_list and kept in the
+    order in which they are added to the securities of an account. Each income
+    row keeps the date it was booked and the date it was reported, which is six
+    months earlier for ERIs, together with the tax year of each. Rows are
+    selected and grouped with table operations, and amounts are held as exact
+    Decimals, so totals are identical to those of the transactions.
+    """
+
+    def __init__(self, df_transactions: pd.DataFrame):
+        types = df_transactions["Type"].str.lower()
+        notes = df_transactions["Note"].fillna("").astype(str).str.lower()
+        other = ~types.isin(BUY_TYPES) & ~types.isin(SELL_TYPES)
+        is_eri = other & (notes == "excess reportable income")
+        is_dividend = (
+            other & ~is_eri & types.isin(DIVIDEND_TYPES) & (notes != "scrip dividend")
+        )
+        selected = (is_eri | is_dividend).to_numpy()
+        rows = (
+            df_transactions[selected]
+            .assign(ERI=is_eri.to_numpy()[selected])
+            .sort_values("Cash Account", kind="stable")
+            .reset_index(drop=True)
+        )
+        eris = rows["ERI"].to_numpy()
+
+        # Dividends receive their amount less charges, while ERIs carry no charges
+        amounts = as_amounts(rows["Amount"])
+        fees = [
+            Decimal(0) if eri else fee
+            for eri, fee in zip(eris, as_amounts(rows["Fees"]))
+        ]
+        taxes = [
+            Decimal(0) if eri else tax
+            for eri, tax in zip(eris, as_amounts(rows["Taxes"]))
+        ]
+        totals = [
+            amount + (fee + tax) if eri else amount - (fee + tax)
+            for eri, amount, fee, tax in zip(eris, amounts, fees, taxes)
+        ]
+
+        booked = pd.to_datetime(rows["Date"])
+        reported = booked.where(~eris, booked - ERI_OFFSET)
+        self.df_income = pd.DataFrame(
+            {
+                "Date": booked,
+                "Tax Year": as_tax_years(booked),
+                "Reported": reported,
+                "Reported Tax Year": as_tax_years(reported),
+                "Cash Account": rows["Cash Account"],
+                "Security": rows["Security"],
+                "Symbol": rows["Symbol"] if "Symbol" in rows else np.nan,
+                "Type": np.where(eris, "ERI", "Dividend"),
+                "Units": as_objects([Decimal(units) for units in rows["Shares"]]),
+                "Amount": as_objects(amounts),
+                "Fees": as_objects(fees),
+                "Taxes": as_objects(taxes),
+                "Total": as_objects(totals),
+            }
+        )
+
+    def select(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        account_names: Optional[Iterable[str]] = None,
+        reported: bool = False,
+    ) -> pd.Series:
+        """
+        Mask of the income rows between the dates (inclusive) in some accounts,
+        using the reported rather than the booked dates if requested
+        """
+        df_income = self.df_income
+        days = df_income["Reported" if reported else "Date"].dt.normalize()
+        mask = pd.Series(True, index=df_income.index)
+        if start_date:
+            mask &= days >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= days <= pd.Timestamp(end_date)
+        if account_names is not None:
+            mask &= df_income["Cash Account"].isin(list(account_names))
+        return mask
+
+    def details(self, *args, **kwargs) -> pd.DataFrame:
+        """Income rows, selected as for select"""
+        return self.df_income[self.select(*args, **kwargs)]
+
+    def totals(
+        self,
+        *args,
+        by: Sequence[str] = ("Cash Account", "Security", "Tax Year", "Type"),
+        **kwargs,
+    ) -> pd.DataFrame:
+        """
+        Number of payments and exact total income for each group of rows, with
+        the rows selected as for select
+        """
+        totals = (
+            self.details(*args, **kwargs)
+            .groupby(list(by))["Total"]
+            .agg(["count", "sum"])
+        )
+        return pd.DataFrame(
+            {
+                "Count": totals["count"],
+                "Total": [Decimal(total) for total in totals["sum"]],
+            },
+            index=totals.index,
+        ).reset_index()
+
+    def payments(
+        self,
+        periods: Sequence[Tuple[date, date]],
+        currency: Currency,
+        account_names: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, List[Payment]]]:
+        """
+        Payments to each security in each period (inclusive of both dates) in
+        some accounts, in the order in which Security.dividends lists them
+        """
+        df_income = self.df_income
+        rows = list(
+            zip(
+                df_income["Security"],
+                df_income["Date"].dt.date,
+                df_income["Type"],
+                df_income["Units"],
+                df_income["Amount"],
+                df_income["Total"],
+            )
+        )
+        days = df_income["Date"].dt.normalize().to_numpy()
+        in_accounts = self.select(account_names=account_names).to_numpy()
+        # Each row is only converted to Money once, however many periods include it
+        converted: Dict[int, Payment] = {}
+        results = []
+        for start_date, end_date in periods:
+            payments: Dict[str, List[Payment]] = {}
+            selected = (
+                in_accounts
+                & (days >= np.datetime64(start_date))
+                & (days <= np.datetime64(end_date))
+            )
+            for idx in np.flatnonzero(selected):
+                security, booked, type_, units, amount, total = rows[idx]
+                if idx not in converted:
+                    converted[idx] = Payment(
+                        booked,
+                        type_,
+                        units,
+                        Money(amount, currency),
+                        Money(total, currency),
+                    )
+                payments.setdefault(security, []).append(converted[idx])
+            results.append(payments)
+        return results
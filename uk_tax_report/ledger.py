@@ -0,0 +1,441 @@
+"""Definition of the Ledger class"""
+# Standard library imports
+import hashlib
+import json
+import logging
+import sqlite3
+from datetime import date
+from math import isnan
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+# Third-party imports
+from moneyed import Currency, Money
+
+# Local imports
+from .checkpoint import Checkpoint
+from .transactions import (
+    BedAndBreakfast,
+    Disposal,
+    ExcessReportableIncome,
+    PooledPurchase,
+    Purchase,
+    ScripDividend,
+    Transaction,
+)
+
+if TYPE_CHECKING:
+    from .readers import DataFile
+    from .security import Security
+
+# Columns of the transaction table, mapped to columns of the ledger
+COLUMNS = {
+    "Date": "date",
+    "Type": "type",
+    "Security": "security",
+    "Shares": "shares",
+    "Amount": "amount",
+    "Fees": "fees",
+    "Taxes": "taxes",
+    "Cash Account": "account",
+    "ISIN": "isin",
+    "Symbol": "symbol",
+    "Note": "note",
+}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    account TEXT NOT NULL,
+    security TEXT NOT NULL,
+    symbol TEXT,
+    isin TEXT,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    shares TEXT,
+    amount TEXT,
+    fees TEXT,
+    taxes TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_account_security_date
+    ON transactions (account, security, date);
+CREATE INDEX IF NOT EXISTS transactions_security_date
+    ON transactions (security, date);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+CREATE TABLE IF NOT EXISTS resolutions (
+    scope TEXT NOT NULL,
+    security TEXT NOT NULL,
+    n_transactions INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    PRIMARY KEY (scope, security)
+);
+CREATE TABLE IF NOT EXISTS events (
+    scope TEXT NOT NULL,
+    security TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    date TEXT NOT NULL,
+    units TEXT NOT NULL,
+    subtotal TEXT,
+    fees TEXT,
+    taxes TEXT,
+    note TEXT,
+    purchase_total TEXT,
+    purchase_fees TEXT,
+    purchase_taxes TEXT,
+    sale_total TEXT,
+    sale_fees TEXT,
+    sale_taxes TEXT,
+    pool_date TEXT NOT NULL,
+    pool_units TEXT NOT NULL,
+    pool_subtotal TEXT NOT NULL,
+    pool_fees TEXT NOT NULL,
+    pool_taxes TEXT NOT NULL,
+    PRIMARY KEY (scope, security, idx)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    scope TEXT NOT NULL,
+    security TEXT NOT NULL,
+    boundary TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    n_events INTEGER NOT NULL,
+    pool TEXT NOT NULL,
+    purchased TEXT,
+    residuals TEXT NOT NULL,
+    PRIMARY KEY (scope, security, boundary)
+);
+"""
+DISPOSAL_AMOUNTS = (
+    "purchase_total",
+    "purchase_fees",
+    "purchase_taxes",
+    "sale_total",
+    "sale_fees",
+    "sale_taxes",
+)
+TRANSACTION_AMOUNTS = ("subtotal", "fees", "taxes")
+EVENT_TYPES = {
+    cls.__name__: cls
+    for cls in (
+        BedAndBreakfast,
+        Disposal,
+        ExcessReportableIncome,
+        Purchase,
+        ScripDividend,
+    )
+}
+
+
+def as_text(value: Any) -> Optional[str]:
+    """Store a value as exact text, with missing values as NULL"""
+    if value is None:
+        return None
+    if isinstance(value, Money):
+        return str(value.amount)
+    if isinstance(value, float) and isnan(value):
+        return None
+    return str(value)
+
+
+def pool_as_text(pool: Optional[PooledPurchase]) -> Optional[str]:
+    """Store a pool as a JSON list of exact values"""
+    if pool is None:
+        return None
+    return json.dumps(
+        [
+            str(pool.datetime),
+            str(pool.units),
+            as_text(pool.subtotal),
+            as_text(pool.fees),
+            as_text(pool.taxes),
+        ]
+    )
+
+
+def pool_from_text(text: Optional[str], currency: Currency) -> Optional[PooledPurchase]:
+    """Restore a pool stored as a JSON list of exact values"""
+    if text is None:
+        return None
+    date_time, units, subtotal, fees, taxes = json.loads(text)
+    return PooledPurchase(
+        currency,
+        date_time=date_time,
+        units=units,
+        subtotal=subtotal,
+        fees=fees,
+        taxes=taxes,
+    )
+
+
+class Ledger:
+    """
+    Persistent SQLite store of transactions and resolved events.
+
+    Transactions are only ever appended: each row is identified by a
+    fingerprint of its contents, so re-importing a file that has grown only
+    adds the new rows. Resolved events are stored for each security together
+    with the number of transactions and the last row they were resolved from,
+    so that they can be reused until new transactions arrive. When they are
+    out of date, resolution resumes from the latest stored checkpoint whose
+    transactions are unchanged.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "Ledger":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection to the database"""
+        self.connection.close()
+
+    def append(self, data: "DataFile") -> int:
+        """Append any transactions from a data file that are not already in the ledger"""
+        rows = []
+        occurrences: Dict[tuple, int] = {}
+        df_transactions = data.df_transactions
+        columns = [c for c in COLUMNS if c in df_transactions.columns]
+        for values in df_transactions[columns].itertuples(index=False, name=None):
+            row = {COLUMNS[c]: as_text(v) for c, v in zip(columns, values)}
+            # Identical rows in one file are distinct transactions, so count them
+            key = tuple(row[c] for c in sorted(row))
+            occurrences[key] = occurrences.get(key, 0) + 1
+            row["fingerprint"] = hashlib.sha256(
+                repr((key, occurrences[key])).encode("utf-8")
+            ).hexdigest()
+            rows.append(row)
+        names = ["fingerprint"] + [COLUMNS[c] for c in columns]
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO transactions ({', '.join(names)}) "
+                f"VALUES ({', '.join(':' + name for name in names)})",
+                rows,
+            )
+            added = self.connection.total_changes - before
+        logging.debug(f"Added {added} of {len(rows)} transactions to {self.file_name}")
+        return added
+
+    def account_names(self) -> List[str]:
+        """Names of all accounts in the ledger"""
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT DISTINCT account FROM transactions ORDER BY account"
+            )
+        ]
+
+    def securities(self, account_name: str) -> List[Tuple[Optional[str], str]]:
+        """Symbols and names of the securities in an account"""
+        return list(
+            self.connection.execute(
+                "SELECT DISTINCT symbol, security FROM transactions WHERE account = ?",
+                (account_name,),
+            )
+        )
+
+    def transactions(
+        self,
+        account_name: str,
+        security_name: str,
+    ) -> List[Dict[str, Optional[str]]]:
+        """Rows for one security in one account, in date order"""
+        cursor = self.connection.execute(
+            f"SELECT {', '.join(COLUMNS.values())} FROM transactions "
+            "WHERE account = ? AND security = ? ORDER BY date, id",
+            (account_name, security_name),
+        )
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def fingerprint(
+        self, account_names: Iterable[str], security_name: str
+    ) -> Tuple[int, int]:
+        """Number of transactions and last row for a security across accounts"""
+        account_names = list(account_names)
+        placeholders = ", ".join("?" for _ in account_names)
+        return tuple(
+            self.connection.execute(
+                "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM transactions "
+                f"WHERE security = ? AND account IN ({placeholders})",
+                (security_name, *account_names),
+            ).fetchone()
+        )
+
+    def save_events(self, account_names: Iterable[str], security: "Security") -> None:
+        """Store the resolved events of a security drawn from these accounts"""
+        account_names = sorted(account_names)
+        scope = "\n".join(account_names)
+        rows = []
+        for idx, (transaction, pool) in enumerate(security.events):
+            amounts = (
+                DISPOSAL_AMOUNTS
+                if isinstance(transaction, Disposal)
+                else TRANSACTION_AMOUNTS
+            )
+            row = dict.fromkeys(DISPOSAL_AMOUNTS + TRANSACTION_AMOUNTS)
+            row.update({name: as_text(getattr(transaction, name)) for name in amounts})
+            row.update(
+                {
+                    "scope": scope,
+                    "security": security.name,
+                    "idx": idx,
+                    "kind": type(transaction).__name__,
+                    "date": str(transaction.datetime),
+                    "units": str(transaction.units),
+                    "note": transaction.note,
+                    "pool_date": str(pool.datetime),
+                    "pool_units": str(pool.units),
+                    "pool_subtotal": as_text(pool.subtotal),
+                    "pool_fees": as_text(pool.fees),
+                    "pool_taxes": as_text(pool.taxes),
+                }
+            )
+            rows.append(row)
+        checkpoints = [
+            (
+                scope,
+                security.name,
+                str(checkpoint.boundary),
+                checkpoint.fingerprint,
+                checkpoint.n_events,
+                pool_as_text(checkpoint.pool),
+                pool_as_text(checkpoint.purchased),
+                json.dumps(
+                    {
+                        idx: [str(p.datetime), str(p.units)]
+                        + [as_text(p.subtotal), as_text(p.fees), as_text(p.taxes)]
+                        for idx, p in checkpoint.residuals.items()
+                    }
+                ),
+            )
+            for checkpoint in security.checkpoints_
+        ]
+        n_transactions, last_id = self.fingerprint(account_names, security.name)
+        with self.connection:
+            for table in ("events", "checkpoints"):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE scope = ? AND security = ?",
+                    (scope, security.name),
+                )
+            self.connection.executemany(
+                "INSERT INTO events (scope, security, idx, kind, date, units, subtotal, "
+                "fees, taxes, note, purchase_total, purchase_fees, purchase_taxes, "
+                "sale_total, sale_fees, sale_taxes, pool_date, pool_units, "
+                "pool_subtotal, pool_fees, pool_taxes) VALUES (:scope, :security, "
+                ":idx, :kind, :date, :units, :subtotal, :fees, :taxes, :note, "
+                ":purchase_total, :purchase_fees, :purchase_taxes, :sale_total, "
+                ":sale_fees, :sale_taxes, :pool_date, :pool_units, :pool_subtotal, "
+                ":pool_fees, :pool_taxes)",
+                rows,
+            )
+            self.connection.executemany(
+                "INSERT INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", checkpoints
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?)",
+                (scope, security.name, n_transactions, last_id),
+            )
+
+    def is_current(self, account_names: List[str], security_name: str) -> bool:
+        """Whether the stored events for a security include every transaction"""
+        stored = self.connection.execute(
+            "SELECT n_transactions, last_id FROM resolutions "
+            "WHERE scope = ? AND security = ?",
+            ("\n".join(account_names), security_name),
+        ).fetchone()
+        return bool(stored) and tuple(stored) == self.fingerprint(
+            account_names, security_name
+        )
+
+    def load_events(
+        self,
+        account_names: Iterable[str],
+        security_name: str,
+        currency: Currency,
+        current: bool = True,
+    ) -> Optional[List[Tuple[Transaction, PooledPurchase]]]:
+        """Stored events for a security, or None if they must be current and are not"""
+        account_names = sorted(account_names)
+        if current and not self.is_current(account_names, security_name):
+            return None
+        cursor = self.connection.execute(
+            "SELECT kind, date, units, subtotal, fees, taxes, note, purchase_total, "
+            "purchase_fees, purchase_taxes, sale_total, sale_fees, sale_taxes, "
+            "pool_date, pool_units, pool_subtotal, pool_fees, pool_taxes "
+            "FROM events WHERE scope = ? AND security = ? ORDER BY idx",
+            ("\n".join(account_names), security_name),
+        )
+        events = []
+        for row in cursor:
+            kind, date_time, units = row[0:3]
+            if kind in ("Disposal", "BedAndBreakfast"):
+                transaction = Disposal(date_time, currency, units, *row[7:13])
+                if kind == "BedAndBreakfast":
+                    transaction = BedAndBreakfast(transaction)
+            elif kind == "ExcessReportableIncome":
+                transaction = ExcessReportableIncome(
+                    date_time, currency, units, row[3], note=row[6]
+                )
+            else:
+                transaction = EVENT_TYPES[kind](date_time, currency, units, *row[3:7])
+            pool = PooledPurchase(
+                currency,
+                date_time=row[13],
+                units=row[14],
+                subtotal=row[15],
+                fees=row[16],
+                taxes=row[17],
+            )
+            events.append((transaction, pool))
+        return events
+
+    def load_checkpoints(
+        self, account_names: Iterable[str], security_name: str, currency: Currency
+    ) -> List[Checkpoint]:
+        """Stored checkpoints for a security, in date order"""
+        cursor = self.connection.execute(
+            "SELECT boundary, fingerprint, n_events, pool, purchased, residuals "
+            "FROM checkpoints WHERE scope = ? AND security = ? ORDER BY boundary",
+            ("\n".join(sorted(account_names)), security_name),
+        )
+        return [
+            Checkpoint(
+                date.fromisoformat(boundary),
+                fingerprint,
+                n_events,
+                pool_from_text(pool, currency),
+                pool_from_text(purchased, currency),
+                {
+                    int(idx): Purchase(date_time, currency, units, *amounts)
+                    for idx, (date_time, units, *amounts) in json.loads(
+                        residuals
+                    ).items()
+                },
+            )
+            for boundary, fingerprint, n_events, pool, purchased, residuals in cursor
+        ]
+
+    def resolve(self, account_names: Iterable[str], securities: List["Security"]):
+        """Reuse stored events where they are valid, resolving and storing the rest"""
+        account_names = sorted(account_names)
+        for security in securities:
+            events = self.load_events(account_names, security.name, security.currency)
+            if events is None:
+                # Resume from the stored checkpoints rather than resolving everything
+                security.load_checkpoints(
+                    self.load_events(
+                        account_names, security.name, security.currency, False
+                    ),
+                    self.load_checkpoints(
+                        account_names, security.name, security.currency
+                    ),
+                )
+                self.save_events(account_names, security)
+            else:
+                security.load_events(events)
@@ -0,0 +1,210 @@
+"""Definition of the PriceHistory class"""
+# Standard library imports
+import json
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+# Third-party imports
+import numpy as np
+
+# Local imports
+from .security import Security
+
+# Portfolio Performance stores quotes as integers scaled by this factor
+PRICE_FACTOR = 10**8
+# Epoch for storing dates as day numbers
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+def as_days(dates: Union[date, Iterable[date], np.ndarray]) -> np.ndarray:
+    """Convert one or more dates into an array of numpy days"""
+    if isinstance(dates, date):
+        dates = [dates]
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+class PriceHistory:
+    """
+    Daily closing prices for each security, held as sorted arrays of dates and
+    prices. A security is valued at its latest price on or before each date.
+    """
+
+    def __init__(self):
+        self.dates_: Dict[str, np.ndarray] = {}
+        self.prices_: Dict[str, np.ndarray] = {}
+        self.holdings_: Dict[
+            Security, Tuple[list, np.ndarray, np.ndarray, np.ndarray]
+        ] = {}
+
+    @classmethod
+    def from_xml(cls, file_name: str) -> "PriceHistory":
+        """
+        Read the prices of every security in a Portfolio Performance XML file.
+
+        The file is streamed, and each security is cleared once read, so that
+        only the compact arrays of prices are kept in memory.
+        """
+        history = cls()
+        path: List[str] = []
+        name, container = None, None
+        days, prices = array("q"), array("q")
+        with open(file_name, "rb") as f_xml:
+            for event, element in ET.iterparse(f_xml, events=("start", "end")):
+                if event == "start":
+                    path.append(element.tag)
+                    if path == ["client", "securities", "security", "prices"]:
+                        container = element
+                    continue
+                path.pop()
+                # Only securities directly under the client hold prices
+                if path == ["client", "securities", "security", "prices"]:
+                    if "t" in element.attrib:
+                        days.append(date.fromisoformat(element.attrib["t"]).toordinal())
+                        prices.append(int(element.attrib["v"]))
+                    # Discard each price once read
+                    container.clear()
+                elif path == ["client", "securities", "security"]:
+                    if element.tag == "name":
+                        name = element.text
+                elif path == ["client", "securities"]:
+                    if name and days:
+                        history.add_prices(
+                            name,
+                            (np.frombuffer(days, dtype=np.int64) - EPOCH).astype(
+                                "datetime64[D]"
+                            ),
+                            np.frombuffer(prices, dtype=np.int64) / PRICE_FACTOR,
+                        )
+                    name, container = None, None
+                    days, prices = array("q"), array("q")
+                    element.clear()
+                elif path == ["client"] and element.tag == "securities":
+                    # Prices only appear in the securities, so stop reading here
+                    break
+        return history
+
+    @classmethod
+    def load(cls, directory: str) -> "PriceHistory":
+        """Open prices saved by save as memory-mapped arrays"""
+        history = cls()
+        path = Path(directory)
+        with open(path / "index.json", "r", encoding="utf-8") as f_index:
+            names = json.load(f_index)
+        for idx, name in enumerate(names):
+            history.dates_[name] = np.load(path / f"{idx}.dates.npy", mmap_mode="r")
+            history.prices_[name] = np.load(path / f"{idx}.prices.npy", mmap_mode="r")
+        return history
+
+    @property
+    def securities(self) -> List[str]:
+        """Names of the securities with at least one price"""
+        return sorted(self.dates_)
+
+    def add_prices(self, name: str, dates: np.ndarray, prices: np.ndarray) -> None:
+        """Add prices for a security, keeping the last price given for each date"""
+        dates = as_days(dates)
+        if name in self.dates_:
+            dates = np.concatenate([self.dates_[name], dates])
+            prices = np.concatenate([self.prices_[name], prices])
+        # Reverse before taking unique dates so that later prices win
+        dates, prices = dates[::-1], np.asarray(prices, dtype=np.float64)[::-1]
+        self.dates_[name], indices = np.unique(dates, return_index=True)
+        self.prices_[name] = prices[indices]
+
+    def prices(self, name: str, dates: Any) -> np.ndarray:
+        """Latest price of a security on or before each date, or NaN if there is none"""
+        days = as_days(dates)
+        if name not in self.dates_:
+            return np.full(days.shape, np.nan)
+        indices = np.searchsorted(self.dates_[name], days, side="right") - 1
+        return np.where(
+            indices >= 0, self.prices_[name][np.maximum(indices, 0)], np.nan
+        )
+
+    def save(self, directory: str) -> None:
+        """Save the prices as arrays that can be loaded as memory-mapped files"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        names = self.securities
+        for idx, name in enumerate(names):
+            np.save(path / f"{idx}.dates.npy", self.dates_[name])
+            np.save(path / f"{idx}.prices.npy", self.prices_[name])
+        with open(path / "index.json", "w", encoding="utf-8") as f_index:
+            json.dump(names, f_index)
+
+    def holdings(self, security: Security) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Dates of the events of a security, with the units and cost of the pool
+        after each, as arrays. These are built once each time the security is
+        resolved and then reused for every valuation.
+        """
+        events = security.events
+        cached = self.holdings_.get(security)
+        if cached is None or cached[0] is not events:
+            ordinals = np.fromiter(
+                (day.toordinal() for day in security.event_dates_),
+                dtype=np.int64,
+                count=len(events),
+            )
+            cached = self.holdings_[security] = (
+                events,
+                (ordinals - EPOCH).astype("datetime64[D]"),
+                np.fromiter(
+                    (float(pool.units) for _, pool in events),
+                    dtype=np.float64,
+                    count=len(events),
+                ),
+                # The cost of a pool is its subtotal plus its charges, added as
+                # Decimals without building the Money total of every pool
+                np.fromiter(
+                    (
+                        float(
+                            pool.subtotal.amount
+                            + (pool.fees.amount + pool.taxes.amount)
+                        )
+                        for _, pool in events
+                    ),
+                    dtype=np.float64,
+                    count=len(events),
+                ),
+            )
+        return cached[1:]
+
+    def valuation(self, securities: Iterable[Security], dates: Any) -> Dict[str, Any]:
+        """
+        Units, cost and market value of every security held on each date, with
+        totals and the unrealised gain. Securities without a price on a date
+        are valued at NaN, which is left out of the totals.
+        """
+        days = as_days(dates)
+        results: Dict[str, Any] = {"dates": days, "securities": {}}
+        cost_total = np.zeros(days.shape)
+        value_total = np.zeros(days.shape)
+        for security in securities:
+            event_days, units, costs = self.holdings(security)
+            if not event_days.size:
+                continue
+            # Pool state after the last event on or before each date
+            indices = np.searchsorted(event_days, days, side="right") - 1
+            held = indices >= 0
+            units = np.where(held, units[np.maximum(indices, 0)], 0.0)
+            cost = np.where(held, costs[np.maximum(indices, 0)], 0.0)
+            if not units.any():
+                continue
+            value = np.where(units > 0, units * self.prices(security.name, days), 0.0)
+            results["securities"][security.name] = {
+                "symbol": security.symbol,
+                "units": units,
+                "cost": cost,
+                "value": value,
+            }
+            priced = ~np.isnan(value)
+            cost_total += np.where(priced, cost, 0.0)
+            value_total += np.where(priced, value, 0.0)
+        results["cost"] = cost_total
+        results["value"] = value_total
+        results["gain"] = value_total - cost_total
+        return results
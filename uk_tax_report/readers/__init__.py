@@ -1,10 +1,42 @@
 """Readers module"""
-from .csv_data_file import CsvDataFile
-from .data_file import DataFile
-from .xml_data_file import XmlDataFile
+# Standard library imports
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Local imports
+from .loader import load_data_file
+
+if TYPE_CHECKING:
+    from .csv_data_file import CsvDataFile
+    from .data_file import DataFile
+    from .ledger_data_file import LedgerDataFile
+    from .merged_data_file import MergedDataFile
+    from .portfolio_data_file import PortfolioDataFile
+    from .xml_data_file import XmlDataFile
+
+# Readers depend on pandas, so they are only imported when first used
+READERS = {
+    "CsvDataFile": ".csv_data_file",
+    "DataFile": ".data_file",
+    "LedgerDataFile": ".ledger_data_file",
+    "MergedDataFile": ".merged_data_file",
+    "PortfolioDataFile": ".portfolio_data_file",
+    "XmlDataFile": ".xml_data_file",
+}
+
+
+def __getattr__(name: str):
+    if name in READERS:
+        return getattr(import_module(READERS[name], __name__), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
 
 __all__ = [
     "CsvDataFile",
     "DataFile",
+    "LedgerDataFile",
+    "MergedDataFile",
+    "PortfolioDataFile",
     "XmlDataFile",
+    "load_data_file",
 ]
@@ -1,6 +1,7 @@
 """Definition of the CsvReader class"""
 # Standard library imports
 import logging
+from typing import Any
 
 # Third-party imports
 import pandas as pd
@@ -12,15 +13,20 @@ from .data_file import DataFile
 class CsvDataFile(DataFile):
     """Read a PortfolioPerformance CSV file"""
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, **filters: Any):
         super().__init__()
 
         # Read all CSV entries with a valid symbol and security
-        self.df_transactions = pd.read_csv(file_name)
+        # Numbers may contain thousands separators, so read them as text
+        self.df_transactions = pd.read_csv(
+            file_name, dtype={"Shares": str, "Amount": str}
+        )
         self.df_transactions.dropna(subset=["Symbol", "Security"], inplace=True)
 
         # Set datatypes
         self.df_transactions["Date"] = pd.to_datetime(self.df_transactions["Date"])
+        # Drop any rows excluded by the account, security and date filters
+        self.filter_rows(**filters)
         self.df_transactions["Shares"] = self.df_transactions["Shares"].str.replace(
             ",", ""
         )
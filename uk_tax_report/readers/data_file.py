@@ -1,12 +1,16 @@
 """Definition of the Reader class"""
 # Standard library imports
-from typing import Dict, List, Set
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
 
 # Third-party imports
+import numpy as np
 import pandas as pd
 from moneyed import Currency
 
 # Local imports
+from ..checkpoint import MATCHING_WINDOW
 from ..transactions import (
     Dividend,
     ExcessReportableIncome,
@@ -16,12 +20,46 @@ from ..transactions import (
     Transaction,
 )
 
+if TYPE_CHECKING:
+    from ..fx_rates import FxRates
+    from ..income import Income
+
+# Columns holding amounts in the currency of the security
+AMOUNT_COLUMNS = ("Amount", "Fees", "Taxes")
+# Converted amounts are rounded to this many decimal places
+AMOUNT_PLACES = Decimal("1e-8")
+# Transaction types that add units to or remove units from a holding
+BUY_TYPES = ["buy", "delivery_inbound"]
+SELL_TYPES = ["sell", "delivery_outbound", "transfer_out"]
+DIVIDEND_TYPES = ["dividend", "dividends"]
+
+
+def as_converted(values: pd.Series, rates: np.ndarray) -> np.ndarray:
+    """
+    Amounts divided by their exact rates and rounded to AMOUNT_PLACES, keeping
+    blank amounts blank. Amounts are read as Decimals in the same way as those
+    of a Transaction, so no binary rounding error is introduced.
+    """
+    return np.fromiter(
+        (
+            value
+            if pd.isna(value)
+            else (Decimal(str(value)) / rate).quantize(AMOUNT_PLACES)
+            for value, rate in zip(values, rates)
+        ),
+        dtype=object,
+        count=len(values),
+    )
+
 
 class DataFile:
     """Read a PortfolioPerformance data file"""
 
     def __init__(self):
         self.df_transactions: pd.DataFrame
+        self.indices_: Optional[Dict[tuple, List[int]]] = None
+        self.securities_: Optional[Dict[str, list]] = None
+        self.income_: Optional["Income"] = None
 
     @property
     def account_names(self) -> Set[str]:
@@ -31,28 +69,176 @@ class DataFile:
     @property
     def securities(self) -> Dict[str, pd.DataFrame]:
         """Dictionary of account_name -> DataFrame where the DataFrame contains unique symbols and names of securities in that account"""
-        securities = {}
-        for account_name in self.account_names:
-            securities[account_name] = sorted(
-                set(
-                    self.df_transactions.loc[
-                        (self.df_transactions["Cash Account"] == account_name)
-                    ][["Symbol", "Security"]].itertuples(index=False)
-                ),
-                key=lambda t: t.Security.lower(),
+        # Group the table once rather than again for every account
+        if self.securities_ is None:
+            securities = {account_name: set() for account_name in self.account_names}
+            for account_name, df_account in self.df_transactions.groupby(
+                "Cash Account"
+            ):
+                securities[account_name] = set(
+                    df_account[["Symbol", "Security"]].itertuples(index=False)
+                )
+            self.securities_ = {
+                account_name: sorted(symbols, key=lambda t: t.Security.lower())
+                for account_name, symbols in securities.items()
+            }
+        return self.securities_
+
+    @property
+    def income(self) -> Optional["Income"]:
+        """Dividends and ERIs in every account, read from the table once"""
+        if self.income_ is None:
+            # The income module reads the transaction types from this module
+            # pylint: disable=import-outside-toplevel
+            from ..income import Income
+
+            self.income_ = Income(self.df_transactions)
+        return self.income_
+
+    def active_securities(self, start_date: date, end_date: date) -> Set[str]:
+        """
+        Names of the securities that could appear in a report between these dates
+        (inclusive), found from the transaction table without resolving anything.
+
+        A security is active if it was sold or paid income between the dates, or
+        if units were held at any point between them. Units are counted directly,
+        which matches the pool unless a sale could be matched against a purchase
+        in the following 30 days or was an exchange, so these are kept as well.
+        Reports combine the selected accounts, as Account.__add__ does, so units
+        are counted and sales matched across all of them for each security.
+        """
+        df_transactions = self.df_transactions.sort_values("Date", kind="stable")
+        types = df_transactions["Type"].str.lower()
+        notes = df_transactions["Note"].fillna("").astype(str).str.lower()
+        days = df_transactions["Date"].dt.normalize()
+        in_range = (days >= pd.Timestamp(start_date)) & (days <= pd.Timestamp(end_date))
+        is_buy = types.isin(BUY_TYPES)
+        is_sale = types.isin(SELL_TYPES)
+        is_eri = ~is_buy & ~is_sale & (notes == "excess reportable income")
+        is_dividend = types.isin(DIVIDEND_TYPES) & (notes != "scrip dividend")
+        active = in_range & (is_sale | is_eri | is_dividend)
+
+        # Units held after each change, which is zero for other transactions
+        securities = df_transactions["Security"]
+        shares = pd.to_numeric(df_transactions["Shares"], errors="coerce").fillna(0)
+        change = shares.where(is_buy, 0) - shares.where(is_sale, 0)
+        changes = is_buy | is_sale
+        units = change.groupby(securities).cumsum()
+        held = changes & (units > 1e-9)
+        active |= held & in_range
+        # Units held at the start date are those after the last earlier change
+        before = changes & (days < pd.Timestamp(start_date))
+        last_before = held[before].groupby(securities[before]).last()
+        active_securities = set(last_before[last_before].index)
+
+        # Sales that could be matched against a purchase, where the pool may differ
+        is_sale &= days <= pd.Timestamp(end_date)
+        sales = pd.DataFrame({"Security": securities[is_sale], "Day": days[is_sale]})
+        purchases = pd.DataFrame(
+            {
+                "Security": securities[is_buy | is_eri],
+                "Purchased": days[is_buy | is_eri],
+            }
+        )
+        matched = pd.merge_asof(
+            sales.sort_values("Day"),
+            purchases.sort_values("Purchased"),
+            left_on="Day",
+            right_on="Purchased",
+            by="Security",
+            direction="forward",
+            tolerance=pd.Timedelta(MATCHING_WINDOW),
+        ).dropna(subset=["Purchased"])
+        exchanges = is_sale & notes.str.contains("exchange")
+
+        active_securities |= set(securities[active | exchanges])
+        active_securities |= set(matched["Security"])
+        return active_securities
+
+    @property
+    def currencies(self) -> Set[str]:
+        """Currencies of the securities in this file, where known"""
+        if "currencyCode" not in self.df_transactions.columns:
+            return set()
+        return set(self.df_transactions["currencyCode"].dropna())
+
+    def convert_currencies(self, fx_rates: "FxRates", currency: str) -> int:
+        """
+        Convert the amounts of securities held in other currencies at the rate on
+        each trade date, returning the number of converted transactions
+        """
+        if "currencyCode" not in self.df_transactions.columns:
+            return 0
+        codes = self.df_transactions["currencyCode"]
+        converted = 0
+        for code in codes.dropna().unique():
+            if code == currency:
+                continue
+            # Convert every transaction in this currency in one step
+            mask = (codes == code).to_numpy()
+            rates = fx_rates.rates(
+                code, self.df_transactions.loc[mask, "Date"].to_numpy()
             )
-        return securities
+            for column in AMOUNT_COLUMNS:
+                self.df_transactions.loc[mask, column] = as_converted(
+                    self.df_transactions.loc[mask, column], rates
+                )
+            self.df_transactions.loc[mask, "currencyCode"] = currency
+            converted += int(mask.sum())
+        self.indices_ = None
+        self.securities_ = None
+        self.income_ = None
+        return converted
+
+    def filter_rows(
+        self,
+        account_names: Optional[Iterable[str]] = None,
+        security_names: Optional[Iterable[str]] = None,
+        end_date: Optional[date] = None,
+    ) -> None:
+        """
+        Keep only the rows needed to report on some accounts and securities up to
+        an end date. Earlier rows are all kept since they determine pool costs, as
+        are rows in the following 30 days that can be matched against sales.
+        """
+        df_transactions = self.df_transactions
+        mask = pd.Series(True, index=df_transactions.index)
+        if account_names:
+            mask &= df_transactions["Cash Account"].isin(list(account_names))
+        if security_names is not None:
+            security_names = list(security_names)
+            mask &= df_transactions["Security"].isin(security_names) | df_transactions[
+                "Symbol"
+            ].isin(security_names)
+        if end_date:
+            cutoff = end_date + MATCHING_WINDOW + timedelta(days=1)
+            mask &= df_transactions["Date"] < pd.Timestamp(cutoff)
+        if not mask.all():
+            self.df_transactions = df_transactions[mask].copy()
+            self.indices_ = None
+            self.securities_ = None
+            self.income_ = None
+
+    def get_transactions(self, account_name: str, security_name: str) -> pd.DataFrame:
+        """Rows of the transaction table for a given account and security"""
+        # Index the table once rather than scanning it for every security
+        if self.indices_ is None:
+            self.indices_ = self.df_transactions.groupby(
+                ["Cash Account", "Security"]
+            ).indices
+        return self.df_transactions.iloc[
+            self.indices_.get((account_name, security_name), [])
+        ]
 
     def get_transaction_list(
         self, account_name: str, security_name: str, currency: Currency
     ) -> List[Transaction]:
         """List of all transactions for a given account and security"""
         transactions = []
-        for _, transaction in self.df_transactions.loc[
-            (self.df_transactions["Cash Account"] == account_name)
-            & (self.df_transactions["Security"] == security_name)
-        ].iterrows():
-            if transaction.Type.lower() in ["buy", "delivery_inbound"]:
+        for _, transaction in self.get_transactions(
+            account_name, security_name
+        ).iterrows():
+            if transaction.Type.lower() in BUY_TYPES:
                 if (
                     transaction.Note
                     and str(transaction.Note).lower() == "scrip dividend"
@@ -77,7 +263,7 @@ class DataFile:
                         transaction.Note,
                     )
                 transactions.append(bought)
-            elif transaction.Type.lower() in ["sell", "delivery_outbound", "transfer_out"]:
+            elif transaction.Type.lower() in SELL_TYPES:
                 transactions.append(
                     Sale(
                         transaction.Date,
@@ -102,7 +288,7 @@ class DataFile:
                         transaction.Amount,
                     )
                 )
-            elif transaction.Type.lower() in ["dividend", "dividends"]:
+            elif transaction.Type.lower() in DIVIDEND_TYPES:
                 if not (
                     transaction.Note
                     and str(transaction.Note).lower() == "scrip dividend"
@@ -0,0 +1,206 @@
+"""Definition of the Deduplicator class"""
+# Standard library imports
+import hashlib
+import sqlite3
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Mapping, Optional
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# Types that are spelled differently in CSV exports and in saved files
+TYPE_ALIASES = {"dividends": "dividend"}
+
+
+def is_blank(value: Any) -> bool:
+    """Whether a value is missing, including NaN"""
+    # NaN is the only value that is not equal to itself
+    return value is None or value != value  # pylint: disable=comparison-with-itself
+
+
+def date_text(value: Any) -> str:
+    """Date and time in ISO format, however it was written"""
+    if is_blank(value):
+        return ""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            value = pd.Timestamp(value)
+    return value.isoformat()
+
+
+def number_text(value: Any) -> str:
+    """Number without trailing zeros or thousands separators"""
+    if is_blank(value):
+        return ""
+    if not isinstance(value, Decimal):
+        try:
+            value = Decimal(str(value).replace(",", ""))
+        except InvalidOperation:
+            return str(value)
+    return str(value.normalize())
+
+
+def type_text(value: Any) -> str:
+    """Transaction type in lower case, with the same spelling in every format"""
+    if is_blank(value):
+        return ""
+    value = str(value).lower()
+    return TYPE_ALIASES.get(value, value)
+
+
+def text(value: Any) -> str:
+    """Any other value as text"""
+    return "" if is_blank(value) else str(value)
+
+
+# Columns that identify the security of a transaction, in order of preference
+SECURITY_COLUMNS = ("ISIN", "Symbol", "Security")
+
+
+def security_text(row: Mapping[str, Any]) -> str:
+    """
+    Security of a transaction by its ISIN, or else its symbol, or else its
+    name, since the same security can be named differently in each file
+    """
+    for column in SECURITY_COLUMNS:
+        value = text(row.get(column)).strip()
+        if value:
+            return f"{column}:{value}"
+    return ""
+
+
+# Columns that identify a transaction, with the text used for each whichever
+# format it was read from
+FINGERPRINT_COLUMNS = (
+    ("Date", date_text),
+    ("Type", type_text),
+    ("Shares", number_text),
+    ("Amount", number_text),
+    ("Fees", number_text),
+    ("Taxes", number_text),
+    ("Cash Account", text),
+    ("Note", text),
+)
+
+
+def fingerprint(row: Mapping[str, Any]) -> bytes:
+    """Compact fingerprint of the identifying columns of a transaction"""
+    key = "\x1f".join(
+        [security_text(row)]
+        + [as_text(row.get(column)) for column, as_text in FINGERPRINT_COLUMNS]
+    )
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class FingerprintSet:
+    """
+    Set of fingerprints, held in memory or, for very large inputs, in a SQLite
+    file. The set always starts empty. In a file, it is held in a table of its
+    own with a unique name, which is removed again when the set is closed, so
+    any other tables in the file are left alone.
+    """
+
+    def __init__(self, file_name: Optional[str] = None):
+        self.keys_ = set() if file_name is None else None
+        self.connection_ = None
+        self.table_ = f"fingerprints_{uuid.uuid4().hex}"
+        if file_name is not None:
+            self.connection_ = sqlite3.connect(file_name)
+            self.connection_.execute(
+                f"CREATE TABLE {self.table_} (key BLOB PRIMARY KEY) WITHOUT ROWID"
+            )
+
+    def add(self, key: bytes) -> bool:
+        """Add a key, returning whether it was new"""
+        if self.connection_ is None:
+            if key in self.keys_:
+                return False
+            self.keys_.add(key)
+            return True
+        cursor = self.connection_.execute(
+            f"INSERT OR IGNORE INTO {self.table_} (key) VALUES (?)", (key,)
+        )
+        return cursor.rowcount == 1
+
+    def close(self) -> None:
+        """Remove the table of fingerprints and close any SQLite file"""
+        if self.connection_ is not None:
+            self.connection_.execute(f"DROP TABLE {self.table_}")
+            self.connection_.commit()
+            self.connection_.close()
+            self.connection_ = None
+
+
+class Source:
+    """Rows from one source (usually one file) passing through a Deduplicator"""
+
+    def __init__(self, keys: FingerprintSet, repeats: bool):
+        self.keys_ = keys
+        self.repeats = repeats
+        self.occurrences_: Dict[bytes, int] = {}
+        self.n_dropped = 0
+
+    def keep(self, row: Mapping[str, Any]) -> bool:
+        """Whether a row is new, remembering it if so"""
+        digest = fingerprint(row)
+        occurrence = 0
+        if self.repeats:
+            occurrence = self.occurrences_.get(digest, 0) + 1
+            self.occurrences_[digest] = occurrence
+        if self.keys_.add(digest + occurrence.to_bytes(4, "little")):
+            return True
+        self.n_dropped += 1
+        return False
+
+    def mask(self, df_transactions: pd.DataFrame) -> np.ndarray:
+        """Mask of the new rows in a chunk of a transaction table"""
+        columns = [
+            c
+            for c in list(SECURITY_COLUMNS) + [c for c, _ in FINGERPRINT_COLUMNS]
+            if c in df_transactions.columns
+        ]
+        return np.array(
+            [
+                self.keep(dict(zip(columns, values)))
+                for values in df_transactions[columns].itertuples(
+                    index=False, name=None
+                )
+            ],
+            dtype=bool,
+        )
+
+
+class Deduplicator:
+    """
+    Drop transactions that have already been seen, one row at a time as they
+    arrive, without holding whole tables in memory to compare them.
+
+    Each row is keyed by a fingerprint of its date, type, security (by ISIN or
+    symbol where known), shares, amounts, account and note, together with the
+    number of times that the fingerprint has occurred in the same source. Identical transactions within
+    one source are therefore all kept, while transactions repeated in an
+    overlapping source (such as consecutive exports) are dropped. A source can
+    instead treat repeated rows as duplicates, as drop_duplicates would.
+    """
+
+    def __init__(self, file_name: Optional[str] = None):
+        self.keys_ = FingerprintSet(file_name)
+
+    def __enter__(self) -> "Deduplicator":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def source(self, repeats: bool = True) -> Source:
+        """Start reading rows from a new source"""
+        return Source(self.keys_, repeats)
+
+    def close(self) -> None:
+        """Release the set of fingerprints"""
+        self.keys_.close()
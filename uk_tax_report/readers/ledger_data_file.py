@@ -0,0 +1,60 @@
+"""Definition of the LedgerDataFile class"""
+# Standard library imports
+from collections import namedtuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+# Third-party imports
+import pandas as pd
+
+# Local imports
+from ..ledger import COLUMNS, Ledger
+from .data_file import DataFile
+
+if TYPE_CHECKING:
+    from ..income import Income
+
+SecurityTuple = namedtuple("SecurityTuple", ["Symbol", "Security"])
+
+
+class LedgerDataFile(DataFile):
+    """Read transactions from a SQLite ledger, loading only the rows that are needed"""
+
+    def __init__(self, ledger: Ledger):
+        super().__init__()
+        self.ledger = ledger
+
+    @property
+    def account_names(self) -> Set[str]:
+        """List of account names"""
+        return set(self.ledger.account_names())
+
+    @property
+    def income(self) -> Optional["Income"]:
+        """Rows are only loaded one security at a time, so there is no table to read income from"""
+        return None
+
+    @property
+    def securities(self) -> Dict[str, List[SecurityTuple]]:
+        """Dictionary of account_name -> list of unique symbols and names of securities in that account"""
+        return {
+            account_name: sorted(
+                {
+                    SecurityTuple(float("nan") if symbol is None else symbol, name)
+                    for symbol, name in self.ledger.securities(account_name)
+                },
+                key=lambda t: t.Security.lower(),
+            )
+            for account_name in self.account_names
+        }
+
+    def get_transactions(self, account_name: str, security_name: str) -> pd.DataFrame:
+        """Rows of the transaction table for a given account and security"""
+        df_transactions = pd.DataFrame(
+            self.ledger.transactions(account_name, security_name), columns=list(COLUMNS)
+        )
+        # Missing values are stored as NULL but the readers represent them as NaN
+        df_transactions = df_transactions.applymap(
+            lambda v: float("nan") if v is None else v
+        )
+        df_transactions["Date"] = pd.to_datetime(df_transactions["Date"])
+        return df_transactions
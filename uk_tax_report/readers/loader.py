@@ -0,0 +1,30 @@
+"""Choose a reader for a Portfolio Performance file"""
+# Standard library imports
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .data_file import DataFile
+
+
+def load_data_file(file_name: str, **filters: Any) -> "DataFile":
+    """
+    Read a CSV, XML or binary file, choosing the reader from its extension. Any filters
+    (account_names, security_names, end_date) are passed to the reader.
+    """
+    # Readers are imported here so that pandas is only loaded when a file is read
+    # pylint: disable=import-outside-toplevel
+    suffix = Path(file_name).suffix.lower()
+    if suffix == ".csv":
+        from .csv_data_file import CsvDataFile
+
+        return CsvDataFile(file_name, **filters)
+    if suffix == ".xml":
+        from .xml_data_file import XmlDataFile
+
+        return XmlDataFile(file_name, **filters)
+    if suffix == ".portfolio":
+        from .portfolio_data_file import PortfolioDataFile
+
+        return PortfolioDataFile(file_name, **filters)
+    raise ValueError(f"Could not determine the file type of '{file_name}'")
@@ -0,0 +1,159 @@
+"""Definition of the MergedDataFile class"""
+# Standard library imports
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Third-party imports
+import pandas as pd
+
+# Local imports
+from .data_file import DataFile
+from .deduplication import Deduplicator
+from .loader import load_data_file
+
+# Name, ISIN and symbol of a security as it appears in one file
+Identity = Tuple[str, Optional[str], Optional[str]]
+
+
+def as_optional(value: Any) -> Optional[str]:
+    """Value as a string, or None if it is blank"""
+    if pd.isna(value) or not str(value).strip():
+        return None
+    return str(value).strip()
+
+
+def security_keys(identities: List[Identity]) -> Dict[Identity, Hashable]:
+    """Key of each identity, which is shared by all identities of the same security"""
+    isin_by_symbol: Dict[str, str] = {}
+    for _, isin, symbol in identities:
+        if isin and symbol:
+            isin_by_symbol.setdefault(symbol, isin)
+    keys: Dict[Identity, Hashable] = {}
+    for identity in identities:
+        name, isin, symbol = identity
+        if isin:
+            keys[identity] = ("ISIN", isin)
+        elif symbol in isin_by_symbol:
+            keys[identity] = ("ISIN", isin_by_symbol[symbol])
+        elif symbol:
+            keys[identity] = ("Symbol", symbol)
+        else:
+            keys[identity] = ("Name", name)
+    return keys
+
+
+def unify_securities(df_transactions: pd.DataFrame) -> int:
+    """
+    Give every row for the same security the same name, ISIN and symbol, in
+    place, returning the number of identities that were changed.
+
+    Securities are the same if they share an ISIN. A security without an ISIN
+    is matched by its symbol, either to a security with an ISIN and that symbol
+    or to other securities without an ISIN. Securities with neither are only
+    matched by name. Each security takes the name, ISIN and symbol that were
+    seen first. If two different securities would share a name, the later one
+    has its ISIN or symbol added to its name.
+    """
+    for column in ("ISIN", "Symbol"):
+        if column not in df_transactions:
+            df_transactions[column] = None
+    identities: List[Identity] = list(
+        dict.fromkeys(
+            (name, as_optional(isin), as_optional(symbol))
+            for name, isin, symbol in zip(
+                df_transactions["Security"],
+                df_transactions["ISIN"],
+                df_transactions["Symbol"],
+            )
+        )
+    )
+    keys = security_keys(identities)
+
+    # The first name, ISIN and symbol seen for each key are used for all of them
+    canonical: Dict[Hashable, List[Optional[str]]] = {}
+    names: Dict[str, Hashable] = {}
+    for identity in identities:
+        name, isin, symbol = identity
+        key = keys[identity]
+        if key not in canonical:
+            if names.setdefault(name, key) != key:
+                name = f"{name} ({isin or symbol})"
+                names[name] = key
+            canonical[key] = [name, isin, symbol]
+        else:
+            # Fill in any ISIN or symbol that the first identity was missing
+            canonical[key][1] = canonical[key][1] or isin
+            canonical[key][2] = canonical[key][2] or symbol
+
+    replacements = {
+        identity: tuple(canonical[keys[identity]])
+        for identity in identities
+        if tuple(canonical[keys[identity]]) != identity
+    }
+    if replacements:
+        rows = [
+            replacements.get(
+                (name, as_optional(isin), as_optional(symbol)),
+                (name, isin, symbol),
+            )
+            for name, isin, symbol in zip(
+                df_transactions["Security"],
+                df_transactions["ISIN"],
+                df_transactions["Symbol"],
+            )
+        ]
+        df_transactions["Security"] = [row[0] for row in rows]
+        df_transactions["ISIN"] = [row[1] for row in rows]
+        df_transactions["Symbol"] = [row[2] for row in rows]
+    return len(replacements)
+
+
+class MergedDataFile(DataFile):
+    """
+    Read several PortfolioPerformance files of any supported format at once,
+    merging them into a single transaction table.
+
+    Each file is read in a pool of workers, with its reader chosen from its
+    extension. Transactions that were already read from an earlier file, as
+    happens when exports overlap, are dropped as each file arrives. Their
+    fingerprints are kept in memory, or in a SQLite file if one is named.
+    Securities are matched across files by ISIN or symbol so that each has a
+    single history, even when its name differs between files.
+    """
+
+    def __init__(
+        self,
+        file_names: Sequence[str],
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        fingerprints_file: Optional[str] = None,
+        **filters: Any,
+    ):
+        super().__init__()
+        if not file_names:
+            raise ValueError("At least one file is needed")
+
+        # Files are parsed concurrently, but merged in the order they were given.
+        # Each file may only hold some of the accounts, so they are selected afterwards.
+        account_names = filters.pop("account_names", None)
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        tables, n_dropped = [], 0
+        with executor_class(max_workers=max_workers) as executor, Deduplicator(
+            fingerprints_file
+        ) as deduplicator:
+            futures = [
+                executor.submit(load_data_file, file_name, **filters)
+                for file_name in file_names
+            ]
+            for future in futures:
+                df_transactions = future.result().df_transactions
+                source = deduplicator.source()
+                tables.append(df_transactions[source.mask(df_transactions)])
+                n_dropped += source.n_dropped
+        self.df_transactions = pd.concat(tables, ignore_index=True)
+        self.filter_rows(account_names=account_names)
+        changed = unify_securities(self.df_transactions)
+        logging.debug(
+            f"Merged {self.df_transactions.shape[0]} transactions from {len(file_names)} files, dropping {n_dropped} duplicates and renaming {changed} securities"
+        )
@@ -0,0 +1,28 @@
+"""Definition of the PortfolioReader class"""
+# Standard library imports
+import logging
+from typing import Any
+
+# Third-party imports
+import pandas as pd
+
+# Local imports
+from .data_file import DataFile
+from .portfolio_utils import read_portfolio
+
+
+class PortfolioDataFile(DataFile):
+    """Read a PortfolioPerformance binary or zipped file"""
+
+    def __init__(self, file_name: str, **filters: Any):
+        super().__init__()
+
+        # Read all entries with a valid security, skipping other accounts
+        self.df_transactions = read_portfolio(file_name, filters.get("account_names"))
+        self.df_transactions.dropna(subset=["Security"], inplace=True)
+
+        # Set datatypes
+        self.df_transactions["Date"] = pd.to_datetime(self.df_transactions["Date"])
+        # Drop any rows excluded by the account, security and date filters
+        self.filter_rows(**filters)
+        logging.debug(f"Processing {self.df_transactions.shape[0]} transactions...")
@@ -0,0 +1,281 @@
+"""Utility functions for reading PortfolioPerformance binary and zipped files"""
+# Standard library imports
+import zipfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Third party imports
+import pandas as pd
+
+# Local imports
+from .deduplication import Deduplicator
+from .xml_utils import read_xml
+
+# Each file format is recognised from the bytes it starts with
+BINARY_SIGNATURE = b"PPPBV1"
+ENCRYPTED_SIGNATURE = b"PORTFOLIO"
+ZIP_SIGNATURE = b"PK\x03\x04"
+# Zipped files hold a single entry with one of these suffixes
+ZIPPED_SUFFIXES = (".xml", ".portfolio")
+
+# Field numbers from client.proto (name.abuchen.portfolio.model.proto.v1)
+CLIENT_SECURITIES, CLIENT_ACCOUNTS, CLIENT_PORTFOLIOS, CLIENT_TRANSACTIONS = 2, 3, 4, 5
+SECURITY_FIELDS = {
+    1: "uuid",
+    3: "id",
+    4: "currencyCode",
+    6: "note",
+    7: "ISIN",
+    8: "Symbol",
+}
+# Accounts and portfolios both start with their UUID and name
+CONTAINER_FIELDS = {1: "uuid", 2: "name"}
+TRANSACTION_FIELDS = {
+    2: "type",
+    3: "account",
+    4: "portfolio",
+    5: "otherAccount",
+    6: "otherPortfolio",
+    9: "date",
+    11: "amount",
+    12: "shares",
+    13: "note",
+    14: "security",
+}
+TRANSACTION_UNITS = 15
+UNIT_FIELDS = {1: "type", 2: "amount"}
+UNIT_TAX, UNIT_FEE = 1, 2
+TIMESTAMP_SECONDS = 1
+
+# Transaction types as they appear in XML files, with the container holding each
+TRANSACTION_TYPES = {
+    0: ("BUY", "portfolio"),
+    1: ("SELL", "portfolio"),
+    2: ("DELIVERY_INBOUND", "portfolio"),
+    3: ("DELIVERY_OUTBOUND", "portfolio"),
+    4: ("TRANSFER_OUT", "portfolio"),
+    5: ("TRANSFER_OUT", "account"),
+    6: ("DEPOSIT", "account"),
+    7: ("REMOVAL", "account"),
+    8: ("DIVIDENDS", "account"),
+    9: ("INTEREST", "account"),
+    10: ("INTEREST_CHARGE", "account"),
+    11: ("TAXES", "account"),
+    12: ("TAX_REFUND", "account"),
+    13: ("FEES", "account"),
+    14: ("FEES_REFUND", "account"),
+}
+# Transfers are listed once, but appear in both the source and the target
+TRANSFER_TARGETS = {4: "otherPortfolio", 5: "otherAccount"}
+TRANSACTION_COLUMNS = [
+    "Date",
+    "Type",
+    "Security",
+    "Shares",
+    "Amount",
+    "Fees",
+    "Taxes",
+    "Cash Account",
+    "Note",
+]
+SECURITY_COLUMNS = ["id", "uuid", "ISIN", "Symbol", "currencyCode", "note"]
+EPOCH = datetime(1970, 1, 1)
+
+Field = Tuple[int, Union[int, memoryview]]
+
+
+def iter_fields(buffer: memoryview) -> Iterator[Field]:
+    """
+    Decode the fields of a protobuf message one at a time, as the field number
+    and either an integer or a view of the bytes of a string or nested message
+    """
+    position, end = 0, len(buffer)
+    while position < end:
+        key, position = read_varint(buffer, position)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, position = read_varint(buffer, position)
+        elif wire_type == 2:
+            length, start = read_varint(buffer, position)
+            position = start + length
+            value = buffer[start:position]
+        elif wire_type in (1, 5):
+            start, position = position, position + (8 if wire_type == 1 else 4)
+            value = int.from_bytes(buffer[start:position], "little")
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield key >> 3, value
+
+
+def read_fields(buffer: memoryview, fields: Dict[int, str]) -> Dict[str, Any]:
+    """Named fields of a protobuf message, ignoring any others"""
+    return {fields[n]: value for n, value in iter_fields(buffer) if n in fields}
+
+
+def read_varint(buffer: memoryview, position: int) -> Tuple[int, int]:
+    """Decode a varint, returning its value and the position after it"""
+    byte = buffer[position]
+    if byte < 0x80:
+        return byte, position + 1
+    result, shift = byte & 0x7F, 7
+    while True:
+        position += 1
+        byte = buffer[position]
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position + 1
+        shift += 7
+
+
+def as_int64(value: int) -> int:
+    """Signed value of a varint holding an int64"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def as_text(value: memoryview) -> str:
+    """Text held in a string field"""
+    return str(value, "utf-8")
+
+
+def get_charges(units: List[memoryview]) -> Tuple[Decimal, Decimal]:
+    """Fees and taxes from the units of a transaction"""
+    fees, taxes = Decimal(0), Decimal(0)
+    for unit in units:
+        fields = read_fields(unit, UNIT_FIELDS)
+        amount = Decimal(as_int64(fields.get("amount", 0))) / 100
+        if fields.get("type") == UNIT_FEE:
+            fees += amount
+        elif fields.get("type") == UNIT_TAX:
+            taxes += amount
+    return fees, taxes
+
+
+def get_rows(
+    buffer: memoryview, containers: Dict[str, str], securities: Dict[str, str]
+) -> Iterator[Dict]:
+    """
+    Rows for a single transaction, in the same form as for XML files. Transfers
+    give a row for both their source and their target.
+    """
+    fields, units = {}, []
+    for number, value in iter_fields(buffer):
+        if number == TRANSACTION_UNITS:
+            units.append(value)
+        elif number in TRANSACTION_FIELDS:
+            fields[TRANSACTION_FIELDS[number]] = value
+    if "security" not in fields:
+        return
+    # Fields that hold their default value are not stored
+    type_code = fields.get("type", 0)
+    type_, container = TRANSACTION_TYPES[type_code]
+    fees, taxes = get_charges(units)
+    total = Decimal(as_int64(fields.get("amount", 0))) / 100
+    # The amount includes fees and taxes
+    if type_ == "BUY":
+        total -= fees + taxes
+    else:
+        total += fees + taxes
+    seconds = dict(iter_fields(fields["date"])).get(TIMESTAMP_SECONDS, 0)
+    row = {
+        "Date": EPOCH + timedelta(seconds=as_int64(seconds)),
+        "Type": type_,
+        "Security": securities.get(as_text(fields["security"])),
+        "Shares": Decimal(as_int64(fields.get("shares", 0))) / 100000000,
+        "Amount": abs(total),
+        "Fees": abs(fees),
+        "Taxes": abs(taxes),
+        "Cash Account": containers.get(as_text(fields.get(container, b""))),
+        "Note": as_text(fields.get("note", b"")),
+    }
+    yield row
+    if type_code in TRANSFER_TARGETS:
+        target = as_text(fields.get(TRANSFER_TARGETS[type_code], b""))
+        yield {**row, "Type": "TRANSFER_IN", "Cash Account": containers.get(target)}
+
+
+def read_binary(
+    data: bytes, file_name: str, account_names: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    """
+    Decode a PortfolioPerformance binary file into a Pandas dataframe with the
+    same columns as for read_xml, optionally only reading the transactions of
+    some accounts or portfolios
+    """
+    start = len(BINARY_SIGNATURE) if data.startswith(BINARY_SIGNATURE) else 0
+    buffer = memoryview(data)[start:]
+
+    # Read securities, accounts and portfolios, keeping transactions until all are known
+    securities, containers, transactions = [], {}, []
+    for number, value in iter_fields(buffer):
+        if number == CLIENT_SECURITIES:
+            security = {
+                name: as_text(text)
+                for name, text in read_fields(value, SECURITY_FIELDS).items()
+            }
+            securities.append(
+                {column: security.get(column) for column in SECURITY_COLUMNS}
+            )
+        elif number in (CLIENT_ACCOUNTS, CLIENT_PORTFOLIOS):
+            container = read_fields(value, CONTAINER_FIELDS)
+            containers[as_text(container["uuid"])] = as_text(container.get("name", b""))
+        elif number == CLIENT_TRANSACTIONS:
+            transactions.append(value)
+    selected = {
+        name
+        for name in containers.values()
+        if not account_names or name in account_names
+    }
+    if not selected:
+        raise ValueError(f"None of the requested accounts are in '{file_name}'")
+    names = {security["uuid"]: security["id"] for security in securities}
+    # Repeated transactions are dropped as they are decoded, as for XML files
+    unique = Deduplicator().source(repeats=False)
+    df_transactions = pd.DataFrame(
+        [
+            row
+            for transaction in transactions
+            for row in get_rows(transaction, containers, names)
+            if row["Security"] and row["Cash Account"] in selected and unique.keep(row)
+        ],
+        columns=TRANSACTION_COLUMNS,
+    )
+
+    # Merge transactions with securities, dropping invalid rows
+    df_securities = pd.DataFrame(securities, columns=SECURITY_COLUMNS).drop_duplicates()
+    return pd.merge(
+        df_transactions, df_securities, how="outer", left_on="Security", right_on="id"
+    )
+
+
+def read_portfolio(
+    file_name: str, account_names: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    """
+    Read a PortfolioPerformance file saved in any unencrypted format (binary,
+    zipped binary, zipped XML or XML) into a Pandas dataframe, optionally only
+    reading the transactions of some accounts
+    """
+    with open(file_name, "rb") as f_portfolio:
+        signature = f_portfolio.read(len(ENCRYPTED_SIGNATURE))
+    if signature.startswith(ENCRYPTED_SIGNATURE):
+        raise ValueError(
+            f"'{file_name}' is encrypted: save it again without a password to read it"
+        )
+    if signature.startswith(BINARY_SIGNATURE):
+        return read_binary(Path(file_name).read_bytes(), file_name, account_names)
+    if not signature.startswith(ZIP_SIGNATURE):
+        return read_xml(file_name, account_names)
+
+    # Zipped files are read straight from the archive without unpacking them to disk
+    with zipfile.ZipFile(file_name) as archive:
+        entries = [
+            name for name in archive.namelist() if name.endswith(ZIPPED_SUFFIXES)
+        ]
+        if not entries:
+            raise ValueError(f"No portfolio data found in '{file_name}'")
+        if entries[0].endswith(".xml"):
+            with archive.open(entries[0]) as f_xml:
+                return read_xml(f_xml, account_names)
+        return read_binary(archive.read(entries[0]), file_name, account_names)
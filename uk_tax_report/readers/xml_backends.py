@@ -0,0 +1,81 @@
+"""Parsers and path queries for PortfolioPerformance XML files"""
+# Standard library imports
+import os
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, List, Optional
+
+# A compiled path query, returning the matching elements below a node
+Query = Callable[[Any], List[Any]]
+
+
+class EtreeBackend:
+    """Parse XML with the standard library, running each query with findall"""
+
+    name = "etree"
+
+    def parse(self, source: Any) -> Any:
+        """Root element of an XML file name or file object"""
+        return ET.parse(source).getroot()
+
+    def compile(self, path: str) -> Query:
+        """Query for a path"""
+        return lambda node: node.findall(path)
+
+
+class LxmlBackend:
+    """Parse XML with lxml, running each query as pre-compiled XPath"""
+
+    name = "lxml"
+
+    def __init__(self):
+        # lxml is an optional dependency, so it is only imported when used
+        # pylint: disable=import-outside-toplevel
+        from lxml import etree
+
+        self.etree_ = etree
+
+    def parse(self, source: Any) -> Any:
+        """Root element of an XML file name or file object"""
+        if isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        return self.etree_.parse(source).getroot()
+
+    def compile(self, path: str) -> Query:
+        """
+        Query for a path. Paths are written as ElementPath, in which "a//b"
+        selects the same elements as "a/descendant::b" in XPath, but without
+        first visiting every node below "a".
+        """
+        return self.etree_.XPath(path.replace("//", "/descendant::"))
+
+
+BACKENDS = {backend.name: backend for backend in (EtreeBackend, LxmlBackend)}
+
+
+class Queries(dict):
+    """Path queries, each compiled by a backend the first time it is used"""
+
+    def __init__(self, backend: Any):
+        super().__init__()
+        self.backend = backend
+
+    def __missing__(self, path: str) -> Query:
+        query = self[path] = self.backend.compile(path)
+        return query
+
+
+def get_backend(name: Optional[str] = None) -> Any:
+    """
+    XML backend with the given name. By default, lxml is used if it is
+    installed, and the standard library otherwise.
+    """
+    if name is None:
+        try:
+            return LxmlBackend()
+        except ImportError:
+            return EtreeBackend()
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown XML backend '{name}': use one of {', '.join(BACKENDS)}"
+        )
+    return BACKENDS[name]()
@@ -1,6 +1,7 @@
 """Definition of the XmlReader class"""
 # Standard library imports
 import logging
+from typing import Any, Optional
 
 # Third-party imports
 import pandas as pd
@@ -13,13 +14,17 @@ from .xml_utils import read_xml
 class XmlDataFile(DataFile):
     """Read a PortfolioPerformance XML file"""
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, backend: Optional[str] = None, **filters: Any):
         super().__init__()
 
-        # Read all XML entries with a valid symbol and security
-        self.df_transactions = read_xml(file_name)
+        # Read all XML entries with a valid symbol and security, skipping other accounts
+        self.df_transactions = read_xml(
+            file_name, filters.get("account_names"), backend
+        )
         self.df_transactions.dropna(subset=["Security"], inplace=True)
 
         # Set datatypes
         self.df_transactions["Date"] = pd.to_datetime(self.df_transactions["Date"])
+        # Drop any rows excluded by the account, security and date filters
+        self.filter_rows(**filters)
         logging.debug(f"Processing {self.df_transactions.shape[0]} transactions...")
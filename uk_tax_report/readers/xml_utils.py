@@ -1,53 +1,58 @@
 """Utility functions for reading PortfolioPerformance XML files"""
 # Standard library imports
 import re
-import xml.etree.ElementTree as ET
+from collections import defaultdict
 from decimal import Decimal
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, List, Optional
 
 # Third party imports
 import pandas as pd
 
+# Local imports
+from .deduplication import Deduplicator
+from .xml_backends import Queries, Query, get_backend
 
-def flatten(element_lists: List[List[ET.Element]]) -> Iterable[ET.Element]:
-    """Return all elements from a list of lists"""
-    for element_list in element_lists:
-        for element in element_list:
-            yield element
 
-
-def get_accounts(root: ET.Element) -> pd.DataFrame:
+def get_accounts(root: Any, queries: Queries) -> pd.DataFrame:
     """Get accounts"""
     accounts = []
     for account in (
-        root.findall("*//account[uuid]")
-        + root.findall("*//accountFrom[uuid]")
-        + root.findall("*//accountTo[uuid]")
+        queries["*//account[uuid]"](root)
+        + queries["*//accountFrom[uuid]"](root)
+        + queries["*//accountTo[uuid]"](root)
     ):
-        name = get_first(account, "name")
-        uuid = get_first(account, "uuid")
+        name = get_first(account, queries["name"])
+        uuid = get_first(account, queries["uuid"])
         accounts.append({"id": name, "uuid": uuid})
     return pd.DataFrame(accounts).drop_duplicates()
 
 
-def get_first(node: ET.Element, match: str) -> str:
-    """Get the full text from the first node containing the requested string"""
-    objects = node.findall(match)
+def get_first(node: Any, query: Query) -> str:
+    """Get the full text from the first node matching a query"""
+    objects = query(node)
     if not objects:
         return None
     return objects[0].text
 
 
-def get_securities(root: ET.Element):
+def get_text(children: Dict[str, Any], tag: str) -> str:
+    """Get the full text from the first child with a tag, given the children by tag"""
+    child = children.get(tag)
+    if child is None:
+        return None
+    return child.text
+
+
+def get_securities(root: Any, queries: Queries):
     """Get securities"""
     securities = []
-    for security in flatten(root.findall("securities")):
-        name = get_first(security, "name")
-        uuid = get_first(security, "uuid")
-        isin = get_first(security, "isin")
-        ticker_symbol = get_first(security, "tickerSymbol")
-        currency_code = get_first(security, "currencyCode")
-        note = get_first(security, "note")
+    for security in queries["securities/*"](root):
+        name = get_first(security, queries["name"])
+        uuid = get_first(security, queries["uuid"])
+        isin = get_first(security, queries["isin"])
+        ticker_symbol = get_first(security, queries["tickerSymbol"])
+        currency_code = get_first(security, queries["currencyCode"])
+        note = get_first(security, queries["note"])
         securities.append(
             {
                 "id": name,
@@ -61,84 +66,107 @@ def get_securities(root: ET.Element):
     return pd.DataFrame(securities).drop_duplicates()
 
 
-def get_transactions(root: ET.Element, account_id, df_securities):
+def get_transaction_elements(root: Any, queries: Queries) -> Dict[str, List[Any]]:
+    """Get transaction elements for every account and portfolio, indexed by name"""
+    elements = defaultdict(list)
+    for container, transaction in (
+        ("account", "account-transaction"),
+        ("accountFrom", "account-transaction"),
+        ("accountTo", "account-transaction"),
+        ("portfolio", "portfolio-transaction"),
+    ):
+        for node in queries[f"*//{container}[name]"](root):
+            for name in {name.text for name in queries["name"](node)}:
+                elements[name] += queries[f"transactions/{transaction}"](node)
+    return elements
+
+
+def get_transactions(
+    elements: List[Any],
+    account_id: str,
+    df_securities: pd.DataFrame,
+    queries: Queries,
+) -> pd.DataFrame:
     """Get transactions"""
     transactions = []
-    for transaction in (
-        root.findall(
-            f"*//account[name='{account_id}']/transactions/account-transaction"
-        )
-        + root.findall(
-            f"*//accountFrom[name='{account_id}']/transactions/account-transaction"
-        )
-        + root.findall(
-            f"*//accountTo[name='{account_id}']/transactions/account-transaction"
-        )
-        + root.findall(
-            f"*//portfolio[name='{account_id}']/transactions/portfolio-transaction"
-        )
-    ):
+    # Repeated transactions are dropped as they are read
+    unique = Deduplicator().source(repeats=False)
+    # Securities are referenced by their position in the file
+    security_names = df_securities["id"].tolist()
+    for transaction in elements:
         try:
-            date = get_first(transaction, "date")
-            shares = Decimal(get_first(transaction, "shares")) / 100000000
-            type_ = get_first(transaction, "type")
-            security_id = ref2name(transaction, df_securities)
+            # Visit the children once, rather than running a query for each field
+            children = {child.tag: child for child in reversed(transaction)}
+            date = get_text(children, "date")
+            shares = Decimal(get_text(children, "shares")) / 100000000
+            type_ = get_text(children, "type")
+            security_id = ref2name(transaction, security_names, queries)
             fees, taxes = 0, 0
-            for charge in transaction.findall("./units/unit"):
+            for charge in queries["./units/unit"](transaction):
                 if charge.attrib["type"] == "FEE":
-                    fees += (
-                        Decimal(
-                            [c for c in charge if c.tag == "amount"][0].attrib["amount"]
-                        )
-                        / 100
-                    )
+                    fees += Decimal(queries["amount"](charge)[0].attrib["amount"]) / 100
                 if charge.attrib["type"] == "TAX":
                     taxes += (
-                        Decimal(
-                            [c for c in charge if c.tag == "amount"][0].attrib["amount"]
-                        )
-                        / 100
+                        Decimal(queries["amount"](charge)[0].attrib["amount"]) / 100
                     )
             total = (
-                Decimal(get_first(transaction, "amount")) / 100
+                Decimal(get_text(children, "amount")) / 100
             )  # this includes fees and taxes
             if type_ == "BUY":
                 total -= fees + taxes
             else:
                 total += fees + taxes
-            note = get_first(transaction, "note") or ""
-            if security_id:
-                transactions.append(
-                    {
-                        "Date": date,
-                        "Type": type_,
-                        "Security": security_id,
-                        "Shares": shares,
-                        "Amount": abs(total),
-                        "Fees": abs(fees),
-                        "Taxes": abs(taxes),
-                        "Cash Account": account_id,
-                        "Note": note,
-                    }
-                )
+            note = get_text(children, "note") or ""
+            row = {
+                "Date": date,
+                "Type": type_,
+                "Security": security_id,
+                "Shares": shares,
+                "Amount": abs(total),
+                "Fees": abs(fees),
+                "Taxes": abs(taxes),
+                "Cash Account": account_id,
+                "Note": note,
+            }
+            if security_id and unique.keep(row):
+                transactions.append(row)
         except TypeError:
             continue
-    return pd.DataFrame(transactions).drop_duplicates()
-
-
-def read_xml(file_name: str) -> pd.DataFrame:
-    """Read a PortfolioPerformance XML file into a Pandas dataframe"""
+    return pd.DataFrame(transactions)
+
+
+def read_xml(
+    file_name: str,
+    account_names: Optional[Iterable[str]] = None,
+    backend: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Read a PortfolioPerformance XML file into a Pandas dataframe, optionally
+    only reading the transactions of some accounts. The XML backend is chosen
+    by get_backend unless one is named.
+    """
     # Read all XML entries with a valid symbol and security
-    tree = ET.parse(file_name)
-    root = tree.getroot()
+    parser = get_backend(backend)
+    root = parser.parse(file_name)
+    queries = Queries(parser)
 
     # Read securities, accounts and transactions and set datatypes
-    df_securities = get_securities(root)
-    df_accounts = get_accounts(root)
+    df_securities = get_securities(root, queries)
+    df_accounts = get_accounts(root, queries)
+    elements = get_transaction_elements(root, queries)
+    selected = [
+        account_name
+        for account_name in df_accounts["id"].unique()
+        if not account_names or account_name in account_names
+    ]
+    if not selected:
+        raise ValueError(f"None of the requested accounts are in '{file_name}'")
     df_transactions = pd.concat(
         [
-            get_transactions(root, account_name, df_securities)
-            for account_name in df_accounts["id"].unique()
+            get_transactions(
+                elements[account_name], account_name, df_securities, queries
+            )
+            for account_name in selected
         ]
     )
 
@@ -149,15 +177,15 @@ def read_xml(file_name: str) -> pd.DataFrame:
     return df_all
 
 
-def ref2name(transaction: str, df_securities: pd.DataFrame) -> str:
+def ref2name(transaction: Any, security_names: List[str], queries: Queries) -> str:
     """Find the security name corresponding to a given reference"""
     try:
-        reference = transaction.findall("security")[0].attrib["reference"]
+        reference = queries["security"](transaction)[0].attrib["reference"]
         if reference.endswith("securities/security"):
             index = 0
         else:
             regex_ = r".*/security\[(\d+)\]"
             index = int(re.search(regex_, reference, re.IGNORECASE).group(1)) - 1
-        return df_securities.iloc[index]["id"]
+        return security_names[index]
     except (IndexError, AttributeError):
         return None
@@ -1,117 +1,131 @@
 """Utility functions related to reconciling transactions"""
 # Standard library imports
 import logging
-from typing import List, Tuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, List, Tuple
+
+# Third party imports
+from moneyed import Currency
 
 # Local imports
-from .transactions import Disposal, PooledPurchase, Purchase, Sale
+from .transactions import Disposal, Purchase, Sale, Transaction
 
+# Units, purchase total, fees and taxes, then sale total, fees and taxes of a disposal
+DisposalAmounts = Tuple[Decimal, Decimal, Decimal, Decimal, Decimal, Decimal, Decimal]
 
-def exchange(purchases: List[Purchase], sale: Sale) -> Tuple[Purchase, Sale, Disposal]:
+
+class Lot:
     """
-    Mark a sale as a direct exchange for a set of transactions.
+    Units and amounts of a purchase or sale as plain Decimals.
 
-    This usually happens in the case of a stock split where all existing shares
-    are exchanged for a different number of new shares. In PortfolioPerformance
-    this is most easily modelled as a sale of all shares plus a purchase of new
-    ones. In this case, the sale should be an exchange against the sum of all
-    previous transactions.
+    Lots are reconciled in place, so that a purchase or sale which is matched
+    several times only becomes a new transaction once, at the end.
     """
-    pool = PooledPurchase(purchases[0].currency)
-    for transaction in purchases:
-        pool.add_purchase(transaction)
-    if pool.units != sale.units:
-        raise ValueError(
-            f"Unable to match pool with {pool.units} shares against exchange-sale with {sale.units}"
+
+    __slots__ = ("units", "subtotal", "fees", "taxes", "is_sale")
+
+    def __init__(
+        self,
+        units: Decimal,
+        subtotal: Decimal,
+        fees: Decimal,
+        taxes: Decimal,
+        is_sale: bool,
+    ):
+        self.units = units
+        self.subtotal = subtotal
+        self.fees = fees
+        self.taxes = taxes
+        self.is_sale = is_sale
+
+    @classmethod
+    def from_transaction(cls, transaction: Transaction) -> "Lot":
+        """Lot with the units and amounts of a purchase or sale"""
+        return cls(
+            transaction.units,
+            transaction.subtotal.amount,
+            transaction.fees.amount,
+            transaction.taxes.amount,
+            isinstance(transaction, Sale),
         )
-    return reconcile(pool, sale)
 
+    @property
+    def total(self) -> Decimal:
+        """Total received for a sale or paid for a purchase"""
+        if self.is_sale:
+            return self.subtotal - (self.fees + self.taxes)
+        return self.subtotal + (self.fees + self.taxes)
 
-def reconcile(purchase: Purchase, sale: Sale) -> Tuple[Purchase, Sale, Disposal]:
-    """Reconcile a single purchase with a single sale"""
-    if not isinstance(purchase, Purchase):
-        raise ValueError(f"{purchase} is not a purchase!")
-    if not isinstance(sale, Sale):
-        raise ValueError(f"{sale} is not a sale!")
-    if not sale.currency == purchase.currency:
-        raise ValueError(
-            f"Currencies {sale.currency} and {purchase.currency} do not match!"
+    def clear(self) -> None:
+        """Remove all units and amounts from this lot"""
+        self.units, self.subtotal, self.fees, self.taxes = (Decimal(0),) * 4
+
+    def copy(self) -> "Lot":
+        """Copy of this lot"""
+        return Lot(self.units, self.subtotal, self.fees, self.taxes, self.is_sale)
+
+    def as_transaction(self, date_time: datetime, currency: Currency) -> Transaction:
+        """Purchase or sale with the units and amounts of this lot"""
+        return (Sale if self.is_sale else Purchase)(
+            date_time, currency, self.units, self.subtotal, self.fees, self.taxes
         )
-    residual_units = abs(purchase.units - sale.units)
+
+
+def unit_amount(amount: Decimal, units: Decimal) -> Decimal:
+    """Absolute amount per unit, or zero if there are no units"""
+    try:
+        return abs(amount / units)
+    except (ZeroDivisionError, InvalidOperation):
+        return Decimal(0)
+
+
+def reconcile_lots(purchase: Lot, sale: Lot) -> DisposalAmounts:
+    """
+    Reconcile a purchase lot with a sale lot, leaving the residual units and
+    amounts in each, and return the units and amounts of the disposal
+    """
     if purchase.units > sale.units:
-        # In this case we are selling part of the purchase => the entire sale is consumed
-        logging.debug(f"Selling part of the purchase: {sale.units} of {purchase.units}")
-        sale_ = Sale(sale.datetime, sale.currency)
-        disposal = Disposal(
-            sale.datetime,
-            sale.currency,
-            sale.units,
-            purchase.unit_price_inc * sale.units,
-            purchase.unit_fees * sale.units,
-            purchase.unit_taxes * sale.units,
+        # Selling part of the purchase => the entire sale is consumed
+        units = sale.units
+        disposal = (
+            units,
+            unit_amount(purchase.total, purchase.units) * units,
+            unit_amount(purchase.fees, purchase.units) * units,
+            unit_amount(purchase.taxes, purchase.units) * units,
             sale.total,
             sale.fees,
             sale.taxes,
         )
-        f_residual = float(purchase.units - sale.units) / float(purchase.units)
-        purchase_residual_fees = f_residual * purchase.fees
-        purchase_residual_taxes = f_residual * purchase.taxes
-        residual_cost = (
-            purchase.total
-            - disposal.purchase_total
-            - purchase_residual_fees
-            - purchase_residual_taxes
-        )
-        purchase_ = Purchase(
-            purchase.datetime,
-            purchase.currency,
-            residual_units,
-            residual_cost,
-            purchase_residual_fees,
-            purchase_residual_taxes,
+        f_residual = Decimal(str(float(purchase.units - units) / float(purchase.units)))
+        fees, taxes = purchase.fees * f_residual, purchase.taxes * f_residual
+        purchase.subtotal = purchase.total - disposal[1] - fees - taxes
+        purchase.units, purchase.fees, purchase.taxes = (
+            purchase.units - units,
+            fees,
+            taxes,
         )
+        sale.clear()
     elif purchase.units < sale.units:
-        # In this case we are selling more than the entire purchase => the entire purchase is consumed
-        logging.debug(
-            f"Selling more than the entire purchase: {sale.units} of {purchase.units}"
-        )
-        purchase_ = Purchase(purchase.datetime, purchase.currency)
-        disposal = Disposal(
-            sale.datetime,
-            sale.currency,
-            purchase.units,
+        # Selling more than the entire purchase => the entire purchase is consumed
+        units = purchase.units
+        disposal = (
+            units,
             purchase.total,
             purchase.fees,
             purchase.taxes,
-            sale.unit_price_inc * purchase.units,
-            sale.unit_fees * purchase.units,
-            sale.unit_taxes * purchase.units,
-        )
-        f_residual = float(sale.units - purchase.units) / float(sale.units)
-        sale_residual_fees = f_residual * sale.fees
-        sale_residual_taxes = f_residual * sale.taxes
-        residual_cost = (
-            sale.total
-            + disposal.purchase_total
-            - sale_residual_fees
-            - sale_residual_taxes
-        )
-        sale_ = Sale(
-            sale.datetime,
-            sale.currency,
-            residual_units,
-            residual_cost,
-            sale_residual_fees,
-            sale_residual_taxes,
+            unit_amount(sale.total, sale.units) * units,
+            unit_amount(sale.fees, sale.units) * units,
+            unit_amount(sale.taxes, sale.units) * units,
         )
-    elif purchase.units == sale.units:
-        # In this case we are selling the entire purchase => the entire purchase and sale are consumed
-        logging.debug(f"Selling the entire purchase: {sale.units} of {purchase.units}")
-        sale_ = Sale(sale.datetime, sale.currency)
-        purchase_ = Purchase(purchase.datetime, purchase.currency)
-        disposal = Disposal(
-            sale.datetime,
-            sale.currency,
+        f_residual = Decimal(str(float(sale.units - units) / float(sale.units)))
+        fees, taxes = sale.fees * f_residual, sale.taxes * f_residual
+        sale.subtotal = sale.total + disposal[1] - fees - taxes
+        sale.units, sale.fees, sale.taxes = sale.units - units, fees, taxes
+        purchase.clear()
+    else:
+        # Selling the entire purchase => the entire purchase and sale are consumed
+        disposal = (
             purchase.units,
             purchase.total,
             purchase.fees,
@@ -120,4 +134,92 @@ def reconcile(purchase: Purchase, sale: Sale) -> Tuple[Purchase, Sale, Disposal]
             sale.fees,
             sale.taxes,
         )
-    return purchase_, sale_, disposal
+        purchase.clear()
+        sale.clear()
+    return disposal
+
+
+def pool_lots(purchases: Iterable[Transaction]) -> Lot:
+    """Lot holding the sum of several purchases"""
+    pool = Lot(Decimal(0), Decimal(0), Decimal(0), Decimal(0), False)
+    for purchase in purchases:
+        pool.units += purchase.units
+        pool.subtotal += purchase.subtotal.amount
+        pool.fees += purchase.fees.amount
+        pool.taxes += purchase.taxes.amount
+    return pool
+
+
+def exchange(purchases: List[Purchase], sale: Sale) -> Tuple[Purchase, Sale, Disposal]:
+    """
+    Mark a sale as a direct exchange for a set of transactions.
+
+    This usually happens in the case of a stock split where all existing shares
+    are exchanged for a different number of new shares. In PortfolioPerformance
+    this is most easily modelled as a sale of all shares plus a purchase of new
+    ones. In this case, the sale should be an exchange against the sum of all
+    previous transactions.
+    """
+    return exchange_pool(
+        pool_lots(purchases),
+        max([datetime(1, 1, 1)] + [p.datetime for p in purchases]),
+        sale,
+    )
+
+
+def exchange_pool(
+    pool: Lot, date_time: datetime, sale: Sale
+) -> Tuple[Purchase, Sale, Disposal]:
+    """Mark a sale as a direct exchange for a pool of purchases, the latest at the given date and time"""
+    if pool.units != sale.units:
+        raise ValueError(
+            f"Unable to match pool with {pool.units} shares against exchange-sale with {sale.units}"
+        )
+    pool, sale_ = pool.copy(), Lot.from_transaction(sale)
+    disposal = reconcile_lots(pool, sale_)
+    return (
+        pool.as_transaction(date_time, sale.currency),
+        sale_.as_transaction(sale.datetime, sale.currency),
+        Disposal(sale.datetime, sale.currency, *disposal),
+    )
+
+
+def reconcile(purchase: Purchase, sale: Sale) -> Tuple[Purchase, Sale, Disposal]:
+    """Reconcile a single purchase with a single sale"""
+    if not isinstance(purchase, Purchase):
+        raise ValueError(f"{purchase} is not a purchase!")
+    if not isinstance(sale, Sale):
+        raise ValueError(f"{sale} is not a sale!")
+    if not sale.currency == purchase.currency:
+        raise ValueError(
+            f"Currencies {sale.currency} and {purchase.currency} do not match!"
+        )
+    logging.debug(f"Selling {sale.units} shares against {purchase.units}")
+    purchase_, sale_ = Lot.from_transaction(purchase), Lot.from_transaction(sale)
+    disposal = reconcile_lots(purchase_, sale_)
+    return (
+        purchase_.as_transaction(purchase.datetime, purchase.currency),
+        sale_.as_transaction(sale.datetime, sale.currency),
+        Disposal(sale.datetime, sale.currency, *disposal),
+    )
+
+
+def pool_prefixes(purchases: Iterable[Transaction]) -> List[Tuple[Lot, datetime]]:
+    """
+    Lots holding the sum of the first n date-ordered purchases for every n,
+    with the date and time of the latest of them. Each lot is added up in the
+    same order as pool_lots, so the pool of every purchase before a date can be
+    looked up instead of added up again.
+    """
+    prefixes = [
+        (Lot(Decimal(0), Decimal(0), Decimal(0), Decimal(0), False), datetime(1, 1, 1))
+    ]
+    for purchase in purchases:
+        pool, date_time = prefixes[-1]
+        pool = pool.copy()
+        pool.units += purchase.units
+        pool.subtotal += purchase.subtotal.amount
+        pool.fees += purchase.fees.amount
+        pool.taxes += purchase.taxes.amount
+        prefixes.append((pool, max(date_time, purchase.datetime)))
+    return prefixes
@@ -0,0 +1,121 @@
+"""Utility functions for resolving Section 104 pools directly"""
+# Standard library imports
+from datetime import datetime
+from decimal import Decimal
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+
+# Third party imports
+from moneyed import Currency, Money
+
+# Local imports
+from .reconcile import Lot, reconcile_lots
+from .transactions import (
+    Disposal,
+    ExcessReportableIncome,
+    PooledPurchase,
+    Sale,
+    Transaction,
+)
+
+# Units, subtotal, fees and taxes held in a pool
+PoolState = Tuple[Decimal, Decimal, Decimal, Decimal]
+
+
+def add_purchase(state: PoolState, purchase: Transaction) -> PoolState:
+    """Pool state after adding a purchase, as PooledPurchase.add_purchase does"""
+    units, subtotal, fees, taxes = state
+    # Excess reportable income adds to the cost of the pool but not to its units
+    if not isinstance(purchase, ExcessReportableIncome):
+        units = units + purchase.units
+    return (
+        units,
+        subtotal + purchase.subtotal.amount,
+        fees + purchase.fees.amount,
+        taxes + purchase.taxes.amount,
+    )
+
+
+def accumulate_purchases(
+    state: PoolState, purchases: Sequence[Transaction]
+) -> List[PoolState]:
+    """
+    Pool state after each of a run of purchases. Each of the units, subtotal,
+    fees and taxes is a running total of Decimals, added in the same order as
+    adding the purchases to the pool one at a time.
+    """
+    return list(accumulate(purchases, add_purchase, initial=state))[1:]
+
+
+def dispose(
+    state: PoolState, sale: Sale, currency: Currency
+) -> Tuple[Disposal, PoolState]:
+    """Disposal of a sale against the pool, and the pool state that remains"""
+    sale_ = Lot.from_transaction(sale)
+    disposal = Disposal(
+        sale.datetime, currency, *reconcile_lots(Lot(*state, False), sale_)
+    )
+    if sale_.total:
+        raise ValueError(
+            f"Found an unexpected Sale {sale_.as_transaction(sale.datetime, currency)}"
+        )
+    units, subtotal, fees, taxes = state
+    return disposal, (
+        units - disposal.units,
+        subtotal - disposal.purchase_total.amount,
+        fees + disposal.fees.amount,
+        taxes + disposal.taxes.amount,
+    )
+
+
+def as_pool(
+    state: PoolState, date_time: datetime, currency: Currency
+) -> PooledPurchase:
+    """Pool holding the given units and amounts"""
+    units, subtotal, fees, taxes = state
+    return PooledPurchase(
+        currency,
+        date_time=date_time,
+        units=units,
+        subtotal=Money(subtotal, currency),
+        fees=Money(fees, currency),
+        taxes=Money(taxes, currency),
+    )
+
+
+def pool_events(
+    transactions: List[Transaction], pool: PooledPurchase, currency: Currency
+) -> List[Tuple[Transaction, PooledPurchase]]:
+    """
+    Events and pool states for date-ordered purchases and sales, when no sale
+    is an exchange or matched against a purchase under HS284.
+
+    Between sales the pool holds running totals of the purchases, so each run
+    of purchases is accumulated as running totals of plain Decimals, rather
+    than by copying the pool for each purchase. Only the sales, which
+    remove a proportion of the cost of the pool, are reconciled one at a time.
+    The results are identical to adding each transaction to the pool in turn.
+    """
+    date_times = list(
+        accumulate((t.datetime for t in transactions), max, initial=pool.datetime)
+    )[1:]
+    sale_indices = [idx for idx, t in enumerate(transactions) if isinstance(t, Sale)]
+    state = (pool.units, pool.subtotal.amount, pool.fees.amount, pool.taxes.amount)
+    events = []
+    start = 0
+    for end in sale_indices + [len(transactions)]:
+        if end > start:
+            purchases = transactions[start:end]
+            states = accumulate_purchases(state, purchases)
+            events += [
+                (purchase, as_pool(row, date_time, currency))
+                for purchase, row, date_time in zip(
+                    purchases, states, date_times[start:end]
+                )
+            ]
+            state = states[-1]
+        if end < len(transactions):
+            disposal, state = dispose(state, transactions[end], currency)
+            events.append((disposal, as_pool(state, date_times[end], currency)))
+        start = end + 1
+    return events
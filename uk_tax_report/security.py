@@ -2,15 +2,19 @@
 # Standard library imports
 import copy
 import logging
-from datetime import date
-from typing import List, Tuple
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 # Third party imports
 from moneyed import Currency
 
 # Local imports
-from .converters import as_fractional_money
-from .reconcile import exchange, reconcile
+from . import section104
+from .checkpoint import MATCHING_WINDOW, Checkpoint, fingerprints, tax_year_ends
+from .converters import as_fractional_money, as_money
+from .reconcile import Lot, exchange_pool, pool_prefixes, reconcile_lots
 from .transactions import (
     BedAndBreakfast,
     Disposal,
@@ -22,6 +26,13 @@ from .transactions import (
     Transaction,
 )
 
+# The cache and streaming modules depend on this one, and the income module on
+# pandas, so they are only imported for type checking
+if TYPE_CHECKING:
+    from .cache import ResolutionCache
+    from .income import Payment
+    from .streaming import PeriodEvents
+
 
 class Security:
     """Representation of a single security and associated transactions"""
@@ -32,6 +43,10 @@ class Security:
         self.currency = currency
         self.transactions: List[Transaction] = []
         self.events_: List[Tuple[Transaction, PooledPurchase]] = []
+        self.event_dates_: List[date] = []
+        self.checkpoints_: List[Checkpoint] = []
+        self.resolved_: bool = True
+        self.cache_: Optional["ResolutionCache"] = None
 
     def __repr__(self) -> str:
         return f"Security({self.name} [{self.symbol}])"
@@ -46,11 +61,31 @@ class Security:
         return self.name < other.name
 
     def add_transactions(self, transactions: List[Transaction]) -> None:
-        """Add new transactions then resolve them together with existing transactions"""
+        """Add new transactions to be resolved together with existing transactions"""
         # Add new transactions
         self.transactions += transactions
-        # Resolve all transactions
-        self.resolve_transactions()
+        # Resolve all transactions the next time that events are needed
+        self.resolved_ = False
+
+    def capital_gains(self, start_date: date, end_date: date) -> List[Disposal]:
+        """List of non-null disposals between the specified dates (inclusive)"""
+        # Disposals take the date of their sale, so without sales there is nothing to resolve
+        if not self.has_sales(start_date, end_date):
+            return []
+        return [
+            disposal
+            for disposal, _ in self.disposals
+            if start_date <= disposal.date <= end_date and not disposal.is_null
+        ]
+
+    def dividends(self, start_date: date, end_date: date) -> List[Transaction]:
+        """List of dividends and ERIs between the specified dates (inclusive)"""
+        return [
+            t
+            for t in self.transactions
+            if (start_date <= t.datetime.date() <= end_date)
+            and isinstance(t, (Dividend, ExcessReportableIncome))
+        ]
 
     @property
     def disposals(self) -> List[Tuple[Transaction, PooledPurchase]]:
@@ -60,11 +95,61 @@ class Security:
     @property
     def events(self) -> List[Tuple[Transaction, PooledPurchase]]:
         """Return sorted events"""
-        self.events_.sort(key=lambda e: e[0].datetime)
+        if not self.resolved_:
+            if self.cache_:
+                self.cache_.resolve([self])
+            else:
+                self.resolve_transactions()
         return self.events_
 
+    def has_sales(self, start_date: date, end_date: date) -> bool:
+        """Were any units sold between the specified dates (inclusive)?"""
+        return any(
+            isinstance(t, Sale) and start_date <= t.date <= end_date
+            for t in self.transactions
+        )
+
+    def is_pooled_directly(self, end_date: date) -> bool:
+        """
+        Does the pool up to this date hold exactly the units bought less the units
+        sold? This is true unless a sale was an exchange or could be matched
+        against a purchase within the following 30 days.
+        """
+        purchase_dates = sorted(
+            t.date for t in self.transactions if isinstance(t, Purchase)
+        )
+        for sale in self.transactions:
+            if not isinstance(sale, Sale) or sale.date > end_date:
+                continue
+            if "exchange" in sale.note.lower():
+                return False
+            idx = bisect_left(purchase_dates, sale.date)
+            if idx < len(purchase_dates) and purchase_dates[idx] <= (
+                sale.date + MATCHING_WINDOW
+            ):
+                return False
+        return True
+
     def is_held(self, start_date: date = None, end_date: date = None) -> bool:
         """Was this security held between the specified dates (inclusive)?"""
+        # Count the units directly where possible, so that resolution is not needed
+        if self.is_pooled_directly(end_date):
+            units, held = Decimal(0), False
+            for transaction in sorted(self.transactions, key=lambda t: t.datetime):
+                if transaction.date > end_date:
+                    break
+                if isinstance(transaction, Sale):
+                    units -= transaction.units
+                elif isinstance(transaction, Purchase) and not isinstance(
+                    transaction, ExcessReportableIncome
+                ):
+                    units += transaction.units
+                else:
+                    continue
+                held = (
+                    (held or units > 0) if transaction.date >= start_date else units > 0
+                )
+            return held
         # Check whether any units were held on the start date
         events_before = [
             event for event in self.events if event[0].datetime.date() < start_date
@@ -80,12 +165,95 @@ class Security:
                 return True
         return False
 
+    def latest_checkpoint(self, digests: Dict[date, str]) -> Optional[Checkpoint]:
+        """Latest checkpoint whose transactions have not changed, if any"""
+        for checkpoint in reversed(self.checkpoints_):
+            if digests.get(
+                checkpoint.boundary
+            ) == checkpoint.fingerprint and checkpoint.n_events <= len(self.events_):
+                logging.debug(f"Resuming from {checkpoint}")
+                return checkpoint
+        return None
+
+    def load_events(self, events: List[Tuple[Transaction, PooledPurchase]]) -> None:
+        """Use previously resolved events instead of resolving the transactions"""
+        self.events_, self.event_dates_ = events, [e[0].date for e in events]
+        self.resolved_ = True
+
+    def load_checkpoints(
+        self,
+        events: List[Tuple[Transaction, PooledPurchase]],
+        checkpoints: List[Checkpoint],
+    ) -> None:
+        """Resume the next resolution from previously resolved events and checkpoints"""
+        if self.resolved_:
+            return
+        self.events_, self.event_dates_ = events, [e[0].date for e in events]
+        self.checkpoints_ = checkpoints
+
+    def new_checkpoints(
+        self,
+        boundaries: List[date],
+        digests: Dict[date, str],
+        events: List[Tuple[Transaction, PooledPurchase]],
+        purchases: List[Purchase],
+        updates: Dict[int, List[Tuple[date, Lot]]],
+        purchased: Optional[PooledPurchase],
+    ) -> List[Checkpoint]:
+        """
+        Checkpoints at each boundary, given the events, the unmatched purchases
+        and the residuals left at each purchase by sales on each date
+        """
+        checkpoints = []
+        event_dates = [e[0].date for e in events]
+        purchase_dates = [p.date for p in purchases]
+        running = copy.deepcopy(purchased) if purchased else None
+        idx_first = 0
+        for boundary in boundaries:
+            # Add up all purchases on or before the boundary for HS285 exchanges
+            while idx_first < len(purchases) and purchase_dates[idx_first] <= boundary:
+                running = running or PooledPurchase(self.currency)
+                running.add_purchase(purchases[idx_first])
+                idx_first += 1
+            # Keep the state of later purchases that were matched against earlier sales
+            residuals = {}
+            for idx_purchase in range(
+                idx_first, bisect_right(purchase_dates, boundary + MATCHING_WINDOW)
+            ):
+                matched = [p for d, p in updates.get(idx_purchase, []) if d <= boundary]
+                if matched:
+                    residuals[idx_purchase - idx_first] = matched[-1].as_transaction(
+                        purchases[idx_purchase].datetime, self.currency
+                    )
+            n_events = bisect_right(event_dates, boundary)
+            checkpoints.append(
+                Checkpoint(
+                    boundary,
+                    digests[boundary],
+                    n_events,
+                    events[n_events - 1][1]
+                    if n_events
+                    else PooledPurchase(self.currency),
+                    copy.deepcopy(running),
+                    residuals,
+                )
+            )
+        return checkpoints
+
+    def pool_at(self, on_date: date) -> PooledPurchase:
+        """Section 104 pool at the end of the specified date"""
+        events = self.events
+        idx = bisect_right(self.event_dates_, on_date)
+        return events[idx - 1][1] if idx else PooledPurchase(self.currency)
+
     def report_capital_gains(
         self, start_date: date = None, end_date: date = None
     ) -> None:
         """Produce a capital gains report"""
         # If there are no disposals in the time range there can be no capital gains
-        if not any(start_date <= d[0].date <= end_date for d in self.disposals):
+        if not self.has_sales(start_date, end_date) or not any(
+            start_date <= d[0].date <= end_date for d in self.disposals
+        ):
             return
 
         # Generate the capital gains report
@@ -97,9 +265,9 @@ class Security:
             date_prefix = f"  {transaction.date}:"
             date_spacing = " " * len(date_prefix)
             logging.debug(f"Processing event of type {type(transaction).__name__}:")
-            logging.debug(f"=> {str(transaction)}")
+            logging.debug("=> %s", transaction)
             if transaction.is_null:
-                logging.debug(f"Skipping transaction {str(transaction)}")
+                logging.debug("Skipping transaction %s", transaction)
                 continue
             # Transactions involving purchase (including ExcessReportableIncome and ScripDividend)
             if isinstance(transaction, Purchase):
@@ -140,15 +308,17 @@ class Security:
                 f"{date_spacing} Pool: {pool.units} shares @ {as_fractional_money(pool.unit_price_inc)} each, cost {str(pool.total)} "
             )
 
-    def report_dividends(self, start_date: date = None, end_date: date = None) -> None:
-        """Produce a dividend and ERI report"""
+    def report_dividends(
+        self,
+        start_date: date = None,
+        end_date: date = None,
+        payments: Optional[List["Payment"]] = None,
+    ) -> None:
+        """Produce a dividend and ERI report, using payments between the dates if they are given"""
         # Load all dividend and ERI transactions between the dates
-        transactions = [
-            t
-            for t in self.transactions
-            if (start_date <= t.datetime.date() <= end_date)
-            and (isinstance(t, Dividend) or isinstance(t, ExcessReportableIncome))
-        ]
+        transactions = (
+            self.dividends(start_date, end_date) if payments is None else payments
+        )
         # If there are dividends then log them
         if transactions:
             logging.info(f"{self.name:88s} {f'({self.symbol})':>18s}")
@@ -157,60 +327,183 @@ class Security:
                     f"  {transaction.date}: {f'{transaction.type} for {transaction.units} shares @ {as_fractional_money(transaction.unit_price)} each':52} {str(transaction.total):>18}"
                 )
 
-    def resolve_transactions(self) -> None:
-        """Resolve all transactions in the list"""
-        # Sort transactions and separate into purchases and sales
-        logging.debug(
-            f"Resolving {len(self.transactions)} transactions for {self.name} ({self.symbol})"
-        )
-        sorted_transactions = sorted(self.transactions, key=lambda t: t.datetime)
-        purchases = list(filter(lambda t: isinstance(t, Purchase), sorted_transactions))
-        sales = list(filter(lambda t: isinstance(t, Sale), sorted_transactions))
-        disposals = []
+    def simulate_disposal(
+        self,
+        on_date: date,
+        units: Any,
+        unit_price: Any,
+        fees: Any = 0,
+        taxes: Any = 0,
+    ) -> Disposal:
+        """
+        Estimated disposal from selling units on a date, without changing any state.
 
-        # Under HS285 share reorganisations should count the new shares as being bought at the same time as the old shares
-        # There may be a small additional capital gain
-        for idx_sale, sale in [
-            s for s in enumerate(sales) if "exchange" in s[1].note.lower()
-        ]:
-            logging.debug(
-                "Combining sale with previous purchases as this is an exchange under HS285:"
+        The sale is matched against purchases on the same day and the following
+        30 days that are not already matched against recorded sales, and then
+        against the Section 104 pool at the start of the day. Only the events
+        around the date are examined, so this is cheap once resolved.
+        """
+        units = Decimal(units)
+        if units <= 0:
+            raise ValueError(f"Cannot sell {units} units of {self.name}")
+        events = self.events
+        sale = Sale(
+            datetime.combine(on_date, time()),
+            self.currency,
+            units,
+            as_money(unit_price, self.currency) * units,
+            fees,
+            taxes,
+        )
+        idx_start = bisect_left(self.event_dates_, on_date)
+        idx_end = bisect_right(self.event_dates_, on_date + MATCHING_WINDOW)
+        # Look ahead for purchases that would be matched under HS284
+        candidates = [
+            transaction
+            for transaction, _ in events[idx_start:idx_end]
+            if isinstance(transaction, Purchase)
+            and not isinstance(transaction, ExcessReportableIncome)
+            and transaction.units
+        ]
+        # The remainder is matched against the pool held before the day
+        pool = events[idx_start - 1][1] if idx_start else PooledPurchase(self.currency)
+        if pool.units:
+            candidates.append(pool)
+        # Each matched purchase contributes the same fraction of its costs
+        remaining = units
+        costs = [self.currency.zero] * 3
+        for purchase in candidates:
+            matched = min(remaining, purchase.units)
+            fraction = matched / purchase.units
+            for idx, amount in enumerate(
+                (purchase.total, purchase.fees, purchase.taxes)
+            ):
+                costs[idx] += amount * fraction
+            remaining -= matched
+            if not remaining:
+                break
+        if remaining:
+            raise ValueError(
+                f"Cannot sell {units} units of {self.name} on {on_date} as only {units - remaining} are available"
             )
-            logging.debug(f"  {sale}")
-            purchases_ = list(filter(lambda p, d=sale.date: p.date < d, purchases))
-            purchase_, sale_, disposal = exchange(purchases_, sale)
-            logging.debug(f"  {purchases_}")
-            sales[idx_sale] = sale_
-            disposals.append(disposal)
-            logging.debug("Result:")
-            logging.debug(f"  {purchase_}")
-            logging.debug(f"  {sale_}")
-            logging.debug(f"  {disposal}")
-
-        # Consider whether each sale must be reconciled against purchases according to HS284
-        # First consider same day purchases followed by bed-and-breakfasting against any purchase within 30 days
-        # Date-ordering any purchases between 0 and 30 days following the sale will automatically apply this
+        return Disposal(
+            sale.datetime,
+            self.currency,
+            units,
+            *costs,
+            sale.total,
+            sale.fees,
+            sale.taxes,
+        )
+
+    def summary(
+        self,
+        start_date: date,
+        end_date: date,
+        events: Optional["PeriodEvents"] = None,
+        payments: Optional[List["Payment"]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Summary of capital gains and income between the specified dates
+        (inclusive), using streamed events and dividend and ERI payments for
+        the period if they are given
+        """
+        disposals = (
+            events.disposals if events else self.capital_gains(start_date, end_date)
+        )
+        dividends = (
+            self.dividends(start_date, end_date) if payments is None else payments
+        )
+        return {
+            "symbol": self.symbol,
+            "name": self.name,
+            "held": events.held if events else self.is_held(start_date, end_date),
+            "disposals": [
+                {
+                    "date": disposal.date,
+                    "type": disposal.type,
+                    "units": disposal.units,
+                    "proceeds": disposal.sale_total,
+                    "cost": disposal.purchase_total,
+                    "gain": disposal.gain,
+                }
+                for disposal in disposals
+            ],
+            "income": [
+                {
+                    "date": dividend.date,
+                    "type": dividend.type,
+                    "units": dividend.units,
+                    "amount": dividend.total,
+                }
+                for dividend in dividends
+            ],
+            "gain": sum((d.gain for d in disposals), self.currency.zero),
+            "income_total": sum((d.total for d in dividends), self.currency.zero),
+        }
+
+    @staticmethod
+    def match_sales(
+        purchases: List[Purchase],
+        sales: List[Sale],
+        updates: Dict[int, List[Tuple[date, Lot]]],
+    ) -> List[BedAndBreakfast]:
+        """
+        Match each sale against purchases on the same day and in the following 30
+        days under HS284, replacing the purchases and sales by their residuals and
+        recording the residual of each purchase after each sale in updates.
+
+        Matched purchases and sales are reconciled as lots, and each only becomes
+        a new transaction once, at the end. Every purchase in the window is
+        matched against the original sale rather than what is left of it.
+        """
+        disposals = []
+        purchase_dates = [purchase.date for purchase in purchases]
+        lots: Dict[int, Lot] = {}
         for idx_sale, sale in enumerate(sales):
-            for idx_purchase, purchase in filter(
-                lambda ptuple, d=sale.date: 0 <= (ptuple[1].date - d).days <= 30,
-                enumerate(purchases),
-            ):
-                logging.debug("Combining purchase and sale under HS284:")
-                logging.debug(f"  {purchase}")
-                logging.debug(f"  {sale}")
-                purchase_, sale_, disposal = reconcile(purchase, sale)
-                disposals.append(BedAndBreakfast(disposal))
-                purchases[idx_purchase] = purchase_
-                sales[idx_sale] = sale_
-                logging.debug("Result:")
-                logging.debug(f"  {purchase_}")
-                logging.debug(f"  {sale_}")
-                logging.debug(f"  {disposal}")
-        transactions = [t for t in purchases + sales + disposals if t]
-
-        # Each remaining sale can be converted into a disposal against the existing pool
-        self.events_ = []
-        pool = PooledPurchase(self.currency)
+            window = range(
+                bisect_left(purchase_dates, sale.date),
+                bisect_right(purchase_dates, sale.date + timedelta(days=30)),
+            )
+            if not window:
+                continue
+            for idx_purchase in window:
+                # Each purchase is matched against the whole of the original
+                # sale, and the sale is left with the residual of the last one
+                sale_ = Lot.from_transaction(sale)
+                if idx_purchase not in lots:
+                    lots[idx_purchase] = Lot.from_transaction(purchases[idx_purchase])
+                logging.debug(
+                    "Combining purchase %s and sale %s under HS284",
+                    idx_purchase,
+                    idx_sale,
+                )
+                disposal = BedAndBreakfast.from_amounts(
+                    sale.datetime,
+                    sale.currency,
+                    *reconcile_lots(lots[idx_purchase], sale_),
+                )
+                disposals.append(disposal)
+                updates.setdefault(idx_purchase, []).append(
+                    (sale.date, lots[idx_purchase].copy())
+                )
+                logging.debug("  %s", disposal)
+            sales[idx_sale] = sale_.as_transaction(sale.datetime, sale.currency)
+        for idx_purchase, lot in lots.items():
+            purchase = purchases[idx_purchase]
+            purchases[idx_purchase] = lot.as_transaction(
+                purchase.datetime, purchase.currency
+            )
+        return disposals
+
+    def pool_events(
+        self, transactions: List[Transaction], pool: PooledPurchase
+    ) -> List[Tuple[Transaction, PooledPurchase]]:
+        """
+        Events and pool states from adding transactions to the pool one at a
+        time, converting each remaining sale into a disposal against the pool
+        """
+        events = []
         for transaction in sorted(transactions, key=lambda t: t.datetime):
             logging.debug(
                 f"Starting a transaction with {pool.units} shares in the pool"
@@ -220,40 +513,150 @@ class Security:
                 logging.debug(
                     f"=> Found a {type(transaction).__name__} on {transaction.date}:"
                 )
-                logging.debug(f"  {transaction}")
+                logging.debug("  %s", transaction)
                 pool.add_eri(transaction)
-                self.events.append((transaction, pool))
+                events.append((transaction, pool))
             elif isinstance(transaction, Purchase):
                 logging.debug(
                     f"=> Found a {type(transaction).__name__} on {transaction.date}:"
                 )
-                logging.debug(f"  {transaction}")
+                logging.debug("  %s", transaction)
                 pool.add_purchase(transaction)
-                self.events.append((transaction, pool))
+                events.append((transaction, pool))
             elif isinstance(transaction, BedAndBreakfast):
                 logging.debug(f"=> Found a BedAndBreakfast on {transaction.date}:")
-                logging.debug(f"  {transaction}")
+                logging.debug("  %s", transaction)
                 pool.add_bed_and_breakfast(transaction)
-                self.events_.append((transaction, pool))
+                events.append((transaction, pool))
             elif isinstance(transaction, Disposal):
                 logging.debug(f"=> Found a Disposal on {transaction.date}:")
-                logging.debug(f"  {transaction}")
+                logging.debug("  %s", transaction)
                 pool.add_disposal(transaction)
-                self.events_.append((transaction, pool))
+                events.append((transaction, pool))
             elif isinstance(transaction, Sale):
                 logging.debug(f"=> Found a Sale on {transaction.date}:")
-                logging.debug(f"  {transaction}")
+                logging.debug("  %s", transaction)
                 logging.debug("... reconciling against pool to give:")
-                purchase, sale, disposal = reconcile(pool, transaction)
-                logging.debug(f"  {purchase}")
-                logging.debug(f"  {sale}")
-                logging.debug(f"  {disposal}")
+                sale = Lot.from_transaction(transaction)
+                disposal = Disposal(
+                    transaction.datetime,
+                    self.currency,
+                    *reconcile_lots(Lot.from_transaction(pool), sale),
+                )
+                logging.debug("  %s", disposal)
                 if sale.total:
-                    raise ValueError(f"Found an unexpected Sale {sale}")
+                    raise ValueError(
+                        f"Found an unexpected Sale {sale.as_transaction(transaction.datetime, self.currency)}"
+                    )
                 pool.add_disposal(disposal)
-                self.events_.append((disposal, pool))
+                events.append((disposal, pool))
             else:
                 raise ValueError(
                     f"Unknown event of type {type(transaction).__name__}:\n {transaction}"
                 )
             logging.debug(f"Ending transaction with {pool.units} shares in the pool")
+        return events
+
+    def resolve_transactions(self) -> None:
+        """Resolve all transactions in the list"""
+        # Sort transactions and separate into purchases and sales
+        logging.debug(
+            f"Resolving {len(self.transactions)} transactions for {self.name} ({self.symbol})"
+        )
+        sorted_transactions = sorted(self.transactions, key=lambda t: t.datetime)
+        boundaries = (
+            tax_year_ends(sorted_transactions[0].date, sorted_transactions[-1].date)
+            if sorted_transactions
+            else []
+        )
+        digests = fingerprints(sorted_transactions, boundaries)
+
+        # Later transactions cannot change events before a valid checkpoint, so resume from the latest one
+        checkpoint = self.latest_checkpoint(digests)
+        prefix = self.events_[: checkpoint.n_events] if checkpoint else []
+        sorted_transactions = [
+            t
+            for t in sorted_transactions
+            if not checkpoint or t.date > checkpoint.boundary
+        ]
+        purchases = list(filter(lambda t: isinstance(t, Purchase), sorted_transactions))
+        sales = list(filter(lambda t: isinstance(t, Sale), sorted_transactions))
+        pool = checkpoint.pool if checkpoint else PooledPurchase(self.currency)
+        originals = list(purchases)
+        updates: Dict[int, List[Tuple[date, Lot]]] = {}
+
+        # Without exchanges or matched sales the pool can be resolved directly
+        if not (checkpoint and checkpoint.residuals) and self.is_pooled_directly(
+            date.max
+        ):
+            logging.debug("Resolving the Section 104 pool directly")
+            events = section104.pool_events(
+                sorted(purchases + sales, key=lambda t: t.datetime),
+                pool,
+                self.currency,
+            )
+        else:
+            purchased = (
+                [checkpoint.purchased] if checkpoint and checkpoint.purchased else []
+            )
+            disposals = []
+
+            # Under HS285 share reorganisations should count the new shares as being bought at the same time as the old shares
+            # There may be a small additional capital gain
+            exchanges = [s for s in enumerate(sales) if "exchange" in s[1].note.lower()]
+            # Each exchange is against every earlier purchase, so keep running totals of the date-ordered purchases
+            prefixes = pool_prefixes(purchased + purchases) if exchanges else []
+            purchase_dates = [p.date for p in purchases]
+            for idx_sale, sale in exchanges:
+                logging.debug(
+                    "Combining sale with previous purchases as this is an exchange under HS285:"
+                )
+                logging.debug("  %s", sale)
+                pool_, date_time = prefixes[
+                    len(purchased) + bisect_left(purchase_dates, sale.date)
+                ]
+                purchase_, sale_, disposal = exchange_pool(pool_, date_time, sale)
+                logging.debug("  %s", pool_.as_transaction(date_time, self.currency))
+                sales[idx_sale] = sale_
+                disposals.append(disposal)
+                logging.debug("Result:")
+                logging.debug("  %s", purchase_)
+                logging.debug("  %s", sale_)
+                logging.debug("  %s", disposal)
+
+            # Consider whether each sale must be reconciled against purchases according to HS284
+            # First consider same day purchases followed by bed-and-breakfasting against any purchase within 30 days
+            # Date-ordering any purchases between 0 and 30 days following the sale will automatically apply this
+            # Restore purchases that were partly matched against sales before the checkpoint
+            for idx_purchase, residual in (
+                checkpoint.residuals if checkpoint else {}
+            ).items():
+                purchases[idx_purchase] = residual
+                updates[idx_purchase] = [
+                    (checkpoint.boundary, Lot.from_transaction(residual))
+                ]
+            disposals += self.match_sales(purchases, sales, updates)
+            transactions = [t for t in purchases + sales + disposals if t]
+            events = self.pool_events(transactions, pool)
+        events.sort(key=lambda e: e[0].datetime)
+        events = prefix + events
+
+        # Record a checkpoint at each later tax year boundary
+        checkpoints = [
+            c
+            for c in self.checkpoints_
+            if checkpoint and c.boundary <= checkpoint.boundary
+        ] + self.new_checkpoints(
+            [b for b in boundaries if not checkpoint or b > checkpoint.boundary],
+            digests,
+            events,
+            originals,
+            updates,
+            checkpoint.purchased if checkpoint else None,
+        )
+        event_dates = [e[0].date for e in events]
+
+        # Replace the events in one step so that concurrent readers never see a partial list
+        self.events_, self.event_dates_ = events, event_dates
+        self.checkpoints_ = checkpoints
+        self.resolved_ = True
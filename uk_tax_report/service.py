@@ -0,0 +1,276 @@
+"""Serve queries against portfolios that are kept loaded and resolved in memory"""
+# Standard library imports
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import suppress
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Local imports
+from . import readers
+from .account import Account
+from .batch import ResultEncoder
+from .converters import as_datetime, as_tax_year
+from .fx_rates import FxRates
+
+
+class Portfolio:
+    """Resolved accounts from one file, which are not modified once loaded"""
+
+    def __init__(
+        self,
+        name: str,
+        file_name: str,
+        currency: str,
+        fx_rates: Optional[FxRates] = None,
+    ):
+        self.name = name
+        self.file_name = file_name
+        self.currency = currency
+        self.signature = file_signature(file_name)
+        self.loaded_at = time.time()
+        data = readers.load_data_file(file_name)
+        if fx_rates:
+            data.convert_currencies(fx_rates, currency)
+        self.accounts = {
+            account_name: Account(account_name, currency, data)
+            for account_name in sorted(data.account_names)
+        }
+        self.combined_: Dict[Tuple[str, ...], Account] = {}
+        self.reports_: Dict[tuple, Dict[str, Any]] = {}
+        self.lock_ = threading.Lock()
+        # Resolve everything now so that queries only read
+        self.combined(list(self.accounts))
+
+    def account_key(self, account_names: Optional[List[str]] = None) -> Tuple[str, ...]:
+        """Sorted account names, defaulting to all accounts"""
+        return tuple(sorted(set(account_names or self.accounts)))
+
+    def combined(self, account_names: Optional[List[str]] = None) -> Account:
+        """Resolved combination of the named accounts (default: all accounts)"""
+        key = self.account_key(account_names)
+        missing = set(key) - set(self.accounts)
+        if missing:
+            raise KeyError(f"Unknown accounts: {', '.join(sorted(missing))}")
+        if key in self.combined_:
+            return self.combined_[key]
+        with self.lock_:
+            if key not in self.combined_:
+                combined = sum(
+                    (self.accounts[name] for name in key),
+                    start=Account("Taxable Accounts", self.currency),
+                )
+                for security in combined.securities:
+                    security.resolve_transactions()
+                self.combined_[key] = combined
+            return self.combined_[key]
+
+    def holdings(
+        self, on_date: date, account_names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Section 104 pool of every security held at the end of a date"""
+        account = self.combined(account_names)
+        holdings = []
+        for security in sorted(account.securities):
+            pool = security.pool_at(on_date)
+            if pool.units:
+                holdings.append(
+                    {
+                        "symbol": security.symbol,
+                        "name": security.name,
+                        "units": pool.units,
+                        "cost": pool.total,
+                        "unit_cost": pool.unit_price_inc,
+                    }
+                )
+        return {"name": self.name, "date": on_date, "holdings": holdings}
+
+    def report(
+        self,
+        tax_year: str,
+        account_names: Optional[List[str]] = None,
+        include_non_taxable: bool = False,
+    ) -> Dict[str, Any]:
+        """Summary of capital gains and income for a tax year"""
+        start_date, end_date = as_tax_year(tax_year)
+        key = (self.account_key(account_names), start_date, include_non_taxable)
+        # Accounts are not modified once loaded, so each report is only built once
+        if key not in self.reports_:
+            summary = self.combined(account_names).summary(
+                start_date, end_date, include_non_taxable
+            )
+            self.reports_[key] = {"tax_year": tax_year, **summary}
+        return self.reports_[key]
+
+    def describe(self) -> Dict[str, Any]:
+        """Basic information about this portfolio"""
+        return {
+            "name": self.name,
+            "file": self.file_name,
+            "accounts": list(self.accounts),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def file_signature(file_name: str) -> Tuple[int, int]:
+    """Modification time and size of a file, which change whenever it is rewritten"""
+    stat = os.stat(file_name)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PortfolioStore:
+    """Portfolios by name, reloaded whenever their file changes"""
+
+    def __init__(
+        self,
+        file_names: List[str],
+        currency: str = "GBP",
+        fx_rates: Optional[FxRates] = None,
+    ):
+        self.currency = currency
+        self.fx_rates = fx_rates
+        self.file_names: Dict[str, str] = {}
+        for file_name in file_names:
+            name = Path(file_name).stem
+            while name in self.file_names:
+                name += "_"
+            self.file_names[name] = str(file_name)
+        self.portfolios_: Dict[str, Portfolio] = {}
+        self.locks_ = {name: threading.Lock() for name in self.file_names}
+        self.failed_: Dict[str, Tuple[int, int]] = {}
+
+    def load_all(self) -> None:
+        """Load every portfolio now rather than on its first query"""
+        for name in self.file_names:
+            self.get(name)
+
+    def get(self, name: str) -> Portfolio:
+        """Up-to-date portfolio, reloading it if its file has changed"""
+        if name not in self.file_names:
+            raise KeyError(f"Unknown portfolio: {name}")
+        portfolio = self.portfolios_.get(name)
+        if portfolio and not self.is_stale(portfolio):
+            return portfolio
+        # Only one thread reloads a portfolio; others wait and then share the result
+        with self.locks_[name]:
+            portfolio = self.portfolios_.get(name)
+            if portfolio and not self.is_stale(portfolio):
+                return portfolio
+            logging.info(f"Loading portfolio '{name}' from {self.file_names[name]}")
+            start_time = time.perf_counter()
+            try:
+                portfolio = Portfolio(
+                    name, self.file_names[name], self.currency, self.fx_rates
+                )
+            except Exception:  # pylint: disable=broad-except
+                # Keep answering from the previous version, eg. while a file is half-written
+                if not portfolio:
+                    raise
+                logging.exception(f"Could not reload portfolio '{name}'")
+                # Do not retry until the file changes again
+                with suppress(OSError):
+                    self.failed_[name] = file_signature(portfolio.file_name)
+                return portfolio
+            self.portfolios_[name] = portfolio
+            logging.info(
+                f"Loaded portfolio '{name}' in {time.perf_counter() - start_time:.2f}s"
+            )
+            return portfolio
+
+    def is_stale(self, portfolio: Portfolio) -> bool:
+        """Whether the file behind a portfolio has changed since it was loaded"""
+        try:
+            signature = file_signature(portfolio.file_name)
+        except OSError:
+            # The file may be briefly missing while it is replaced
+            return False
+        return signature not in (portfolio.signature, self.failed_.get(portfolio.name))
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Basic information about every portfolio that has been loaded"""
+        return [
+            self.portfolios_[name].describe()
+            if name in self.portfolios_
+            else {"name": name, "file": file_name}
+            for name, file_name in self.file_names.items()
+        ]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Answer queries as JSON:
+      - GET /portfolios
+      - GET /portfolios/<name>/report?tax_year=YYYY-YY[&accounts=A,B][&all=1]
+      - GET /portfolios/<name>/holdings[?date=YYYY-MM-DD][&accounts=A,B]
+    """
+
+    server: "QueryServer"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Dispatch a GET request"""
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        account_names = query["accounts"].split(",") if "accounts" in query else None
+        try:
+            if parts == ["portfolios"]:
+                self.send_json(HTTPStatus.OK, self.server.store.describe())
+            elif len(parts) == 3 and parts[0] == "portfolios":
+                portfolio = self.server.store.get(parts[1])
+                if parts[2] == "report":
+                    result = portfolio.report(
+                        query.get("tax_year"),
+                        account_names,
+                        query.get("all", "0").lower() in ("1", "true", "yes"),
+                    )
+                elif parts[2] == "holdings":
+                    on_date = (
+                        as_datetime(query["date"]).date()
+                        if "date" in query
+                        else date.today()
+                    )
+                    result = portfolio.holdings(on_date, account_names)
+                else:
+                    raise KeyError(f"Unknown query: {parts[2]}")
+                self.send_json(HTTPStatus.OK, result)
+            else:
+                raise KeyError(f"Unknown path: {url.path}")
+        except KeyError as exc:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": str(exc).strip("'\"")})
+        except ValueError as exc:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+        except Exception as exc:  # pylint: disable=broad-except
+            logging.exception("Failed to answer query")
+            self.send_json(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": f"{type(exc).__name__}: {exc}"},
+            )
+
+    def send_json(self, status: HTTPStatus, content: Any) -> None:
+        """Send content as a JSON response"""
+        body = json.dumps(content, cls=ResultEncoder).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class QueryServer(ThreadingHTTPServer):
+    """HTTP server answering queries from a shared portfolio store"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], store: PortfolioStore):
+        super().__init__(address, QueryHandler)
+        self.store = store
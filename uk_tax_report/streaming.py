@@ -0,0 +1,167 @@
+"""Definition of the EventStream class"""
+# Standard library imports
+from collections import deque, namedtuple
+from datetime import date
+from decimal import Decimal
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+# Local imports
+from .checkpoint import MATCHING_WINDOW
+from .reconcile import Lot, exchange_pool, pool_prefixes
+from .security import Security
+from .transactions import Disposal, PooledPurchase, Purchase, Sale, Transaction
+
+Event = Tuple[Transaction, PooledPurchase]
+
+
+# Purchases and sales on one date that have been read but not resolved, with
+# the purchases as they were read and as they remain after any matching
+Day = namedtuple("Day", ["date", "originals", "purchases", "sales"])
+
+
+class EventStream:
+    """
+    Resolve date-ordered transactions into the same events as a Security, one
+    day at a time, without keeping the events.
+
+    A day is resolved once every transaction in the 30 days that follow it has
+    been read, since its sales may be matched against those purchases under
+    HS284. Only these days, the Section 104 pool and the total of all earlier
+    purchases (for HS285 exchanges) are kept, so memory use depends on the
+    trading window rather than the length of the history.
+    """
+
+    def __init__(self, security: Security):
+        self.security = security
+        self.pool = PooledPurchase(security.currency)
+        self.purchased_: Optional[Lot] = None
+        self.last_purchase_: Optional[Purchase] = None
+        self.days_: Deque[Day] = deque()
+
+    def add(self, transaction: Transaction) -> List[Event]:
+        """Add the next transaction, returning the events of any days now resolved"""
+        if not isinstance(transaction, (Purchase, Sale)):
+            return []
+        events = []
+        while self.days_ and transaction.date > self.days_[0].date + MATCHING_WINDOW:
+            events += self.resolve_day()
+        if not self.days_ or self.days_[-1].date != transaction.date:
+            self.days_.append(Day(transaction.date, [], [], []))
+        if isinstance(transaction, Purchase):
+            self.days_[-1].originals.append(transaction)
+            self.days_[-1].purchases.append(transaction)
+        else:
+            self.days_[-1].sales.append(transaction)
+        return events
+
+    def flush(self) -> List[Event]:
+        """Resolve every remaining day, returning their events"""
+        events = []
+        while self.days_:
+            events += self.resolve_day()
+        return events
+
+    def exchange(self, sale: Sale) -> Tuple[Sale, Disposal]:
+        """Residual sale and disposal of an HS285 exchange against all earlier purchases"""
+        pool, date_time = (
+            (self.purchased_, self.last_purchase_.datetime)
+            if self.purchased_
+            else pool_prefixes([])[0]
+        )
+        _, sale_, disposal = exchange_pool(pool, date_time, sale)
+        return sale_, disposal
+
+    def resolve_day(self) -> List[Event]:
+        """Resolve the earliest day that has been read, returning its events"""
+        day = self.days_[0]
+        disposals = []
+        for idx_sale, sale in enumerate(day.sales):
+            if "exchange" in sale.note.lower():
+                day.sales[idx_sale], disposal = self.exchange(sale)
+                disposals.append(disposal)
+
+        # Match the sales against purchases in the window, keeping their residuals
+        purchases = [p for d in self.days_ for p in d.purchases]
+        disposals += self.security.match_sales(purchases, day.sales, {})
+        start = 0
+        for later_day in self.days_:
+            end = start + len(later_day.purchases)
+            later_day.purchases[:] = purchases[start:end]
+            start = end
+
+        # Later exchanges are matched against the original purchases of this day
+        for purchase in day.originals:
+            self.purchased_ = self.purchased_ or Lot(
+                Decimal(0), Decimal(0), Decimal(0), Decimal(0), False
+            )
+            self.purchased_.units += purchase.units
+            self.purchased_.subtotal += purchase.subtotal.amount
+            self.purchased_.fees += purchase.fees.amount
+            self.purchased_.taxes += purchase.taxes.amount
+            self.last_purchase_ = purchase
+
+        self.days_.popleft()
+        events = self.security.pool_events(
+            day.purchases + day.sales + disposals, self.pool
+        )
+        if events:
+            self.pool = events[-1][1]
+        return events
+
+
+class PeriodEvents:
+    """Disposals and holdings between two dates (inclusive), gathered from streamed events"""
+
+    def __init__(self, start_date: date, end_date: date):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.disposals: List[Disposal] = []
+        self.held_before_ = False
+        self.held_during_ = False
+
+    @property
+    def held(self) -> bool:
+        """Were any units held between the dates?"""
+        return self.held_before_ or self.held_during_
+
+    def add(self, transaction: Transaction, pool: PooledPurchase) -> None:
+        """Add the next event"""
+        on_date = transaction.datetime.date()
+        if on_date < self.start_date:
+            # Only the pool after the last event before the start date matters
+            self.held_before_ = pool.units > 0
+        elif on_date <= self.end_date:
+            self.held_during_ = self.held_during_ or pool.units > 0
+            if isinstance(transaction, Disposal) and not transaction.is_null:
+                self.disposals.append(transaction)
+
+
+def stream_events(
+    security: Security, transactions: Optional[Iterable[Transaction]] = None
+) -> Iterator[Event]:
+    """
+    Events of a security as they are resolved, which are the same as its
+    events but are not kept. Date-ordered transactions can be given instead of
+    those of the security, for example as they are read.
+    """
+    if transactions is None:
+        transactions = sorted(security.transactions, key=lambda t: t.datetime)
+    stream = EventStream(security)
+    for transaction in transactions:
+        yield from stream.add(transaction)
+    yield from stream.flush()
+
+
+def stream_periods(
+    security: Security, periods: List[Tuple[date, date]]
+) -> List[PeriodEvents]:
+    """Disposals and holdings of a security in each period, from a single pass of streamed events"""
+    collected = [PeriodEvents(start_date, end_date) for start_date, end_date in periods]
+    last_date = max((end_date for _, end_date in periods), default=date.min)
+    for transaction, pool in stream_events(security):
+        # Later events cannot change any period, so they are not resolved
+        if transaction.datetime.date() > last_date:
+            break
+        for period in collected:
+            period.add(transaction, pool)
+    return collected
@@ -22,3 +22,11 @@ class BedAndBreakfast(Disposal):
             disposal.sale_taxes,
         )
         self.type: str = "Bed-and-breakfast"
+
+    @classmethod
+    def from_amounts(cls, *args) -> "BedAndBreakfast":
+        """Bed-and-breakfast built from the same arguments as a Disposal"""
+        bed_and_breakfast = cls.__new__(cls)
+        Disposal.__init__(bed_and_breakfast, *args)
+        bed_and_breakfast.type = "Bed-and-breakfast"
+        return bed_and_breakfast
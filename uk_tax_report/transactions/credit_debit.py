@@ -3,13 +3,13 @@
 from moneyed import Money
 
 # Local imports
-from .transaction import Transaction
+from .transaction import Transaction, cached_property
 
 
 class CreditTransaction(Transaction):
     """Transaction where money is received"""
 
-    @property
+    @cached_property
     def total(self) -> Money:
         """Total value received in this transaction"""
         return self.subtotal - self.charges
@@ -18,7 +18,7 @@ class CreditTransaction(Transaction):
 class DebitTransaction(Transaction):
     """Transaction where money is paid"""
 
-    @property
+    @cached_property
     def total(self) -> Money:
         """Total value paid in this transaction"""
         return self.subtotal + self.charges
@@ -4,7 +4,7 @@ from moneyed import Money
 
 # Local imports
 from ..converters import abs_divide, as_money
-from .transaction import Transaction
+from .transaction import Transaction, cached_property
 
 
 class Disposal(Transaction):
@@ -38,24 +38,24 @@ class Disposal(Transaction):
             "Subtotal is not a valid property for the Disposal class"
         )
 
-    @property
+    @cached_property
     def total(self) -> Money:
         """Total is not a valid property for this class"""
         raise NotImplementedError(
             "Total is not a valid property for the Disposal class"
         )
 
-    @property
+    @cached_property
     def unit_price_sold(self) -> Money:
         """The unit price at which the units were sold"""
         return abs_divide(self.sale_total, self.units)
 
-    @property
+    @cached_property
     def unit_price_bought(self) -> Money:
         """The unit price at which the units were bought"""
         return abs_divide(self.purchase_total, self.units)
 
-    @property
+    @cached_property
     def gain(self) -> Money:
         """The capital gain made upon sale"""
         return self.sale_total - self.purchase_total
@@ -3,8 +3,8 @@
 from datetime import datetime
 
 # Third-party imports
+from dateutil.relativedelta import relativedelta
 from moneyed import Currency
-from pandas import DateOffset
 
 # Local imports
 from .purchase import Purchase
@@ -32,4 +32,4 @@ class ExcessReportableIncome(Purchase):
         )
         self.type = "ERI"
         # Note that ERIs are reported (and based on holdings from) six months before they are booked as income
-        self.date_reported = date_time - DateOffset(months=6)
+        self.date_reported = self.datetime - relativedelta(months=6)
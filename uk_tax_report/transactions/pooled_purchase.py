@@ -37,6 +37,7 @@ class PooledPurchase(Purchase):
             raise ValueError(f"{bed_and_breakfast} is not a valid BedAndBreakfast!")
         self.datetime = max([self.datetime, bed_and_breakfast.datetime])
         self.subtotal_ = self.subtotal + bed_and_breakfast.gain
+        self.invalidate()
 
     def add_disposal(self, disposal: Disposal) -> None:
         """Add a disposal to the pool"""
@@ -47,6 +48,7 @@ class PooledPurchase(Purchase):
         self.subtotal_ = self.subtotal - disposal.purchase_total
         self.fees = self.fees + disposal.fees
         self.taxes = self.taxes + disposal.taxes
+        self.invalidate()
 
     def add_eri(self, purchase: ExcessReportableIncome) -> None:
         """Add excess reportable income to the pool"""
@@ -57,6 +59,7 @@ class PooledPurchase(Purchase):
         self.subtotal_ = self.subtotal + purchase.subtotal
         self.fees = self.fees + purchase.fees
         self.taxes = self.taxes + purchase.taxes
+        self.invalidate()
 
     def add_purchase(self, purchase: Purchase) -> None:
         """Add a purchase to the pool"""
@@ -67,3 +70,4 @@ class PooledPurchase(Purchase):
         self.subtotal_ = self.subtotal + purchase.subtotal
         self.fees = self.fees + purchase.fees
         self.taxes = self.taxes + purchase.taxes
+        self.invalidate()
@@ -2,7 +2,8 @@
 # Standard library imports
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Union
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple, Union
 
 # Third-party imports
 from moneyed import Currency, Money
@@ -10,6 +11,46 @@ from moneyed import Currency, Money
 # Local imports
 from ..converters import abs_divide, as_currency, as_datetime, as_money
 
+# Names of the derived values that each class computes once and then stores on
+# each transaction, collected from its cached_property descriptors
+CACHED_PROPERTIES: Dict[type, List[str]] = {}
+
+
+class cached_property:  # pylint: disable=invalid-name,too-few-public-methods
+    """
+    Property that is computed on first access and then stored on the instance,
+    so that later accesses are plain attribute lookups. Unlike the version in
+    functools, no lock is taken: threads that compute a value at the same time
+    all store the same result.
+    """
+
+    def __init__(self, function: Callable[[Any], Any]):
+        self.function = function
+        self.name = function.__name__
+        self.__doc__ = function.__doc__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        CACHED_PROPERTIES.setdefault(owner, []).append(name)
+
+    def __get__(self, instance: Any, owner: type = None) -> Any:
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = self.function(instance)
+        return value
+
+
+@lru_cache(maxsize=None)
+def cached_properties(cls: type) -> Tuple[str, ...]:
+    """Names of the cached properties of a class, including those it inherits"""
+    return tuple(
+        dict.fromkeys(
+            name
+            for owner in reversed(cls.__mro__)
+            for name in CACHED_PROPERTIES.get(owner, [])
+        )
+    )
+
 
 class Transaction:
     """Transaction where money is exchanged for a security"""
@@ -43,31 +84,36 @@ class Transaction:
         """Base price paid per unit in this transaction"""
         return abs_divide(self.subtotal, self.units)
 
-    @property
+    @cached_property
     def unit_fees(self) -> Money:
         """Fees paid per unit in this transaction"""
         return abs_divide(self.fees, self.units)
 
-    @property
+    @cached_property
     def unit_taxes(self) -> Money:
         """Taxes paid per unit in this transaction"""
         return abs_divide(self.taxes, self.units)
 
-    @property
+    @cached_property
     def unit_price_inc(self) -> Money:
         """Total price paid per unit in this transaction"""
         return abs_divide(self.total, self.units)
 
-    @property
+    @cached_property
     def charges(self) -> Money:
         """Total charges paid in this transaction"""
         return self.fees + self.taxes
 
+    def invalidate(self) -> None:
+        """Forget any stored derived values after the units or amounts have changed"""
+        for name in cached_properties(type(self)):
+            self.__dict__.pop(name, None)
+
     @property
     def subtotal(self) -> Money:
         return self.subtotal_
 
-    @property
+    @cached_property
     def total(self) -> Money:
         """Total must be implemented by child classes"""
         raise NotImplementedError()
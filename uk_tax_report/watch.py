@@ -0,0 +1,129 @@
+"""Utility functions for reporting again whenever input files change"""
+# Standard library imports
+import hashlib
+import logging
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Local imports
+from .account import Account
+from .checkpoint import transaction_key
+from .security import Security
+from .service import file_signature
+
+# Number of bytes of a file read at a time when computing its digest
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(file_name: str) -> str:
+    """Digest of the contents of a file"""
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as f_input:
+        for chunk in iter(lambda: f_input.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileWatcher:
+    """
+    Files polled for changes to their contents.
+
+    Only the modification time and size of each file are read when polling.
+    When either changes, the contents are hashed, so that a file which is
+    saved again unchanged is not reported as changed.
+    """
+
+    def __init__(self, file_names: List[str]):
+        self.file_names = list(file_names)
+        self.signatures_ = {f: file_signature(f) for f in self.file_names}
+        self.digests_ = {f: file_digest(f) for f in self.file_names}
+
+    def changed(self) -> List[str]:
+        """Files whose contents have changed since they were last checked"""
+        changed = []
+        for file_name in self.file_names:
+            try:
+                signature = file_signature(file_name)
+                if signature == self.signatures_[file_name]:
+                    continue
+                digest = file_digest(file_name)
+            except OSError:
+                # The file may be briefly missing while it is replaced
+                continue
+            self.signatures_[file_name] = signature
+            if digest != self.digests_[file_name]:
+                self.digests_[file_name] = digest
+                changed.append(file_name)
+        return changed
+
+    def wait(self, interval: float = 1.0) -> List[str]:
+        """Poll the files every interval (in seconds) until any of their contents change"""
+        while True:
+            changed = self.changed()
+            if changed:
+                return changed
+            time.sleep(interval)
+
+
+def history(security: Security) -> List[bytes]:
+    """Keys of the transactions of a security in date order"""
+    return [
+        transaction_key(t)
+        for t in sorted(security.transactions, key=lambda t: t.datetime)
+    ]
+
+
+def carry_over(previous: Account, account: Account) -> List[Security]:
+    """
+    Reuse the resolved events of securities in a previous version of an
+    account whose transactions are unchanged, returning the securities whose
+    transactions have changed. These resume from the latest tax-year
+    checkpoint that their changes did not affect.
+    """
+    resolved: Dict[Tuple[str, str], Security] = {
+        (s.symbol, s.name): s for s in previous.securities if s.resolved_
+    }
+    changed = []
+    for security in account.securities:
+        old = resolved.get((security.symbol, security.name))
+        if old and history(old) == history(security):
+            security.load_checkpoints(old.events_, old.checkpoints_)
+            security.load_events(old.events_)
+            continue
+        if old:
+            security.load_checkpoints(old.events_, old.checkpoints_)
+        changed.append(security)
+    return changed
+
+
+def watch(
+    file_names: List[str],
+    load: Callable[[], Account],
+    report: Callable[[Account], None],
+    interval: float = 1.0,
+) -> None:
+    """
+    Load and report an account, then load it again and report it whenever the
+    contents of any of the files change, until interrupted. Only securities
+    whose transactions have changed are resolved again. If an account cannot
+    be loaded, for example while a file is half-written, the next change is
+    awaited instead.
+    """
+    watcher = FileWatcher(file_names)
+    account = load()
+    report(account)
+    while True:
+        changed = watcher.wait(interval)
+        logging.info(f"Reporting again after changes to {', '.join(changed)}")
+        start_time = time.perf_counter()
+        try:
+            updated = load()
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Could not load the changed files")
+            continue
+        n_changed = len(carry_over(account, updated))
+        account = updated
+        report(account)
+        logging.info(
+            f"Reported again in {time.perf_counter() - start_time:.2f}s, with {n_changed} of {len(account.securities)} securities changed"
+        )